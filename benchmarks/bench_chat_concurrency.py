@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the FastAPI `/chat` endpoint.
+
+Drives `/chat` against a local fake LLM server at increasing numbers of
+in-flight requests. With a non-blocking LLM path, throughput should grow with
+concurrency instead of staying flat at roughly 1 / (LLM latency).
+
+All levels run in one event loop, so the engine's pooled LLM connections
+stay usable between them, and a reply that is the engine's apology for a
+failed completion fails the run instead of counting as a fast success.
+
+Usage:
+    python -m benchmarks.bench_chat_concurrency --latency 0.2 --requests 64
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.fake_llm import run_fake_llm
+from debate_core.engine import apology_message
+
+OPENING_MESSAGE = (
+    "Let's debate: Climate change is real and urgent. You argue FOR this position."
+)
+# What every failed completion's reply starts with
+APOLOGY = apology_message(RuntimeError()).partition("Error:")[0]
+
+
+async def run_level(app, concurrency: int, total_requests: int) -> float:
+    """Send `total_requests` new-debate requests with `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=60
+    ) as http:
+
+        async def one_request():
+            async with semaphore:
+                response = await http.post(
+                    "/chat",
+                    json={"conversation_id": None, "message": OPENING_MESSAGE},
+                )
+                response.raise_for_status()
+                reply = response.json()["message"][-1]["message"]
+                if reply.startswith(APOLOGY):
+                    raise RuntimeError(f"The LLM call failed: {reply}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    return total_requests / elapsed
+
+
+async def run_levels(app, levels: list, requests: int) -> list:
+    return [await run_level(app, level, max(requests, level)) for level in levels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /chat concurrency")
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Fake LLM latency in seconds"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=64, help="Requests per concurrency level"
+    )
+    parser.add_argument(
+        "--levels",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 2, 4, 8, 16, 32],
+        help="Comma-separated concurrency levels",
+    )
+    args = parser.parse_args()
+
+    with run_fake_llm(latency=args.latency) as base_url:
+        # Point the OpenAI SDK at the fake server before the app builds its client
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        # Every simulated user shares one address, so per-client limits would
+        # throttle the whole run
+        os.environ.setdefault("RATE_LIMIT_REQUESTS_PER_MINUTE", "0")
+        os.environ.setdefault("RATE_LIMIT_TOKENS_PER_MINUTE", "0")
+
+        import fastapi_app
+
+        print("🚀 /chat concurrency benchmark")
+        print(f"   fake LLM latency: {args.latency * 1000:.0f} ms per call")
+        print("=" * 50)
+        print(f"{'in-flight':>10} {'req/s':>10} {'speedup':>10}")
+
+        results = asyncio.run(run_levels(fastapi_app.app, args.levels, args.requests))
+        baseline = results[0]
+        for level, throughput in zip(args.levels, results):
+            print(f"{level:>10} {throughput:>10.2f} {throughput / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
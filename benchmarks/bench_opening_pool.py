@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the opening warm pool.
+
+Starts new debates through `/chat` against a local fake LLM, with topics
+drawn from a Zipf distribution so a few are popular, the way real traffic
+looks. Runs once without the pool and once with it, and reports first-reply
+latency and the pool's hit rate.
+
+Usage:
+    python -m benchmarks.bench_opening_pool --latency 0.3 --debates 300
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import httpx
+
+from benchmarks.fake_llm import run_fake_llm
+
+TOPICS = [
+    "Climate change is real and urgent",
+    "AI will replace human jobs",
+    "Universal basic income should be adopted",
+    "Remote work is better than office work",
+    "Social media does more harm than good",
+    "Nuclear power is the best path to net zero",
+    "College should be free",
+    "Zoos should be abolished",
+    "Homework should be banned",
+    "Space exploration is worth the cost",
+    "Cities should ban cars from their centres",
+    "Voting should be compulsory",
+]
+
+
+def percentile(values: list, fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(pool_enabled: bool, debates: list, gap: float) -> dict:
+    os.environ["OPENING_POOL_ENABLED"] = "true" if pool_enabled else "false"
+    import fastapi_app
+
+    app = fastapi_app.create_app()
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+        for topic, side in debates:
+            position = "FOR" if side == "pro" else "AGAINST"
+            message = f"Let's debate: {topic}. You argue {position} this position."
+            start = time.perf_counter()
+            response = await http.post("/chat", json={"conversation_id": None, "message": message})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            # Time between arrivals, during which the pool refills
+            await asyncio.sleep(gap)
+
+    pool = fastapi_app.opening_pool
+    stats = pool.stats() if pool is not None else {}
+    if pool is not None:
+        await pool.aclose()
+    await fastapi_app.engine.aclose()
+    return {"latencies": latencies, **stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the opening warm pool")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM latency in seconds")
+    parser.add_argument("--debates", type=int, default=300)
+    parser.add_argument("--gap", type=float, default=0.05, help="Seconds between new debates")
+    parser.add_argument("--zipf", type=float, default=1.2, help="Zipf exponent of topic popularity")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    pairs = [(topic, side) for topic in TOPICS for side in ("pro", "con")]
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(len(pairs))]
+    debates = rng.choices(pairs, weights, k=args.debates)
+
+    with run_fake_llm(latency=args.latency) as base_url:
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        os.environ.setdefault("RATE_LIMIT_REQUESTS_PER_MINUTE", "0")
+        os.environ.setdefault("RATE_LIMIT_TOKENS_PER_MINUTE", "0")
+
+        results = {
+            "no pool": asyncio.run(run(False, debates, args.gap)),
+            "pool": asyncio.run(run(True, debates, args.gap)),
+        }
+
+    print("🚀 Opening warm pool benchmark")
+    print(f"   {args.debates} new debates over {len(pairs)} (topic, side) pairs,")
+    print(f"   fake LLM latency {args.latency * 1000:.0f} ms")
+    print("=" * 50)
+    print(f"{'':<12}{'p50 (ms)':>10}{'p95 (ms)':>10}{'mean (ms)':>11}{'hit rate':>10}")
+    for name, result in results.items():
+        latencies = result["latencies"]
+        served = result.get("hits", 0) + result.get("misses", 0)
+        hit_rate = f"{result['hits'] / served:.0%}" if served else "-"
+        print(
+            f"{name:<12}{percentile(latencies, 0.5) * 1000:>10.1f}"
+            f"{percentile(latencies, 0.95) * 1000:>10.1f}"
+            f"{sum(latencies) / len(latencies) * 1000:>11.1f}{hit_rate:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Redis conversation store.
+
+Plays chat turns the way the API does (load the conversation, append the
+user's and the bot's message) from several threads, against the in-memory
+store and the Redis store, and reports throughput, per-turn latency and
+round-trips per turn. The Redis store talks to the in-process fake server
+unless `--url` points at a real one; the fake shares the benchmark's GIL, so
+its numbers are a pessimistic bound.
+
+Usage:
+    python -m benchmarks.bench_redis_store --turns 20000 --threads 8
+    python -m benchmarks.bench_redis_store --url redis://localhost:6379/15
+"""
+
+import argparse
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+from benchmarks.fake_redis import run_fake_redis
+from debate_core.redis_store import RedisConversationStore
+from debate_core.store import InMemoryConversationStore
+
+USER_TURN = "I think it's just an excuse humans are making because they are lazy."
+BOT_TURN = (
+    "I understand your skepticism, and I appreciate you sharing that perspective. "
+    "However, let me offer a different interpretation of the evidence."
+)
+TURNS_PER_CONVERSATION = 10
+
+
+def percentile(values: list, fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def play(store, turns: int, threads: int) -> dict:
+    conversations = max(1, turns // TURNS_PER_CONVERSATION)
+    ids = [str(uuid.uuid4()) for _ in range(conversations)]
+    for conversation_id in ids:
+        store.put(
+            conversation_id,
+            {"topic": "Climate change is real and urgent", "side": "pro", "history": []},
+        )
+
+    latencies = []
+
+    def run(share: list):
+        mine = []
+        for _ in range(TURNS_PER_CONVERSATION):
+            for conversation_id in share:
+                start = time.perf_counter()
+                store.get(conversation_id)
+                store.append(
+                    conversation_id,
+                    {"role": "user", "message": USER_TURN},
+                    {"role": "bot", "message": BOT_TURN},
+                )
+                mine.append(time.perf_counter() - start)
+        latencies.extend(mine)
+
+    workers = [threading.Thread(target=run, args=(ids[i::threads],)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+    for conversation_id in ids:
+        store.delete(conversation_id)
+    return {"turns": len(latencies), "seconds": seconds, "latencies": latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Redis conversation store")
+    parser.add_argument("--turns", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--max-messages", type=int, default=20, help="History cap in Redis")
+    parser.add_argument("--url", default=None, help="A real Redis server (default: the fake)")
+    args = parser.parse_args()
+
+    results = {}
+    memory = InMemoryConversationStore(max_entries=args.turns, ttl_seconds=None)
+    results["memory"] = play(memory, args.turns, args.threads)
+
+    with nullcontext(args.url) if args.url else run_fake_redis() as url:
+        store = RedisConversationStore(url, max_messages=args.max_messages)
+        round_trips = store.client.round_trips
+        results["redis"] = play(store, args.turns, args.threads)
+        # Setup and cleanup are one round-trip per conversation each
+        conversations = max(1, args.turns // TURNS_PER_CONVERSATION)
+        played = store.client.round_trips - round_trips - 2 * conversations
+        results["redis"]["round_trips"] = played / results["redis"]["turns"]
+        store.close()
+
+    print("🚀 Conversation store benchmark")
+    print(f"   {args.turns:,} turns (load + append two messages) from {args.threads} threads")
+    print(f"   Redis: {args.url or 'in-process fake server'}")
+    print("=" * 60)
+    print(f"{'':<8}{'turns/s':>11}{'p50 (µs)':>11}{'p99 (µs)':>11}{'round-trips/turn':>18}")
+    for name, result in results.items():
+        latencies = result["latencies"]
+        round_trips = f"{result['round_trips']:.1f}" if "round_trips" in result else "-"
+        print(
+            f"{name:<8}{result['turns'] / result['seconds']:>11,.0f}"
+            f"{percentile(latencies, 0.5) * 1e6:>11.0f}{percentile(latencies, 0.99) * 1e6:>11.0f}"
+            f"{round_trips:>18}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark for speculative topic extraction.
+
+Starts new debates through `/chat` with openings the local parser can only
+partly read, so topic extraction needs the LLM. Runs once in sequence
+(extract, then reply) and once speculatively (reply from the local guess
+while extracting), and reports first-reply latency, the misprediction rate
+and the extra LLM calls spent on cancelled replies.
+
+The fake LLM always extracts "the given topic", so `--agree` sets the share of
+openings whose local guess matches its extraction.
+
+Usage:
+    python -m benchmarks.bench_speculation --latency 0.3 --agree 0.8
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import httpx
+
+from benchmarks.fake_llm import FakeLLMState, run_fake_llm
+
+OTHER_TOPICS = ["whether zoos are ethical", "homework", "space tourism", "the four-day week"]
+
+
+def percentile(values: list, fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(speculate: bool, openings: list, state: FakeLLMState) -> dict:
+    import fastapi_app
+    from debate_core.metrics import SPECULATION_SAVED_SECONDS, SPECULATIONS
+
+    app = fastapi_app.create_app()
+    fastapi_app.engine.speculative_extraction = speculate
+    state.requests = 0
+    hits, misses, saved = (
+        SPECULATIONS.get("hit"),
+        SPECULATIONS.get("miss"),
+        SPECULATION_SAVED_SECONDS.get(),
+    )
+
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+        for opening in openings:
+            start = time.perf_counter()
+            response = await http.post("/chat", json={"conversation_id": None, "message": opening})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    await fastapi_app.engine.aclose()
+
+    return {
+        "latencies": latencies,
+        "llm_calls": state.requests,
+        "hits": SPECULATIONS.get("hit") - hits,
+        "misses": SPECULATIONS.get("miss") - misses,
+        "saved": SPECULATION_SAVED_SECONDS.get() - saved,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative extraction")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM latency in seconds")
+    parser.add_argument("--debates", type=int, default=100)
+    parser.add_argument(
+        "--agree", type=float, default=0.8, help="Share of openings the local guess gets right"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    # Topics without a side: the parser guesses the topic, the LLM is asked anyway.
+    # Openings are unique so the extraction memo doesn't answer them.
+    openings = [
+        f"Let's debate the given topic? ({i})"
+        if rng.random() < args.agree
+        else f"Let's debate {rng.choice(OTHER_TOPICS)}? ({i})"
+        for i in range(args.debates)
+    ]
+
+    state = FakeLLMState()
+    with run_fake_llm(latency=args.latency, state=state) as base_url:
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        os.environ.setdefault("RATE_LIMIT_REQUESTS_PER_MINUTE", "0")
+        os.environ.setdefault("RATE_LIMIT_TOKENS_PER_MINUTE", "0")
+        # Exact topics only, so the fake's fixed extraction is what's compared
+        os.environ.setdefault("TOPIC_INDEX_THRESHOLD", "0")
+
+        results = {
+            "sequential": asyncio.run(run(False, openings, state)),
+            "speculative": asyncio.run(run(True, openings, state)),
+        }
+
+    print("🚀 Speculative extraction benchmark")
+    print(f"   {args.debates} new debates, fake LLM latency {args.latency * 1000:.0f} ms,")
+    print(f"   local guess right for ~{args.agree:.0%} of openings")
+    print("=" * 60)
+    print(f"{'':<13}{'p50 (ms)':>10}{'mean (ms)':>11}{'LLM calls':>11}{'mispredicted':>14}")
+    for name, result in results.items():
+        latencies = result["latencies"]
+        guessed = result["hits"] + result["misses"]
+        mispredicted = f"{result['misses'] / guessed:.0%}" if guessed else "-"
+        print(
+            f"{name:<13}{percentile(latencies, 0.5) * 1000:>10.1f}"
+            f"{sum(latencies) / len(latencies) * 1000:>11.1f}"
+            f"{result['llm_calls']:>11}{mispredicted:>14}"
+        )
+    saved = results["speculative"]["saved"]
+    print(f"\nLatency saved by kept speculative replies: {saved:.1f}s in total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the FastAPI service.
+
+Measures two things in fresh interpreters:
+- import time per module for `import fastapi_app`, parsed from
+  `python -X importtime`, with a check that heavy dependencies (the OpenAI
+  SDK, llama-index, Streamlit) are not imported at startup
+- wall time from launching uvicorn to the first successful `/health`,
+  checked against a budget
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 500 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_llm import find_free_port
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must only be imported on first use
+LAZY_MODULES = ("openai", "llama_index", "streamlit")
+
+
+def parse_importtime(stderr: str) -> list:
+    """Parse `-X importtime` output into (module, self_us, cumulative_us) tuples"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def import_profile(module: str) -> list:
+    """Import `module` in a fresh interpreter and return its import times"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def time_to_health(timeout: float = 30.0) -> float:
+    """Seconds from launching uvicorn to the first 200 from /health"""
+    port = find_free_port()
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-fake")}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "--factory", "fastapi_app:create_app",
+            "--port", str(port), "--log-level", "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as http:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if http.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+        raise RuntimeError(f"/health did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API cold start")
+    parser.add_argument("--runs", type=int, default=5, help="Server launches to time")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument(
+        "--budget-ms", type=float, default=500, help="Budget for the first /health"
+    )
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    modules = import_profile("fastapi_app")
+    total_ms = modules[-1][2] / 1000 if modules else 0.0
+    eager_heavy = sorted(
+        {name for name, _, _ in modules if name.split(".")[0] in LAZY_MODULES}
+    )
+
+    print("🚀 API cold-start benchmark")
+    print("=" * 50)
+    print(f"import fastapi_app: {total_ms:.0f} ms")
+    print(f"\n{'cumulative ms':>14} {'self ms':>8}  module")
+    top_level = [m for m in modules if "." not in m[0]]
+    for name, self_us, cumulative_us in sorted(top_level, key=lambda m: -m[2])[: args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    if eager_heavy:
+        print(f"\n❌ Imported at startup but should be lazy: {', '.join(eager_heavy)}")
+    else:
+        print(f"\n✅ Not imported at startup: {', '.join(LAZY_MODULES)}")
+
+    health_ms = [time_to_health() * 1000 for _ in range(args.runs)]
+    median_ms = statistics.median(health_ms)
+    within_budget = median_ms <= args.budget_ms
+    print(
+        f"\nlaunch to first /health: median {median_ms:.0f} ms "
+        f"(min {min(health_ms):.0f}, max {max(health_ms):.0f}) over {args.runs} runs"
+    )
+    print(f"{'✅' if within_budget else '❌'} budget {args.budget_ms:.0f} ms")
+
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps(
+                {
+                    "benchmark": "startup",
+                    "import_ms": round(total_ms, 1),
+                    "modules": [
+                        {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cum / 1000}
+                        for name, self_us, cum in modules
+                    ],
+                    "eager_heavy_modules": eager_heavy,
+                    "health_ms": [round(ms, 1) for ms in health_ms],
+                    "health_median_ms": round(median_ms, 1),
+                    "budget_ms": args.budget_ms,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+
+    return 0 if within_budget and not eager_heavy else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
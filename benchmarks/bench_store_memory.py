@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the in-memory conversation store.
+
+Fills the store with short debates and reports the traced Python heap, plus
+get/put latency, so changes to the conversation representation can be
+compared run to run. Each run compares compact `TurnLog` histories with
+histories of plain `{"role": ..., "message": ...}` dicts, as they used to be
+stored.
+
+Usage:
+    python -m benchmarks.bench_store_memory --conversations 100000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+
+from debate_core.store import InMemoryConversationStore
+
+USER_TURN = "I think it's just an excuse humans are making because they are lazy."
+BOT_TURN = (
+    "I understand your skepticism, and I appreciate you sharing that perspective. "
+    "However, let me offer a different interpretation of the evidence."
+)
+
+
+class DictHistoryStore(InMemoryConversationStore):
+    """The store keeping histories as lists of message dicts"""
+
+    history_type = list
+
+
+def measure(store_class, ids: list, turns: int) -> dict:
+    """Fill a store with `turns` exchanges per conversation and measure it"""
+    store = store_class(max_entries=len(ids), ttl_seconds=None)
+
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+
+    start = time.perf_counter()
+    for conversation_id in ids:
+        store.put(
+            conversation_id,
+            {"topic": "Climate change is real and urgent", "side": "pro", "history": []},
+        )
+        for _ in range(turns):
+            # Fresh strings per turn, as they would arrive from requests
+            store.append(
+                conversation_id,
+                {"role": "user", "message": "".join(USER_TURN)},
+                {"role": "bot", "message": "".join(BOT_TURN)},
+            )
+    put_seconds = time.perf_counter() - start
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for conversation_id in ids:
+        store.get(conversation_id)
+    get_seconds = time.perf_counter() - start
+
+    # The message text itself, which no representation can avoid
+    text = len(ids) * turns * (len(USER_TURN) + len(BOT_TURN) + 2 * 49)
+    return {
+        "used": current - baseline,
+        "peak": peak - baseline,
+        "overhead": current - baseline - text,
+        "put_us": put_seconds / len(ids) * 1e6,
+        "get_us": get_seconds / len(ids) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark conversation store memory")
+    parser.add_argument("--conversations", type=int, default=100_000)
+    parser.add_argument(
+        "--turns", type=int, default=2, help="User/bot exchanges per conversation"
+    )
+    args = parser.parse_args()
+
+    ids = [str(uuid.uuid4()) for _ in range(args.conversations)]
+    results = {
+        "dicts": measure(DictHistoryStore, ids, args.turns),
+        "turnlog": measure(InMemoryConversationStore, ids, args.turns),
+    }
+
+    messages = args.conversations * args.turns * 2
+    print("🚀 Conversation store memory benchmark")
+    print("=" * 50)
+    print(f"conversations:       {args.conversations:,}")
+    print(f"messages each:       {args.turns * 2}")
+    print(f"\n{'':<22}{'dicts':>12}{'turnlog':>12}")
+    rows = [
+        ("heap used (MiB)", lambda r: r["used"] / 1024 / 1024, ".1f"),
+        ("peak heap (MiB)", lambda r: r["peak"] / 1024 / 1024, ".1f"),
+        ("bytes/conversation", lambda r: r["used"] / args.conversations, ",.0f"),
+        ("non-text bytes/msg", lambda r: r["overhead"] / messages, ",.0f"),
+        ("put+append (µs/conv)", lambda r: r["put_us"], ".2f"),
+        ("get (µs/op)", lambda r: r["get_us"], ".2f"),
+    ]
+    for label, value, spec in rows:
+        print(
+            f"{label:<22}{value(results['dicts']):>12{spec}}{value(results['turnlog']):>12{spec}}"
+        )
+
+    saved = 1 - results["turnlog"]["used"] / results["dicts"]["used"]
+    print(f"\nTurnLog saves {saved:.0%} of the heap")
+
+
+if __name__ == "__main__":
+    main()
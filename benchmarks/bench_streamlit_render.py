@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Rerun benchmark for the Streamlit debate history.
+
+Runs `streamlit_app.py` headlessly with Streamlit's AppTest at increasing
+debate lengths and reports the median rerun time. With windowed rendering it
+should stay flat as the debate grows. Two columns for comparison:
+- "all pages": the windowed renderer with the whole history paged in
+- "per message": the app as it was before windowing, one `st.markdown`
+  element per message (the app's source with its history block swapped for
+  the old loop)
+
+Usage:
+    python -m benchmarks.bench_streamlit_render --lengths 10,100,500 --reruns 5
+"""
+
+import argparse
+import os
+import re
+import statistics
+import time
+
+import streamlit.testing.v1.local_script_runner as local_script_runner
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.bench_store_memory import BOT_TURN, USER_TURN
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "streamlit_app.py")
+
+# The app's history rendering, from the container to the spacing after it
+WINDOWED_BLOCK = re.compile(
+    r"^    with messages_container:\n.*?(?=^    # Add some spacing)", re.MULTILINE | re.DOTALL
+)
+
+# How the history was rendered before windowing: every message, every rerun
+PER_MESSAGE_BLOCK = """    with messages_container:
+        for msg in st.session_state["messages"]:
+            role, message_text = msg["role"], msg["message"]
+            css_class = "user-message" if role == "user" else "bot-message"
+            speaker = "👤 You:" if role == "user" else "🤖 DebateBot:"
+            st.markdown(
+                f\"\"\"
+            <div class="message-animation">
+                <div class="{css_class}">
+                    <strong>{speaker}</strong><br>
+                    {message_text}
+                </div>
+            </div>
+            \"\"\",
+                unsafe_allow_html=True,
+            )
+
+"""
+
+
+def per_message_source() -> str:
+    with open(APP_FILE, encoding="utf-8") as f:
+        source = f.read()
+    source, replaced = WINDOWED_BLOCK.subn(lambda _: PER_MESSAGE_BLOCK, source)
+    if replaced != 1:
+        raise RuntimeError("Could not find the history rendering block in streamlit_app.py")
+    return source
+
+
+def require_widgets_deltas(runner, timeout: float = 3):
+    """AppTest's wait for the script to finish, joining its thread instead of polling"""
+    runner._script_thread.join(timeout)
+    if runner._script_thread.is_alive():
+        raise RuntimeError(f"Script did not finish within {timeout}s")
+
+
+# AppTest polls every 100 ms, which would round every rerun up to that
+local_script_runner.require_widgets_deltas = require_widgets_deltas
+
+
+def make_messages(length: int) -> list:
+    return [
+        {"role": "user", "message": f"{USER_TURN} ({i})"}
+        if i % 2 == 0
+        else {"role": "assistant", "message": f"{BOT_TURN} ({i})"}
+        for i in range(length)
+    ]
+
+
+def median_rerun_ms(length: int, reruns: int, mode: str) -> float:
+    """
+    Median time of `reruns` reruns with `length` messages in the history.
+
+    `mode` is "windowed", "all pages" or "per message" (see above).
+    """
+    if mode == "per message":
+        app = AppTest.from_string(per_message_source(), default_timeout=60)
+    else:
+        app = AppTest.from_file(APP_FILE, default_timeout=60)
+    app.session_state["conversation_id"] = "bench"
+    app.session_state["messages"] = make_messages(length)
+    if mode == "all pages":
+        app.session_state["history_pages"] = length + 1
+    app.run()
+    if mode == "per message":
+        assert len(app.markdown) >= length, "the baseline should render every message"
+
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        timings.append((time.perf_counter() - start) * 1000)
+        assert not app.exception, app.exception
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Streamlit history reruns")
+    parser.add_argument(
+        "--lengths",
+        type=lambda value: [int(length) for length in value.split(",")],
+        default=[10, 50, 100, 250, 500],
+        help="Comma-separated debate lengths in messages",
+    )
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns per length")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+    print("🚀 Streamlit history rerun benchmark")
+    print("=" * 56)
+    modes = ("windowed", "all pages", "per message")
+    print(f"{'messages':>10}" + "".join(f"{mode + ' ms':>15}" for mode in modes))
+    for length in args.lengths:
+        timings = [median_rerun_ms(length, args.reruns, mode) for mode in modes]
+        print(f"{length:>10}" + "".join(f"{timing:>15.1f}" for timing in timings))
+
+
+if __name__ == "__main__":
+    main()
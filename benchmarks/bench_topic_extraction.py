@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark for topic/side extraction on new conversations.
+
+Runs a corpus of opening messages through the engine's topic extraction
+against a local fake LLM, once with the local fast-path parser and once forcing every
+message through the LLM, and reports the fast-path hit rate and the
+latency it saves.
+
+Usage:
+    python -m benchmarks.bench_topic_extraction --latency 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from benchmarks.fake_llm import run_fake_llm
+from debate_core.engine import DebateEngine
+from debate_core.topic_parser import ExtractionMemo, parse_topic_and_side
+
+CORPUS = Path(__file__).parent / "data" / "opening_messages.txt"
+
+
+async def time_extractions(engine: DebateEngine, messages: list) -> float:
+    """Return total seconds to extract every message, without memoization"""
+    # Build the client up front so its import time isn't charged to a message
+    engine.async_client
+
+    total = 0.0
+    for message in messages:
+        engine.extraction_memo = ExtractionMemo()
+        start = time.perf_counter()
+        await engine.aextract_topic_and_side(message)
+        total += time.perf_counter() - start
+
+    await engine.aclose()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark topic extraction")
+    parser.add_argument(
+        "--latency", type=float, default=0.3, help="Fake LLM latency in seconds"
+    )
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    args = parser.parse_args()
+
+    messages = [line for line in args.corpus.read_text().splitlines() if line.strip()]
+
+    with run_fake_llm(latency=args.latency) as base_url:
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+        engine = DebateEngine.from_env()
+        threshold = engine.topic_fast_path_min_confidence
+        hits = sum(
+            parse_topic_and_side(message).confidence >= threshold for message in messages
+        )
+
+        with_fast_path = asyncio.run(time_extractions(engine, messages))
+        engine.topic_fast_path_min_confidence = float("inf")
+        llm_only = asyncio.run(time_extractions(engine, messages))
+
+    count = len(messages)
+    print("🚀 Topic extraction benchmark")
+    print("=" * 50)
+    print(f"opening messages:      {count}")
+    print(f"fast-path hit rate:    {hits / count:.0%} ({hits}/{count})")
+    print(f"LLM only:              {llm_only / count * 1000:.1f} ms/message")
+    print(f"with fast path:        {with_fast_path / count * 1000:.1f} ms/message")
+    print(f"latency saved:         {(llm_only - with_fast_path) / count * 1000:.1f} ms/message")
+
+
+if __name__ == "__main__":
+    main()
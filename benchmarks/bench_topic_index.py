@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the canonical topic index.
+
+Inserts synthetic topics (3 to 6 content words drawn from a large vocabulary)
+and then looks up two kinds of query:
+- paraphrases of inserted topics: reframed, with a plural added, which
+  should match
+- unseen topics, which should not
+
+Reports insert throughput, lookup latency percentiles, match rates and the
+index's NumPy memory.
+
+Usage:
+    python -m benchmarks.bench_topic_index --topics 1000000
+"""
+
+import argparse
+import random
+import string
+import time
+
+from debate_core.topic_index import TopicIndex
+
+FRAMES = ("{}", "Should {}?", "Is it {}?", "We should debate whether {}", "{}, or is it?")
+# Word endings that stemming leaves alone, so adding an "s" is always undone
+ENDINGS = "bcdfgklmnprt"
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list:
+    words = set()
+    while len(words) < size:
+        stem = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 8)))
+        words.add(stem + rng.choice(ENDINGS))
+    return sorted(words)
+
+
+def make_topic(vocabulary: list, rng: random.Random) -> list:
+    return rng.sample(vocabulary, rng.randint(3, 6))
+
+
+def paraphrase(words: list, rng: random.Random) -> str:
+    words = list(words)
+    index = rng.randrange(len(words))
+    words[index] += "s"
+    return rng.choice(FRAMES).format(" the ".join(words))
+
+
+def percentile(values: list, fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the topic index")
+    parser.add_argument("--topics", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    topics = [make_topic(vocabulary, rng) for _ in range(args.topics)]
+
+    index = TopicIndex(threshold=args.threshold, max_topics=args.topics)
+    start = time.perf_counter()
+    for words in topics:
+        index.add(" ".join(words))
+    insert_seconds = time.perf_counter() - start
+
+    def run(queries: list) -> tuple:
+        latencies, matches = [], []
+        for query, expected in queries:
+            start = time.perf_counter()
+            match = index.lookup(query)
+            latencies.append(time.perf_counter() - start)
+            matches.append(match is not None and (expected is None or match.topic == expected))
+        return latencies, sum(matches) / len(matches)
+
+    known = [
+        (paraphrase(words, rng), " ".join(words))
+        for words in rng.sample(topics, min(args.queries, len(topics)))
+    ]
+    unseen = [(" ".join(make_topic(vocabulary, rng)), None) for _ in range(args.queries)]
+    known_latencies, recall = run(known)
+    unseen_latencies, false_matches = run(unseen)
+    latencies = known_latencies + unseen_latencies
+
+    stats = index.stats()
+    print("🚀 Topic index benchmark")
+    print("=" * 50)
+    print(f"canonical topics:     {stats['topics']:,} (of {args.topics:,} inserted)")
+    print(f"insert:               {args.topics / insert_seconds:,.0f} topics/s")
+    print(f"lookup p50:           {percentile(latencies, 0.5) * 1e6:.0f} µs")
+    print(f"lookup p99:           {percentile(latencies, 0.99) * 1e6:.0f} µs")
+    print(f"paraphrases matched:  {recall:.1%}")
+    print(f"unseen matched:       {false_matches:.2%}")
+    print(f"index memory:         {stats['index_bytes'] / 1024 / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the write-ahead-log conversation store.
+
+Appends chat turns (one user and one bot message each, one log record) with
+each sync mode and reports throughput and log size, then measures recovery
+time from the log alone and from a snapshot plus a short log tail.
+
+"always" makes every append wait for its fsync, so it runs with concurrent
+writers (as requests would) and fewer turns; the fsyncs column shows how
+many appends each fsync covered.
+
+Eviction is off: every conversation written is kept.
+
+Usage:
+    python -m benchmarks.bench_wal --turns 1000000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from debate_core.wal_store import WalConversationStore
+
+USER_TURN = "I think it's just an excuse humans are making because they are lazy."
+BOT_TURN = (
+    "I understand your skepticism, and I appreciate you sharing that perspective. "
+    "However, let me offer a different interpretation of the evidence."
+)
+TURNS_PER_CONVERSATION = 10
+UNBOUNDED = {"snapshot_every": 10**12, "max_entries": 10**9, "ttl_seconds": None}
+
+
+def directory_bytes(directory: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    )
+
+
+def fill(store, turns: int, writers: int = 1) -> float:
+    """Append `turns` turns spread over conversations; return the seconds taken"""
+    conversations = max(1, turns // TURNS_PER_CONVERSATION)
+    ids = [str(uuid.uuid4()) for _ in range(conversations)]
+    for conversation_id in ids:
+        store.put(
+            conversation_id,
+            {"topic": "Climate change is real and urgent", "side": "pro", "history": []},
+        )
+
+    def write(share: list):
+        for conversation_id in share:
+            for _ in range(TURNS_PER_CONVERSATION):
+                store.append(
+                    conversation_id,
+                    {"role": "user", "message": USER_TURN},
+                    {"role": "bot", "message": BOT_TURN},
+                )
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=write, args=(ids[i::writers],)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.wal.flush()
+    return time.perf_counter() - start
+
+
+def bench_append(root: str, sync: str, turns: int, writers: int) -> dict:
+    directory = os.path.join(root, sync)
+    store = WalConversationStore(directory, sync=sync, **UNBOUNDED)
+    seconds = fill(store, turns, writers)
+    store.close()
+    size = directory_bytes(directory)
+    shutil.rmtree(directory)
+    return {
+        "turns": turns,
+        "writers": writers,
+        "seconds": seconds,
+        "bytes": size,
+        "fsyncs": store.wal.fsyncs,
+    }
+
+
+def bench_recovery(root: str, turns: int, tail: int) -> dict:
+    """Recovery from the whole log, and from a snapshot plus `tail` turns"""
+    directory = os.path.join(root, "recovery")
+    store = WalConversationStore(directory, sync="none", **UNBOUNDED)
+    fill(store, turns)
+    store.close()
+
+    start = time.perf_counter()
+    store = WalConversationStore(directory, sync="none", **UNBOUNDED)
+    log_only = time.perf_counter() - start
+    replayed = store.recovery["replayed_records"]
+
+    start = time.perf_counter()
+    store.snapshot()
+    snapshot_seconds = time.perf_counter() - start
+    fill(store, tail)
+    store.close()
+
+    start = time.perf_counter()
+    store = WalConversationStore(directory, sync="none", **UNBOUNDED)
+    with_snapshot = time.perf_counter() - start
+    result = {
+        "log_only": log_only,
+        "log_records": replayed,
+        "snapshot_write": snapshot_seconds,
+        "with_snapshot": with_snapshot,
+        "tail_records": store.recovery["replayed_records"],
+        "conversations": store.recovery["conversations"],
+    }
+    store.close()
+    shutil.rmtree(directory)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the WAL conversation store")
+    parser.add_argument("--turns", type=int, default=1_000_000)
+    parser.add_argument(
+        "--always-turns", type=int, default=20_000, help='Turns for sync="always"'
+    )
+    parser.add_argument("--writers", type=int, default=32, help='Writers for sync="always"')
+    parser.add_argument("--tail", type=int, default=10_000, help="Turns after the snapshot")
+    parser.add_argument("--dir", default=None, help="Where to write (default: a temp dir)")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(dir=args.dir)
+    try:
+        print("🚀 Write-ahead log benchmark")
+        print("=" * 70)
+        print(
+            f"{'sync':<8}{'turns':>11}{'writers':>9}{'turns/s':>12}{'µs/turn':>10}"
+            f"{'MiB':>9}{'fsyncs':>10}"
+        )
+        for sync, turns, writers in (
+            ("none", args.turns, 1),
+            ("batch", args.turns, 1),
+            ("always", args.always_turns, args.writers),
+        ):
+            r = bench_append(root, sync, turns, writers)
+            print(
+                f"{sync:<8}{r['turns']:>11,}{r['writers']:>9}{r['turns'] / r['seconds']:>12,.0f}"
+                f"{r['seconds'] / r['turns'] * 1e6:>10.1f}{r['bytes'] / 1024 / 1024:>9.1f}"
+                f"{r['fsyncs']:>10,}"
+            )
+
+        r = bench_recovery(root, args.turns, args.tail)
+        print(f"\nRecovery of {r['conversations']:,} conversations")
+        print(f"  log only:         {r['log_only']:.2f}s ({r['log_records']:,} records)")
+        print(f"  snapshot write:   {r['snapshot_write']:.2f}s")
+        print(f"  snapshot + tail:  {r['with_snapshot']:.2f}s ({r['tail_records']:,} records)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
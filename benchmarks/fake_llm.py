@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Local fake LLM server for DebateBot benchmarks.
+
+Serves an OpenAI-compatible `/v1/chat/completions` endpoint that sleeps for a
+fixed or randomly distributed latency before answering (and then streams word
+by word at a set token rate when asked to), so load tests can exercise the
+real OpenAI SDK without spending API credits. A `FakeLLMState` can inject
+scripted or random failures and stalls and records request counts, which the
+resilience tests and the load harness use.
+
+Usage:
+    python -m benchmarks.fake_llm --latency lognormal:0.3,0.5 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Callable, Optional, Union
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_REPLY = (
+    "That's an interesting point, and I can see why you might think that. "
+    "However, when we consider the evidence more carefully, the picture changes. "
+    "Have you considered how the strongest studies on this question were designed?"
+)
+EXTRACTION_REPLY = "TOPIC: the given topic\nSIDE: pro"
+
+# Seconds, or a function sampling seconds from a distribution
+Latency = Union[float, Callable[[], float]]
+
+
+def parse_latency(spec: str) -> Latency:
+    """
+    Parse a latency spec: seconds ("0.2") or a distribution.
+
+    Distributions are "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+    "lognormal:MEDIAN,SIGMA" and "exponential:MEAN"; samples are clamped at 0.
+    """
+    if ":" not in spec:
+        return float(spec)
+
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",")]
+    samplers = {
+        "uniform": lambda low, high: lambda: random.uniform(low, high),
+        "normal": lambda mean, stddev: lambda: random.gauss(mean, stddev),
+        "lognormal": lambda median, sigma: lambda: median * random.lognormvariate(0, sigma),
+        "exponential": lambda mean: lambda: random.expovariate(1 / mean),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution {kind!r}")
+    sample = samplers[kind](*values)
+    return lambda: max(0.0, sample())
+
+
+def sample_latency(latency: Latency) -> float:
+    return latency() if callable(latency) else latency
+
+
+class FakeLLMState:
+    """
+    Failure script and counters shared with a running fake LLM.
+
+    Each request pops the next entry of `failures`: an int answers with that
+    HTTP status (429s carry `retry_after` as a Retry-After header), a float
+    stalls the response by that many extra seconds. Once the queue is empty,
+    each request fails with probability `error_rate`, using one of
+    `error_statuses`. `models` counts requests per requested model.
+    """
+
+    def __init__(
+        self,
+        failures=(),
+        retry_after: Optional[float] = None,
+        error_rate: float = 0.0,
+        error_statuses=(429, 500, 503),
+    ):
+        self.failures = deque(failures)
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.models = Counter()
+
+    def next_failure(self):
+        if self.failures:
+            return self.failures.popleft()
+        if self.error_rate and random.random() < self.error_rate:
+            return random.choice(self.error_statuses)
+        return None
+
+
+def error_response(status: int, retry_after: Optional[float]) -> JSONResponse:
+    """An OpenAI-style error body with the given status"""
+    headers = {}
+    if status == 429 and retry_after is not None:
+        headers["Retry-After"] = str(retry_after)
+    return JSONResponse(
+        {"error": {"message": f"Injected failure {status}", "type": "fake_error"}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def stream_chunks(completion_id: str, model: str, content: str, token_delay: float):
+    """Yield an OpenAI-style SSE completion stream, one word per chunk"""
+
+    async def generate():
+        words = content.split(" ")
+        for index, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"content": word if index == 0 else " " + word},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(token_delay)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+
+def create_fake_llm_app(
+    latency: Latency = 0.2,
+    token_delay: float = 0.01,
+    state: Optional[FakeLLMState] = None,
+    simulate_generation: bool = False,
+) -> FastAPI:
+    """
+    Create the fake OpenAI-compatible app.
+
+    `latency` is the time to first token. Streamed replies then take
+    `token_delay` per word; with `simulate_generation`, non-streamed replies
+    wait for that generation time too, as a real model would.
+    """
+    app = FastAPI(title="Fake LLM")
+    state = state or FakeLLMState()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        state.requests += 1
+        state.in_flight += 1
+        state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+        try:
+            return await answer(request)
+        finally:
+            state.in_flight -= 1
+
+    async def answer(request: Request):
+        body = await request.json()
+        state.models[body.get("model")] += 1
+        failure = state.next_failure()
+        if isinstance(failure, int):
+            state.errors += 1
+            return error_response(failure, state.retry_after)
+        await asyncio.sleep(sample_latency(latency) + (failure or 0))
+
+        # Answer topic extraction prompts in the format the bot parses
+        last_message = body["messages"][-1]["content"]
+        content = EXTRACTION_REPLY if "TOPIC:" in last_message else CANNED_REPLY
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "fake-model")
+
+        if body.get("stream"):
+            return stream_chunks(completion_id, model, content, token_delay)
+        if simulate_generation:
+            await asyncio.sleep(token_delay * len(content.split(" ")))
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": len(content.split()),
+                "total_tokens": len(content.split()),
+            },
+        }
+
+    return app
+
+
+def find_free_port() -> int:
+    """Ask the OS for an unused local TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_fake_llm(
+    latency: Latency = 0.2,
+    token_delay: float = 0.01,
+    port: Optional[int] = None,
+    state: Optional[FakeLLMState] = None,
+    simulate_generation: bool = False,
+):
+    """Run the fake LLM server in a background thread and yield its base URL"""
+    port = port or find_free_port()
+    config = uvicorn.Config(
+        create_fake_llm_app(latency, token_delay, state, simulate_generation),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        limit_concurrency=10_000,
+        backlog=4096,
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    while not server.started:
+        time.sleep(0.01)
+
+    try:
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument(
+        "--latency",
+        default="0.2",
+        help="Seconds to first token, or a distribution such as lognormal:0.3,0.5",
+    )
+    parser.add_argument(
+        "--tokens-per-second",
+        type=float,
+        default=100,
+        help="Generation rate of streamed (and, with --simulate-generation, all) replies",
+    )
+    parser.add_argument(
+        "--simulate-generation",
+        action="store_true",
+        help="Make non-streamed replies wait for their generation time too",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with a 429/500/503",
+    )
+    args = parser.parse_args()
+
+    print(f"🤖 Fake LLM listening on http://127.0.0.1:{args.port}/v1")
+    uvicorn.run(
+        create_fake_llm_app(
+            parse_latency(args.latency),
+            1 / args.tokens_per_second,
+            FakeLLMState(error_rate=args.error_rate),
+            args.simulate_generation,
+        ),
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
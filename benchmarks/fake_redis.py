@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Local fake Redis server for DebateBot tests and benchmarks.
+
+Speaks RESP over TCP and implements the commands the Redis conversation
+store uses (strings are not among them) on plain Python dicts, lists and
+sorted-set dicts, with lazy key expiry. Each connection is served by its own
+thread and commands run one at a time under a lock, as in Redis. A
+`FakeRedisState` records how often each command ran.
+
+Usage:
+    python -m benchmarks.fake_redis --port 6379
+"""
+
+import argparse
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from benchmarks.fake_llm import find_free_port
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+class CommandError(Exception):
+    """Sent to the client as an error reply"""
+
+
+class FakeRedisState:
+    """Command counts the tests and benchmarks read"""
+
+    def __init__(self):
+        self.commands = Counter()
+
+
+class FakeRedis:
+    """The keyspace and command implementations"""
+
+    def __init__(self, state: FakeRedisState = None, clock=time.monotonic):
+        self.state = state or FakeRedisState()
+        self.clock = clock
+        self.data = {}
+        self.expires = {}  # key -> deadline
+        self.lock = threading.Lock()
+
+    def _live(self, key: bytes):
+        deadline = self.expires.get(key)
+        if deadline is not None and self.clock() >= deadline:
+            del self.data[key]
+            del self.expires[key]
+        return self.data.get(key)
+
+    def _get(self, key: bytes, kind: type, create: bool = False):
+        value = self._live(key)
+        if value is None:
+            if not create:
+                return None
+            value = self.data[key] = kind()
+        elif not isinstance(value, kind):
+            raise CommandError(WRONGTYPE)
+        return value
+
+    def _delete(self, key: bytes) -> bool:
+        self.expires.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+    def _drop_if_empty(self, key: bytes, value):
+        if not value:
+            self._delete(key)
+
+    def call(self, args: list):
+        name = args[0].decode("ascii", "replace").upper()
+        handler = getattr(self, "cmd_" + name.lower(), None)
+        if handler is None:
+            raise CommandError(f"ERR unknown command '{name}'")
+        self.state.commands[name] += 1
+        try:
+            return handler(*args[1:])
+        except TypeError:
+            raise CommandError(f"ERR wrong number of arguments for '{name.lower()}' command")
+
+    # --- Connection ---
+
+    def cmd_ping(self, message: bytes = None):
+        return "PONG" if message is None else message
+
+    def cmd_auth(self, *credentials):
+        return "OK"
+
+    def cmd_select(self, db: bytes):
+        return "OK"
+
+    def cmd_flushall(self):
+        self.data.clear()
+        self.expires.clear()
+        return "OK"
+
+    # --- Keys ---
+
+    def cmd_del(self, *keys):
+        return sum(self._delete(key) for key in keys if self._live(key) is not None)
+
+    def cmd_exists(self, *keys):
+        return sum(self._live(key) is not None for key in keys)
+
+    def cmd_pexpire(self, key: bytes, milliseconds: bytes):
+        if self._live(key) is None:
+            return 0
+        self.expires[key] = self.clock() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_expire(self, key: bytes, seconds: bytes):
+        return self.cmd_pexpire(key, int(seconds) * 1000)
+
+    def cmd_dbsize(self):
+        return sum(self._live(key) is not None for key in list(self.data))
+
+    # --- Hashes ---
+
+    def cmd_hset(self, key: bytes, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise TypeError
+        value = self._get(key, dict, create=True)
+        created = 0
+        for field, item in zip(pairs[::2], pairs[1::2]):
+            created += field not in value
+            value[field] = item
+        return created
+
+    def cmd_hget(self, key: bytes, field: bytes):
+        value = self._get(key, dict)
+        return value.get(field) if value else None
+
+    def cmd_hgetall(self, key: bytes):
+        value = self._get(key, dict) or {}
+        return [part for pair in value.items() for part in pair]
+
+    # --- Lists ---
+
+    def cmd_rpush(self, key: bytes, *items):
+        if not items:
+            raise TypeError
+        value = self._get(key, list, create=True)
+        value.extend(items)
+        return len(value)
+
+    def cmd_llen(self, key: bytes):
+        return len(self._get(key, list) or ())
+
+    @staticmethod
+    def _range(length: int, start: bytes, stop: bytes) -> range:
+        start, stop = int(start), int(stop)
+        if start < 0:
+            start = max(0, length + start)
+        if stop < 0:
+            stop += length
+        return range(start, min(stop, length - 1) + 1)
+
+    def cmd_lrange(self, key: bytes, start: bytes, stop: bytes):
+        value = self._get(key, list) or []
+        span = self._range(len(value), start, stop)
+        return value[span.start : span.stop]
+
+    def cmd_ltrim(self, key: bytes, start: bytes, stop: bytes):
+        value = self._get(key, list)
+        if value is not None:
+            span = self._range(len(value), start, stop)
+            value[:] = value[span.start : span.stop]
+            self._drop_if_empty(key, value)
+        return "OK"
+
+    # --- Sorted sets (scores only; members aren't kept in order) ---
+
+    def cmd_zadd(self, key: bytes, *args):
+        flags = set()
+        while args and args[0].upper() in (b"NX", b"XX"):
+            flags.add(args[0].upper())
+            args = args[1:]
+        if not args or len(args) % 2:
+            raise TypeError
+        value = self._get(key, dict, create=b"XX" not in flags)
+        if value is None:
+            return 0
+        added = 0
+        for score, member in zip(args[::2], args[1::2]):
+            exists = member in value
+            if (b"XX" in flags and not exists) or (b"NX" in flags and exists):
+                continue
+            added += not exists
+            value[member] = float(score)
+        self._drop_if_empty(key, value)
+        return added
+
+    def cmd_zrem(self, key: bytes, *members):
+        value = self._get(key, dict)
+        if value is None:
+            return 0
+        removed = sum(value.pop(member, None) is not None for member in members)
+        self._drop_if_empty(key, value)
+        return removed
+
+    def cmd_zcard(self, key: bytes):
+        return len(self._get(key, dict) or ())
+
+    def cmd_zremrangebyscore(self, key: bytes, low: bytes, high: bytes):
+        value = self._get(key, dict)
+        if value is None:
+            return 0
+        low, high = float(low), float(high)
+        doomed = [member for member, score in value.items() if low <= score <= high]
+        for member in doomed:
+            del value[member]
+        self._drop_if_empty(key, value)
+        return len(doomed)
+
+
+def encode_reply(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, CommandError):
+        return b"-%b\r\n" % str(reply).encode("utf-8")
+    if isinstance(reply, str):
+        return b"+%b\r\n" % reply.encode("utf-8")
+    if isinstance(reply, (bool, int)):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%b\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode_reply(item) for item in reply)
+
+
+def read_command(reader) -> list:
+    """One command's arguments, or None when the client disconnects"""
+    line = reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, as typed into telnet
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        length = int(reader.readline()[1:])
+        args.append(reader.read(length + 2)[:-2])
+    return args
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        # Pipelined replies go out one write each; don't let Nagle hold them
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        fake = self.server.fake
+        while True:
+            args = read_command(self.rfile)
+            if args is None:
+                return
+            if not args:
+                continue
+            with fake.lock:
+                try:
+                    reply = encode_reply(fake.call(args))
+                except CommandError as e:
+                    reply = encode_reply(e)
+            self.wfile.write(reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple, fake: FakeRedis):
+        super().__init__(address, FakeRedisHandler)
+        self.fake = fake
+
+
+@contextmanager
+def run_fake_redis(port: int = None, state: FakeRedisState = None):
+    """Run the fake Redis server in a background thread and yield its URL"""
+    port = port or find_free_port()
+    server = FakeRedisServer(("127.0.0.1", port), FakeRedis(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"redis://127.0.0.1:{port}/0"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Redis server")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+
+    server = FakeRedisServer(("127.0.0.1", args.port), FakeRedis())
+    print(f"🚀 Fake Redis listening on redis://127.0.0.1:{args.port}/0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
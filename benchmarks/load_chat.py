@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Load-test harness for the FastAPI `/chat` endpoint.
+
+Plays many concurrent multi-turn debates through `/chat` against the local
+fake LLM (so no OpenAI credits are spent) and records latency percentiles,
+throughput, errors and process memory. Results are written as a JSON report
+that later runs can be compared against to catch regressions.
+
+Usage:
+    python -m benchmarks.load_chat --debates 200 --concurrency 50 --output run.json
+    python -m benchmarks.load_chat --compare run.json --tolerance 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.fake_llm import FakeLLMState, parse_latency, run_fake_llm
+
+OPENINGS_FILE = Path(__file__).parent / "data" / "opening_messages.txt"
+
+REPLIES = [
+    "I'm not convinced. What about the costs?",
+    "That evidence seems cherry-picked to me.",
+    "Fine, but most people would disagree with you.",
+    "Can you give me a concrete example?",
+]
+
+APOLOGY_PREFIX = "I apologize, but I'm having trouble generating a response"
+
+# Report metrics compared between runs, and whether bigger is better
+COMPARED_METRICS = {
+    "requests_per_second": True,
+    "latency_ms.p50": False,
+    "latency_ms.p95": False,
+    "latency_ms.p99": False,
+    "memory_mb.peak": False,
+}
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        # No procfs (e.g. macOS): fall back to the peak, reported in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / 1024
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class LoadRecorder:
+    """Collects per-request outcomes and samples memory while the load runs"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.llm_errors = 0
+        self.memory_start = rss_mb()
+        self.memory_peak = self.memory_start
+
+    async def sample_memory(self, interval: float = 0.1):
+        while True:
+            self.memory_peak = max(self.memory_peak, rss_mb())
+            await asyncio.sleep(interval)
+
+
+async def run_debate(http, recorder: LoadRecorder, opening: str, turns: int):
+    """Play one debate: the opening and then `turns - 1` replies"""
+    conversation_id = None
+    for turn in range(turns):
+        message = opening if turn == 0 else REPLIES[(turn - 1) % len(REPLIES)]
+        start = time.perf_counter()
+        try:
+            response = await http.post(
+                "/chat", json={"conversation_id": conversation_id, "message": message}
+            )
+            response.raise_for_status()
+        except httpx.HTTPError:
+            recorder.errors += 1
+            return
+        recorder.latencies.append(time.perf_counter() - start)
+
+        body = response.json()
+        conversation_id = body["conversation_id"]
+        if body["message"][-1]["message"].startswith(APOLOGY_PREFIX):
+            recorder.llm_errors += 1
+
+
+async def run_load(http, openings: list, debates: int, concurrency: int, turns: int):
+    """Run `debates` debates with at most `concurrency` in flight"""
+    recorder = LoadRecorder()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_debate(index: int):
+        async with semaphore:
+            await run_debate(http, recorder, openings[index % len(openings)], turns)
+
+    sampler = asyncio.create_task(recorder.sample_memory())
+    start = time.perf_counter()
+    await asyncio.gather(*(one_debate(index) for index in range(debates)))
+    duration = time.perf_counter() - start
+    sampler.cancel()
+
+    latencies = sorted(recorder.latencies)
+    requests = len(latencies) + recorder.errors
+    memory_end = rss_mb()
+    return {
+        "requests": requests,
+        "errors": recorder.errors,
+        "llm_errors": recorder.llm_errors,
+        "duration_s": round(duration, 3),
+        "requests_per_second": round(len(latencies) / duration, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "mean": round(sum(latencies) / max(1, len(latencies)) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+        "memory_mb": {
+            "start": round(recorder.memory_start, 1),
+            "peak": round(max(recorder.memory_peak, memory_end), 1),
+            "end": round(memory_end, 1),
+        },
+    }
+
+
+def metric(report: dict, path: str):
+    value = report["results"]
+    for part in path.split("."):
+        value = value[part]
+    return value
+
+
+def compare_reports(baseline: dict, current: dict, tolerance: float) -> list:
+    """Return (metric, baseline, current, change, regressed) rows"""
+    rows = []
+    for path, higher_is_better in COMPARED_METRICS.items():
+        before, after = metric(baseline, path), metric(current, path)
+        change = (after - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        rows.append((path, before, after, change, worse > tolerance))
+    return rows
+
+
+def print_results(results: dict):
+    latency = results["latency_ms"]
+    memory = results["memory_mb"]
+    print(f"   requests:     {results['requests']} ({results['errors']} HTTP errors, "
+          f"{results['llm_errors']} LLM errors)")
+    print(f"   throughput:   {results['requests_per_second']:.1f} req/s")
+    print(f"   latency (ms): p50 {latency['p50']:.0f} | p95 {latency['p95']:.0f} | "
+          f"p99 {latency['p99']:.0f} | max {latency['max']:.0f}")
+    print(f"   memory (MB):  start {memory['start']:.0f} | peak {memory['peak']:.0f} | "
+          f"end {memory['end']:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /chat against a fake LLM")
+    parser.add_argument("--debates", type=int, default=200, help="Debates to play")
+    parser.add_argument(
+        "--concurrency", type=int, default=50, help="Debates in flight at once"
+    )
+    parser.add_argument("--turns", type=int, default=3, help="Requests per debate")
+    parser.add_argument(
+        "--latency",
+        default="lognormal:0.3,0.4",
+        help="Fake LLM time to first token: seconds or a distribution",
+    )
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=200, help="Fake LLM generation rate"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of failing LLM calls"
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.10,
+        help="Relative slowdown allowed before --compare reports a regression",
+    )
+    args = parser.parse_args()
+
+    openings = [
+        line.strip() for line in OPENINGS_FILE.read_text().splitlines() if line.strip()
+    ]
+    state = FakeLLMState(error_rate=args.error_rate)
+
+    with run_fake_llm(
+        latency=parse_latency(args.latency),
+        token_delay=1 / args.tokens_per_second,
+        state=state,
+        simulate_generation=True,
+    ) as base_url:
+        # Point the OpenAI SDK at the fake server before the app builds its client
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        # Every simulated user shares one address, so per-client limits would
+        # throttle the whole run
+        os.environ.setdefault("RATE_LIMIT_REQUESTS_PER_MINUTE", "0")
+        os.environ.setdefault("RATE_LIMIT_TOKENS_PER_MINUTE", "0")
+
+        import fastapi_app
+
+        async def run():
+            transport = httpx.ASGITransport(app=fastapi_app.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://load", timeout=120
+            ) as http:
+                return await run_load(
+                    http, openings, args.debates, args.concurrency, args.turns
+                )
+
+        print("🚀 /chat load test")
+        print(f"   {args.debates} debates x {args.turns} turns, "
+              f"{args.concurrency} in flight, LLM latency {args.latency}")
+        print("=" * 50)
+        results = asyncio.run(run())
+
+    results["fake_llm"] = {
+        "requests": state.requests,
+        "errors": state.errors,
+        "peak_in_flight": state.peak_in_flight,
+    }
+    report = {
+        "benchmark": "load_chat",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "debates": args.debates,
+            "concurrency": args.concurrency,
+            "turns": args.turns,
+            "latency": args.latency,
+            "tokens_per_second": args.tokens_per_second,
+            "error_rate": args.error_rate,
+        },
+        "results": results,
+    }
+    print_results(results)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\n📝 Report written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        rows = compare_reports(baseline, report, args.tolerance)
+        print(f"\n📊 Compared with {args.compare} (tolerance {args.tolerance:.0%})")
+        for path, before, after, change, regressed in rows:
+            flag = "❌ regression" if regressed else "✅"
+            print(f"   {path:<22} {before:>10} -> {after:>10} ({change:+.1%}) {flag}")
+        if any(row[-1] for row in rows):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
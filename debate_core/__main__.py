@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Headless debate runner for the DebateBot engine
+
+Plays a scripted debate through `DebateEngine` without FastAPI or Streamlit
+and prints each reply with its latency, which makes it handy for quick
+benchmarks against OpenAI or a local fake LLM (set OPENAI_BASE_URL).
+
+Usage:
+    python -m debate_core "Let's debate: Remote work is better. You argue FOR." \\
+        --reply "Offices build culture." --reply "Commutes are fine." --json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from debate_core.engine import DebateEngine
+
+
+async def run_debate(engine: DebateEngine, opening: str, replies: list, as_json: bool):
+    """Play the opening and each scripted reply, reporting per-turn timings"""
+    start = time.perf_counter()
+    topic, side = await engine.aextract_topic_and_side(opening)
+    extraction_ms = (time.perf_counter() - start) * 1000
+
+    if not as_json:
+        print(f"🎯 Topic: {topic} | Side: {side} ({extraction_ms:.0f} ms)")
+
+    history = []
+    for turn, user_message in enumerate([opening] + replies):
+        start = time.perf_counter()
+        reply = await engine.agenerate(user_message, topic, side, history, "cli")
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        history.append({"role": "user", "message": user_message})
+        history.append({"role": "bot", "message": reply})
+
+        if as_json:
+            print(
+                json.dumps(
+                    {
+                        "turn": turn,
+                        "topic": topic,
+                        "side": side,
+                        "user": user_message,
+                        "bot": reply,
+                        "latency_ms": round(latency_ms, 1),
+                    }
+                )
+            )
+        else:
+            print(f"\n👤 You: {user_message}")
+            print(f"🤖 DebateBot ({latency_ms:.0f} ms): {reply}")
+
+    await engine.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless DebateBot debate")
+    parser.add_argument("opening", help="Opening message defining topic and side")
+    parser.add_argument(
+        "--reply",
+        action="append",
+        default=[],
+        help="Scripted user reply (repeat for more turns)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print one JSON line per turn")
+    args = parser.parse_args()
+
+    load_dotenv()
+    asyncio.run(run_debate(DebateEngine.from_env(), args.opening, args.reply, args.json))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Batch debate runner for offline evaluation runs
+
+Replays scripted debates from a JSONL file through `DebateEngine`, running up
+to `concurrency` debates at once while keeping each debate's turns in order.
+Each line holds one script:
+
+    {"id": "ubi-pro-1", "opening": "Let's debate: ... You argue FOR.",
+     "replies": ["...", "..."]}
+
+`topic` and `side` may be given to skip extraction from the opening. Results
+stream out as JSONL records while the run is going: one `turn` record per
+reply (with its latency), then a `done` record per debate, or an `error`
+record if a debate could not finish.
+
+Usage:
+    python -m debate_core.batch scripts.jsonl --concurrency 16 --output results.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, Optional
+
+from debate_core.engine import DebateEngine
+
+
+@dataclass
+class DebateScript:
+    """One scripted debate: an opening message followed by user replies"""
+
+    id: str
+    opening: str
+    replies: list = field(default_factory=list)
+    topic: Optional[str] = None
+    side: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict, default_id: str) -> "DebateScript":
+        if not isinstance(data, dict) or not isinstance(data.get("opening"), str):
+            raise ValueError("a script needs an 'opening' message")
+        replies = data.get("replies", [])
+        if not isinstance(replies, list) or not all(isinstance(r, str) for r in replies):
+            raise ValueError("'replies' must be a list of strings")
+        side = data.get("side")
+        if side not in (None, "pro", "con"):
+            raise ValueError("'side' must be 'pro' or 'con'")
+        return cls(
+            id=str(data.get("id", default_id)),
+            opening=data["opening"],
+            replies=replies,
+            topic=data.get("topic"),
+            side=side,
+        )
+
+
+def parse_scripts(lines: Iterable[str]) -> list:
+    """Parse JSONL script lines, raising ValueError naming the first bad line"""
+    scripts = []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            scripts.append(DebateScript.from_dict(json.loads(line), str(line_number)))
+        except (json.JSONDecodeError, ValueError) as e:
+            raise ValueError(f"Line {line_number}: {e}") from None
+    return scripts
+
+
+async def run_script(engine: DebateEngine, script: DebateScript, emit, slot=nullcontext):
+    """
+    Play one debate turn by turn, emitting a record per turn.
+
+    Each LLM call runs inside `slot()`, an async context manager the API uses
+    to queue them fairly with other clients' calls.
+    """
+    started = time.perf_counter()
+    conversation_id = f"batch-{uuid.uuid4()}"
+
+    topic, side = script.topic, script.side
+    if topic is None or side is None:
+        async with slot():
+            extracted_topic, extracted_side = await engine.aextract_topic_and_side(
+                script.opening
+            )
+        topic = topic or extracted_topic
+        side = side or extracted_side
+    extraction_ms = (time.perf_counter() - started) * 1000
+
+    conversation = engine.new_conversation(topic, side)
+    history = conversation["history"]
+
+    for turn, user_message in enumerate([script.opening] + script.replies):
+        turn_started = time.perf_counter()
+        try:
+            async with slot():
+                reply = await engine.agenerate(
+                    user_message,
+                    topic,
+                    side,
+                    history,
+                    conversation_id,
+                    conversation["system_prompt"],
+                )
+        except Exception as e:
+            await emit(
+                {"event": "error", "script_id": script.id, "turn": turn, "error": str(e)}
+            )
+            return
+
+        history.append({"role": "user", "message": user_message})
+        history.append({"role": "bot", "message": reply})
+        await emit(
+            {
+                "event": "turn",
+                "script_id": script.id,
+                "turn": turn,
+                "topic": topic,
+                "side": side,
+                "user": user_message,
+                "bot": reply,
+                "latency_ms": round((time.perf_counter() - turn_started) * 1000, 1),
+            }
+        )
+
+    await emit(
+        {
+            "event": "done",
+            "script_id": script.id,
+            "turns": len(script.replies) + 1,
+            "extraction_ms": round(extraction_ms, 1),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    )
+
+
+async def run_batch(
+    engine: DebateEngine, scripts: list, concurrency: int = 8, slot=nullcontext
+) -> AsyncIterator[dict]:
+    """
+    Run scripts with up to `concurrency` debates in flight, yielding records
+    as they are produced.
+    """
+    records = asyncio.Queue()
+    pending = iter(scripts)
+
+    async def worker():
+        # Workers share the iterator, so each script is played exactly once
+        for script in pending:
+            await run_script(engine, script, records.put, slot)
+
+    async def run_workers():
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        finally:
+            await records.put(None)
+
+    runner = asyncio.create_task(run_workers())
+    try:
+        while (record := await records.get()) is not None:
+            yield record
+        await runner
+    finally:
+        runner.cancel()
+
+
+async def run_file(engine: DebateEngine, scripts: list, concurrency: int, output):
+    async for record in run_batch(engine, scripts, concurrency):
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+    await engine.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scripted debates from a JSONL file")
+    parser.add_argument("scripts", help="JSONL file of debate scripts ('-' for stdin)")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Debates to run at once"
+    )
+    parser.add_argument("--output", help="Write JSONL results here instead of stdout")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.scripts == "-" else open(args.scripts)
+    with source:
+        try:
+            scripts = parse_scripts(source)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        asyncio.run(run_file(DebateEngine.from_env(), scripts, args.concurrency, output))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Opt-in cache of debate completions
+
+Entries are keyed on a hash of the model, the sampling parameters and the
+fully rendered message list, so only byte-identical prompts (for example the
+same canned debate opening) share answers. Each key can collect several
+variants so repeated openings don't all get the same reply.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class CompletionCache:
+    """Bounded LRU cache of completions with a TTL and per-key variants"""
+
+    def __init__(
+        self, max_entries: int = 1024, ttl_seconds: float = 3600, variants: int = 1
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.variants = max(1, variants)
+        self._entries = OrderedDict()  # key -> (created_at, [responses])
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["CompletionCache"]:
+        """Build the cache from COMPLETION_CACHE_* variables, or None if disabled"""
+        if os.getenv("COMPLETION_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            max_entries=int(os.getenv("COMPLETION_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.getenv("COMPLETION_CACHE_TTL_SECONDS", "3600")),
+            variants=int(os.getenv("COMPLETION_CACHE_VARIANTS", "1")),
+        )
+
+    @staticmethod
+    def make_key(model: str, params: dict, messages: list) -> str:
+        """Hash the model, sampling parameters and rendered messages"""
+        payload = json.dumps(
+            {"model": model, "params": params, "messages": messages},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return a cached completion, or None if the caller should generate one.
+
+        Until a key has collected `variants` responses it keeps missing, so
+        the pool fills up with distinct answers before any is reused.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+
+            if entry is None or len(entry[1]) < self.variants:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return random.choice(entry[1])
+
+    def put(self, key: str, response: str):
+        """Add a freshly generated completion for the key"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl_seconds:
+                entry = (now, [])
+                self._entries[key] = entry
+
+            if len(entry[1]) < self.variants:
+                entry[1].append(response)
+
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"size": len(self), "hits": self.hits, "misses": self.misses}
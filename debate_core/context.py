@@ -0,0 +1,179 @@
+"""
+Token-budgeted context window for debate prompts
+
+Recent turns are sent to the model verbatim while they fit in the token
+budget. Older turns are folded into a running summary that is cached per
+conversation and only extended when more turns fall out of the window.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# Per-message overhead of the chat format (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Summary of the earlier part of this debate:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text (roughly 4 characters per token for English)"""
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: dict) -> int:
+    """Estimate the tokens an OpenAI-format message adds to the prompt"""
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def extractive_summary(previous: str, messages: list, max_tokens: int = 300) -> str:
+    """
+    Fold messages into a running summary using the first sentence of each.
+
+    Runs locally so folding never costs an extra LLM round-trip. When the
+    summary grows past `max_tokens`, the oldest points after the opening are
+    dropped first.
+    """
+    lines = previous.splitlines() if previous else []
+    for message in messages:
+        speaker = "You" if message["role"] == "assistant" else "User"
+        first_sentence = re.split(r"(?<=[.!?])\s", message["content"].strip(), 1)[0]
+        lines.append(f"- {speaker}: {first_sentence[:200]}")
+
+    while len(lines) > 2 and estimate_tokens("\n".join(lines)) > max_tokens:
+        del lines[1]
+
+    return "\n".join(lines)
+
+
+@dataclass
+class ContextWindowResult:
+    """Messages to send plus prompt sizes before and after trimming"""
+
+    messages: list
+    tokens_before: int
+    tokens_after: int
+    folded_messages: int
+
+
+class ContextWindow:
+    """
+    Keeps debate prompts within a token budget.
+
+    `token_budget` bounds the verbatim history. When it is exceeded, the
+    oldest turns are folded until the history is back under
+    `token_budget * fold_ratio`, so the summary is only rebuilt every few
+    turns rather than on every one.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        fold_ratio: float = 0.6,
+        summary_max_tokens: int = 300,
+        max_cached_summaries: int = 10_000,
+        summarizer: Optional[Callable[[str, list], str]] = None,
+    ):
+        self.token_budget = token_budget
+        self.fold_ratio = fold_ratio
+        self.summary_max_tokens = summary_max_tokens
+        self.max_cached_summaries = max_cached_summaries
+        self.summarizer = summarizer or (
+            lambda previous, messages: extractive_summary(
+                previous, messages, summary_max_tokens
+            )
+        )
+        # conversation key -> (messages of the conversation folded, summary text)
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ContextWindow":
+        """Build a context window configured by CONTEXT_* environment variables"""
+        return cls(
+            token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000")),
+            summary_max_tokens=int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "300")),
+        )
+
+    def _cached_summary(self, key: Optional[str], offset: int, history_length: int):
+        """(messages of the history already folded, summary) for a conversation"""
+        if key is None:
+            return 0, ""
+        with self._lock:
+            folded, summary = self._summaries.get(key, (0, ""))
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+        # A shorter history than what was folded means the conversation restarted
+        if folded > offset + history_length:
+            return 0, ""
+        return max(folded - offset, 0), summary
+
+    def forget(self, key: Optional[str]):
+        """Drop a conversation's summary, e.g. when its history was replaced"""
+        with self._lock:
+            self._summaries.pop(key, None)
+
+    def _store_summary(self, key: Optional[str], folded: int, summary: str):
+        if key is None:
+            return
+        with self._lock:
+            self._summaries[key] = (folded, summary)
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+
+    def fit(
+        self,
+        key: Optional[str],
+        system: dict,
+        history: list,
+        user: dict,
+        history_tokens: Optional[list] = None,
+        system_tokens: Optional[int] = None,
+        offset: int = 0,
+    ) -> ContextWindowResult:
+        """
+        Build the prompt for a turn from OpenAI-format messages.
+
+        `key` identifies the conversation whose summary should be reused; pass
+        None to summarize from scratch without caching. Token counts that are
+        already known (`history_tokens`, `system_tokens`) are used as-is.
+        `offset` is the position of `history[0]` in the whole conversation
+        when older messages were left out; the summary's extent is cached as
+        a position in the conversation, so it stays right as they are.
+        """
+        if system_tokens is None:
+            system_tokens = message_tokens(system)
+        if history_tokens is None:
+            history_tokens = [message_tokens(message) for message in history]
+
+        fixed_tokens = system_tokens + message_tokens(user)
+        tokens_before = fixed_tokens + sum(history_tokens)
+
+        folded, summary = self._cached_summary(key, offset, len(history))
+        recent_tokens = sum(history_tokens[folded:])
+
+        if recent_tokens > self.token_budget:
+            target = int(self.token_budget * self.fold_ratio)
+            cut = folded
+            while recent_tokens > target and cut < len(history):
+                recent_tokens -= history_tokens[cut]
+                cut += 1
+            summary = self.summarizer(summary, history[folded:cut])
+            folded = cut
+            self._store_summary(key, offset + folded, summary)
+
+        messages = [system]
+        if summary:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+        messages.extend(history[folded:])
+        messages.append(user)
+
+        tokens_after = fixed_tokens + recent_tokens
+        if summary:
+            tokens_after += message_tokens(messages[1])
+
+        return ContextWindowResult(messages, tokens_before, tokens_after, folded)
@@ -0,0 +1,674 @@
+"""
+Debate engine shared by the FastAPI and Streamlit front-ends
+
+Owns prompt rendering, message assembly, the model router (OpenAI-compatible
+backends, each with its own clients and resilience layer), the context
+window, topic extraction and the completion cache. Front-ends only
+manage their own conversation state and call into the engine, so it can also
+be driven headless (see `python -m debate_core`).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Iterator, Optional
+
+from debate_core.completion_cache import CompletionCache
+from debate_core.context import ContextWindow, estimate_tokens, message_tokens
+from debate_core.metrics import (
+    COMPLETION_TOKENS,
+    PROMPT_TOKENS_AFTER,
+    PROMPT_TOKENS_BEFORE,
+    SPECULATION_SAVED_SECONDS,
+    SPECULATIONS,
+    timed,
+)
+from debate_core.model_router import (
+    DEBATE,
+    DEFAULT_MODEL,
+    EXTRACT,
+    ModelBackend,
+    ModelRouter,
+)
+from debate_core.prompts import DEFAULT_TOPIC, RenderedPrompt, get_prompt_template
+from debate_core.resilience import ResilientClient
+from debate_core.topic_parser import ExtractionMemo, normalize_message, parse_topic_and_side
+from debate_core.turns import TurnLog, turn_fields
+
+logger = logging.getLogger(__name__)
+
+# Sampling parameters for debate turns
+DEBATE_PARAMS = {
+    "max_tokens": 500,
+    "temperature": 0.7,
+    "presence_penalty": 0.6,
+    "frequency_penalty": 0.3,
+}
+
+# Sampling parameters for topic extraction
+EXTRACTION_PARAMS = {"max_tokens": 100, "temperature": 0.3}
+
+EXTRACTION_SYSTEM_PROMPT = (
+    "You are a helpful assistant that extracts debate topics and positions from messages."
+)
+EXTRACTION_PROMPT = """Analyze this message and extract:
+1. The debate topic
+2. What side the bot should argue (pro/for or con/against)
+
+Message: "{message}"
+
+Respond in this exact format:
+TOPIC: [the debate topic]
+SIDE: [pro or con]"""
+
+DEFAULT_SIDE = "pro"
+
+# Newest messages compared to line a history up with its message buffer
+ALIGNED_MESSAGES = 4
+
+
+def apology_message(error: Exception) -> str:
+    """Reply shown to the user when a completion fails"""
+    return f"I apologize, but I'm having trouble generating a response right now. Error: {str(error)}"
+
+
+def to_openai_message(msg) -> dict:
+    """Convert a stored message (dict, `Turn` or `Message` model) to the OpenAI format"""
+    role, content = turn_fields(msg)
+
+    # FastAPI stores the bot's turns as 'bot', Streamlit as 'assistant'
+    return {"role": "assistant" if role == "bot" else role, "content": content}
+
+
+class MessageBuffer:
+    """
+    OpenAI-format messages and token counts for one conversation.
+
+    Histories are append-only, so each turn converts only the messages added
+    since the previous turn instead of rebuilding the whole list. New
+    messages are found by lining the history's newest messages up with the
+    buffer's, so a store that caps histories and drops the oldest messages
+    doesn't lose any: the buffer keeps them until the context window has
+    folded them into its summary (`drop()`). `start` is the position of the
+    buffer's first message in the whole conversation.
+
+    A history that doesn't continue the buffer was replaced; the buffer is
+    rebuilt from it and `replaced` is set until the next sync.
+    """
+
+    __slots__ = ("messages", "tokens", "start", "replaced")
+
+    def __init__(self):
+        self.messages = []
+        self.tokens = []
+        self.start = 0
+        self.replaced = False
+
+    def unseen(self, history: list) -> Optional[int]:
+        """How many of the history's newest messages are new, or None if it was replaced"""
+        length = len(history)
+        if not self.messages:
+            return length
+        # Stores that keep every message are continued where the buffer ends
+        expected = length - self.start - len(self.messages)
+        for new in (expected, *range(length)):
+            overlap = min(len(self.messages), length - new, ALIGNED_MESSAGES)
+            if new < 0 or overlap < 1:
+                continue
+            end = length - new
+            tail = history[end - overlap : end]
+            if [to_openai_message(msg) for msg in tail] == self.messages[-overlap:]:
+                return new
+        return None
+
+    def sync(self, history: list) -> "MessageBuffer":
+        new = self.unseen(history)
+        self.replaced = new is None
+        if self.replaced:
+            self.messages.clear()
+            self.tokens.clear()
+            self.start = 0
+            new = len(history)
+
+        for msg in history[len(history) - new :] if new else ():
+            converted = to_openai_message(msg)
+            self.messages.append(converted)
+            self.tokens.append(message_tokens(converted))
+        return self
+
+    def drop(self, count: int):
+        """Forget the oldest `count` messages, once they are summarized"""
+        # The newest message stays, to line up the next sync
+        count = min(count, len(self.messages) - 1)
+        if count > 0:
+            del self.messages[:count]
+            del self.tokens[:count]
+            self.start += count
+
+
+def completion_tokens(response) -> int:
+    """Completion tokens reported by the provider, estimated if it didn't say"""
+    usage = getattr(response, "usage", None)
+    if usage is not None and usage.completion_tokens is not None:
+        return usage.completion_tokens
+    return estimate_tokens(response.choices[0].message.content or "")
+
+
+def prompt_tokens(messages: list) -> int:
+    """Estimated tokens of an OpenAI message list"""
+    return sum(message_tokens(message) for message in messages)
+
+
+def parse_extraction(result: str) -> tuple:
+    """Parse the TOPIC:/SIDE: lines of an extraction completion"""
+    topic = DEFAULT_TOPIC
+    side = DEFAULT_SIDE
+
+    for line in result.split("\n"):
+        if line.startswith("TOPIC:"):
+            topic = line.replace("TOPIC:", "").strip()
+        elif line.startswith("SIDE:"):
+            side_text = line.replace("SIDE:", "").strip().lower()
+            side = "pro" if "pro" in side_text or "for" in side_text else "con"
+
+    return topic, side
+
+
+class DebateEngine:
+    """
+    Generates debate turns for any front-end.
+
+    Calls go through `router`. Without one, the engine routes everything to
+    a single backend built from `model`, `api_key`, `base_url`,
+    `max_connections` and `resilience`.
+    """
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_connections: int = 100,
+        resilience: Optional[ResilientClient] = None,
+        context_window: Optional[ContextWindow] = None,
+        completion_cache: Optional[CompletionCache] = None,
+        topic_fast_path_min_confidence: float = 0.8,
+        prompt_version: Optional[str] = None,
+        max_message_buffers: int = 10_000,
+        router: Optional[ModelRouter] = None,
+        topic_index_threshold: float = 0.0,
+        topic_index_max_topics: int = 100_000,
+        speculative_extraction: bool = False,
+    ):
+        self.router = router or ModelRouter(
+            [
+                ModelBackend(
+                    "main",
+                    model,
+                    api_key=api_key,
+                    base_url=base_url,
+                    max_connections=max_connections,
+                    resilience=resilience,
+                )
+            ]
+        )
+        self.context_window = context_window or ContextWindow()
+        self.completion_cache = completion_cache
+        self.topic_fast_path_min_confidence = topic_fast_path_min_confidence
+        self.extraction_memo = ExtractionMemo()
+        # Built on first use, since it imports NumPy; 0 disables it
+        self.topic_index_threshold = topic_index_threshold
+        self.topic_index_max_topics = topic_index_max_topics
+        self._topic_index = None
+        self._topic_index_lock = threading.Lock()
+        self.speculative_extraction = speculative_extraction
+        self.prompt_template = get_prompt_template(prompt_version)
+        self.max_message_buffers = max_message_buffers
+
+        # conversation id -> MessageBuffer, least recently used first
+        self._buffers = OrderedDict()
+        self._buffers_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "DebateEngine":
+        """Build an engine configured by environment variables"""
+        return cls(
+            router=ModelRouter.from_env(),
+            context_window=ContextWindow.from_env(),
+            completion_cache=CompletionCache.from_env(),
+            topic_fast_path_min_confidence=float(
+                os.getenv("TOPIC_FAST_PATH_MIN_CONFIDENCE", "0.8")
+            ),
+            prompt_version=os.getenv("PROMPT_VERSION"),
+            topic_index_threshold=float(os.getenv("TOPIC_INDEX_THRESHOLD", "0.6")),
+            topic_index_max_topics=int(os.getenv("TOPIC_INDEX_MAX_TOPICS", "100000")),
+            speculative_extraction=os.getenv("SPECULATIVE_EXTRACTION", "false").lower()
+            in ("1", "true", "yes"),
+        )
+
+    @property
+    def model(self) -> str:
+        """Model of the main backend, used for debate turns when it is healthy"""
+        return self.router.main.model
+
+    @property
+    def resilience(self) -> ResilientClient:
+        return self.router.main.resilience
+
+    @property
+    def client(self):
+        """Synchronous OpenAI client of the main backend"""
+        return self.router.main.client
+
+    @property
+    def async_client(self):
+        """Async OpenAI client of the main backend"""
+        return self.router.main.async_client
+
+    def prewarm(self):
+        """Import the OpenAI SDK ahead of the first call; it takes most of a second"""
+        import httpx  # noqa: F401
+        import openai  # noqa: F401
+
+        self.topic_index
+
+    async def aclose(self):
+        """Release pooled connections"""
+        await self.router.aclose()
+
+    # --- Prompt rendering and message assembly ---
+
+    def render_system_prompt(self, topic: Optional[str], side: str) -> RenderedPrompt:
+        """Render the system prompt for a (topic, side), cached by the template"""
+        return self.prompt_template.render(topic, side)
+
+    def new_conversation(self, topic: str, side: str) -> dict:
+        """Create a conversation record with its system prompt rendered once"""
+        return {
+            "topic": topic,
+            "side": side,
+            "history": TurnLog(),
+            "system_prompt": self.render_system_prompt(topic, side).to_dict(),
+        }
+
+    def _message_buffer(self, conversation_id: Optional[str], history: list):
+        if conversation_id is None:
+            return MessageBuffer().sync(history)
+
+        with self._buffers_lock:
+            buffer = self._buffers.get(conversation_id)
+            if buffer is None:
+                buffer = self._buffers[conversation_id] = MessageBuffer()
+            self._buffers.move_to_end(conversation_id)
+            while len(self._buffers) > self.max_message_buffers:
+                self._buffers.popitem(last=False)
+            return buffer.sync(history)
+
+    def prefetch_history(self, conversation_id: Optional[str], history, recent: int = 0):
+        """
+        Read ahead the stored messages a turn will use, if `history` reads
+        them lazily (has `prefetch()`).
+
+        That is the messages added since the conversation's buffer last
+        synced, the ones lining them up with it, and the newest `recent`.
+        Call it where waiting on the store is fine, such as a worker thread.
+        """
+        prefetch = getattr(history, "prefetch", None)
+        if prefetch is None:
+            return
+        length = len(history)
+        with self._buffers_lock:
+            buffer = self._buffers.get(conversation_id)
+        start = 0
+        if buffer is not None and buffer.messages:
+            end = buffer.start + len(buffer.messages)
+            if end <= length:
+                start = end - min(len(buffer.messages), ALIGNED_MESSAGES)
+        prefetch(min(start, length - recent))
+
+    def build_messages(
+        self,
+        user_message: str,
+        topic: Optional[str],
+        side: str,
+        history: list,
+        conversation_id: Optional[str] = None,
+        system_prompt: Optional[dict] = None,
+    ) -> list:
+        """
+        Build the OpenAI message list for a turn within the context budget.
+
+        Pass the conversation's stored `system_prompt` to skip rendering;
+        otherwise it is rendered (and cached) from the topic and side.
+        """
+        with timed("prompt_assembly"):
+            return self._build_messages(
+                user_message, topic, side, history, conversation_id, system_prompt
+            )
+
+    def _build_messages(
+        self, user_message, topic, side, history, conversation_id, system_prompt
+    ) -> list:
+        prompt = (
+            RenderedPrompt.from_dict(system_prompt)
+            if system_prompt
+            else self.render_system_prompt(topic, side)
+        )
+        buffer = self._message_buffer(conversation_id, history)
+        if buffer.replaced:
+            self.context_window.forget(conversation_id)
+
+        window = self.context_window.fit(
+            conversation_id,
+            prompt.as_message(),
+            buffer.messages,
+            {"role": "user", "content": user_message},
+            history_tokens=buffer.tokens,
+            system_tokens=prompt.tokens,
+            offset=buffer.start,
+        )
+        if conversation_id is not None:
+            buffer.drop(window.folded_messages)
+        PROMPT_TOKENS_BEFORE.observe(window.tokens_before)
+        PROMPT_TOKENS_AFTER.observe(window.tokens_after)
+        logger.info(
+            "Prompt tokens for conversation %s: %d before trimming, %d after",
+            conversation_id,
+            window.tokens_before,
+            window.tokens_after,
+        )
+        return window.messages
+
+    def _cache_lookup(self, messages: list):
+        """Return (cache_key, cached_reply) for the main model; both None when caching is off"""
+        if self.completion_cache is None:
+            return None, None
+        key = self.completion_cache.make_key(self.model, DEBATE_PARAMS, messages)
+        return key, self.completion_cache.get(key)
+
+    def _cache_store(self, key: Optional[str], backends: list, messages: list, content: str):
+        """
+        Cache a reply under the model that produced it.
+
+        `backends` holds the backend the router reported. A reply from a
+        fallback model is keyed on that model, so it is never served as the
+        main model's.
+        """
+        if key is None or not backends:
+            return
+        model = backends[-1].model
+        if model != self.model:
+            key = self.completion_cache.make_key(model, DEBATE_PARAMS, messages)
+        self.completion_cache.put(key, content)
+
+    # --- Debate turns ---
+
+    def generate(
+        self,
+        user_message: str,
+        topic: Optional[str],
+        side: str,
+        history: list,
+        conversation_id: Optional[str] = None,
+        system_prompt: Optional[dict] = None,
+    ) -> str:
+        """Generate the bot's reply to a user message"""
+        messages = self.build_messages(
+            user_message, topic, side, history, conversation_id, system_prompt
+        )
+        key, cached = self._cache_lookup(messages)
+        if cached is not None:
+            return cached
+
+        backends = []
+        with timed("llm"):
+            response = self.router.call(
+                DEBATE,
+                prompt_tokens(messages),
+                on_backend=backends.append,
+                messages=messages,
+                **DEBATE_PARAMS,
+            )
+        COMPLETION_TOKENS.observe(completion_tokens(response))
+        content = response.choices[0].message.content
+        self._cache_store(key, backends, messages, content)
+        return content
+
+    async def agenerate(
+        self,
+        user_message: str,
+        topic: Optional[str],
+        side: str,
+        history: list,
+        conversation_id: Optional[str] = None,
+        system_prompt: Optional[dict] = None,
+    ) -> str:
+        """Generate the bot's reply to a user message without blocking the event loop"""
+        messages = self.build_messages(
+            user_message, topic, side, history, conversation_id, system_prompt
+        )
+        key, cached = self._cache_lookup(messages)
+        if cached is not None:
+            return cached
+
+        backends = []
+        with timed("llm"):
+            response = await self.router.acall(
+                DEBATE,
+                prompt_tokens(messages),
+                on_backend=backends.append,
+                messages=messages,
+                **DEBATE_PARAMS,
+            )
+        COMPLETION_TOKENS.observe(completion_tokens(response))
+        content = response.choices[0].message.content
+        self._cache_store(key, backends, messages, content)
+        return content
+
+    def stream(
+        self,
+        user_message: str,
+        topic: Optional[str],
+        side: str,
+        history: list,
+        conversation_id: Optional[str] = None,
+        system_prompt: Optional[dict] = None,
+    ) -> Iterator[str]:
+        """Yield the bot's reply as completion deltas arrive, without asyncio"""
+        messages = self.build_messages(
+            user_message, topic, side, history, conversation_id, system_prompt
+        )
+        key, cached = self._cache_lookup(messages)
+        if cached is not None:
+            yield cached
+            return
+
+        backends = []
+        stream = self.router.stream(
+            DEBATE,
+            prompt_tokens(messages),
+            on_backend=backends.append,
+            messages=messages,
+            **DEBATE_PARAMS,
+        )
+
+        parts = []
+        with timed("llm"):
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+
+        content = "".join(parts)
+        COMPLETION_TOKENS.observe(estimate_tokens(content))
+        self._cache_store(key, backends, messages, content)
+
+    async def astream(
+        self,
+        user_message: str,
+        topic: Optional[str],
+        side: str,
+        history: list,
+        conversation_id: Optional[str] = None,
+        system_prompt: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """Yield the bot's reply as completion deltas arrive"""
+        messages = self.build_messages(
+            user_message, topic, side, history, conversation_id, system_prompt
+        )
+        key, cached = self._cache_lookup(messages)
+        if cached is not None:
+            yield cached
+            return
+
+        backends = []
+        stream = self.router.astream(
+            DEBATE,
+            prompt_tokens(messages),
+            on_backend=backends.append,
+            messages=messages,
+            **DEBATE_PARAMS,
+        )
+
+        parts = []
+        with timed("llm"):
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+
+        content = "".join(parts)
+        COMPLETION_TOKENS.observe(estimate_tokens(content))
+        self._cache_store(key, backends, messages, content)
+
+    # --- Topic extraction ---
+
+    @property
+    def topic_index(self):
+        """Index of canonical topics, or None if disabled"""
+        if self._topic_index is None and self.topic_index_threshold > 0:
+            with self._topic_index_lock:
+                if self._topic_index is None:
+                    from debate_core.topic_index import TopicIndex
+
+                    self._topic_index = TopicIndex(
+                        threshold=self.topic_index_threshold,
+                        max_topics=self.topic_index_max_topics,
+                    )
+        return self._topic_index
+
+    def topic_id(self, topic: str) -> str:
+        """
+        ID shared by `topic` and its paraphrases, for caches and analytics.
+
+        Only the ID is shared: the debate keeps the user's wording.
+        """
+        if self.topic_index is None:
+            from debate_core.topic_index import topic_id
+
+            return topic_id(topic)
+        return self.topic_index.add(topic).topic_id
+
+    async def aextract_topic_and_side(self, message: str) -> tuple:
+        """Extract topic and side from an opening message, locally when possible"""
+        with timed("extract_topic"):
+            return await self._aextract_topic_and_side(message)
+
+    async def _aextract_topic_and_side(self, message: str) -> tuple:
+        cached = self.extraction_memo.get(message)
+        if cached is not None:
+            return cached
+
+        # Common phrasings are parsed locally, skipping an OpenAI round-trip
+        guess = parse_topic_and_side(message)
+        if guess.confidence >= self.topic_fast_path_min_confidence:
+            result = guess.topic, guess.side
+        else:
+            try:
+                response = await self.router.acall(
+                    EXTRACT,
+                    messages=[
+                        {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
+                        {
+                            "role": "user",
+                            "content": EXTRACTION_PROMPT.format(message=message),
+                        },
+                    ],
+                    **EXTRACTION_PARAMS,
+                )
+                result = parse_extraction(response.choices[0].message.content)
+            except Exception:
+                # Default fallback, filled in with whatever the local parser found
+                return guess.topic or DEFAULT_TOPIC, guess.side or DEFAULT_SIDE
+
+        self.extraction_memo.put(message, result)
+        return result
+
+    # --- Speculative opening replies ---
+
+    def speculative_guess(self, message: str) -> Optional[tuple]:
+        """
+        (topic, side) to start replying with while extraction runs, or None.
+
+        Only openings that need an LLM extraction are worth it, and only if
+        the local parser found a topic; a missing side is guessed as the
+        default.
+        """
+        if not self.speculative_extraction or self.extraction_memo.get(message):
+            return None
+        guess = parse_topic_and_side(message)
+        if guess.confidence >= self.topic_fast_path_min_confidence or not guess.topic:
+            return None
+        return guess.topic, guess.side or DEFAULT_SIDE
+
+    def same_debate(self, a: tuple, b: tuple) -> bool:
+        """Whether two (topic, side) pairs are the same debate"""
+        (topic_a, side_a), (topic_b, side_b) = a, b
+        if side_a != side_b:
+            return False
+        if self.topic_index is not None:
+            return self.topic_index.similarity(topic_a, topic_b) >= self.topic_index_threshold
+        return normalize_message(topic_a) == normalize_message(topic_b)
+
+    async def aextract_speculatively(self, message: str) -> tuple:
+        """
+        Extract topic and side from a new debate's opening, replying meanwhile.
+
+        Returns (topic, side, reply). When `speculative_guess()` has a guess,
+        the reply to the opening is generated from it while extraction runs,
+        so the two LLM calls overlap. The reply is kept if extraction agrees
+        with the guess; otherwise it is cancelled and `reply` is None, and
+        the caller generates one as usual.
+        """
+        guess = self.speculative_guess(message)
+        if guess is None:
+            topic, side = await self.aextract_topic_and_side(message)
+            return topic, side, None
+
+        started = time.perf_counter()
+        reply = asyncio.ensure_future(self.agenerate(message, *guess, []))
+        try:
+            extracted = await self.aextract_topic_and_side(message)
+        except BaseException:
+            reply.cancel()
+            raise
+        extraction_seconds = time.perf_counter() - started
+
+        if not self.same_debate(extracted, guess):
+            SPECULATIONS.inc("miss")
+            reply.cancel()
+            return (*extracted, None)
+
+        SPECULATIONS.inc("hit")
+        try:
+            content = await reply
+        except Exception:
+            # Failed like any other turn; the caller's own attempt reports it
+            return (*extracted, None)
+        # Run in sequence, the reply would have started after extraction
+        generation_seconds = time.perf_counter() - started
+        SPECULATION_SAVED_SECONDS.inc(amount=min(extraction_seconds, generation_seconds))
+        return (*extracted, content)
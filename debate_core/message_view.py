@@ -0,0 +1,81 @@
+"""
+Windowed, cached rendering of the debate history for the Streamlit app
+
+Streamlit reruns the whole script on every interaction, so rendering cost
+must not grow with the length of the debate. Only the most recent pages of
+messages are rendered. Each message's HTML is built once and cached, and all
+of the older messages go out as a single markdown block. Only the newest
+turn is animated, so a rerun doesn't replay the slide-in for the whole
+history.
+"""
+
+from functools import lru_cache
+
+from debate_core.turns import turn_fields
+
+USER_TEMPLATE = """<div class="{animation}">
+    <div class="user-message">
+        <strong>👤 You:</strong><br>
+        {text}
+    </div>
+</div>"""
+
+BOT_TEMPLATE = """<div class="{animation}">
+    <div class="bot-message">
+        <strong>🤖 DebateBot:</strong><br>
+        {text}
+    </div>
+</div>"""
+
+
+# (role, text) of a message dict, `Turn` or `Message` model
+message_fields = turn_fields
+
+
+def format_message(role: str, text: str, animate: bool = False) -> str:
+    """HTML for one message; use for text still changing, such as a streamed reply"""
+    template = USER_TEMPLATE if role == "user" else BOT_TEMPLATE
+    return template.format(animation="message-animation" if animate else "message", text=text)
+
+
+@lru_cache(maxsize=8192)
+def render_message(role: str, text: str, animate: bool = False) -> str:
+    """HTML for one message, cached since messages never change once sent"""
+    return format_message(role, text, animate)
+
+
+def render_messages(messages, animate: bool = False) -> str:
+    """HTML for a run of messages, to be emitted as one markdown block"""
+    return "\n".join(render_message(*message_fields(msg), animate) for msg in messages)
+
+
+class MessageWindow:
+    """
+    The slice of a debate shown on screen.
+
+    Shows the newest `pages * page_size` messages. The latest turn (the last
+    user message and the reply to it) is kept apart so it alone is animated.
+    """
+
+    def __init__(self, messages: list, page_size: int = 20, pages: int = 1):
+        self.messages = messages
+        self.start = max(0, len(messages) - page_size * max(1, pages))
+
+        # The newest turn starts at the last user message in the window
+        latest = len(messages)
+        for index in range(len(messages) - 1, self.start - 1, -1):
+            if message_fields(messages[index])[0] == "user":
+                latest = index
+                break
+        self.latest_start = latest
+
+    @property
+    def hidden(self) -> int:
+        """Number of earlier messages not shown"""
+        return self.start
+
+    def earlier_html(self) -> str:
+        return render_messages(self.messages[self.start : self.latest_start])
+
+    def latest_html(self) -> str:
+        return render_messages(self.messages[self.latest_start :], animate=True)
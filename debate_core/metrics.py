@@ -0,0 +1,284 @@
+"""
+Lightweight in-process metrics for DebateBot
+
+Histograms, counters and gauges register themselves in `REGISTRY` and are rendered in
+the Prometheus text format by `render_prometheus()`. Recording a value is a
+bisect plus a locked increment. Gauges are computed from callbacks only when
+scraped, so nothing is paid for them between scrapes.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+# Latency buckets in seconds, from fast cache hits to slow completions
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage latency buckets, fine enough for sub-millisecond local stages
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every metric exposed on /metrics
+REGISTRY = []
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket upper bounds"""
+
+    def __init__(
+        self, name: str, description: str, buckets=DEFAULT_BUCKETS, register: bool = True
+    ):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+        if register:
+            REGISTRY.append(self)
+
+    def observe(self, value: float):
+        """Record a single observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """Return count, sum and cumulative bucket counts"""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative[bound] = running
+        cumulative[math.inf] = count
+
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+    def samples(self, labels: dict = None) -> list:
+        """Prometheus sample lines for this histogram"""
+        labels = labels or {}
+        snapshot = self.snapshot()
+        lines = [
+            f"{self.name}_bucket{format_labels({**labels, 'le': format_value(bound)})} {count}"
+            for bound, count in snapshot["buckets"].items()
+        ]
+        lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(snapshot['sum'])}")
+        lines.append(f"{self.name}_count{format_labels(labels)} {snapshot['count']}")
+        return lines
+
+    def render(self) -> list:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+            *self.samples(),
+        ]
+
+
+class LabeledHistogram:
+    """A family of histograms sharing a name, split by one label"""
+
+    def __init__(self, name: str, description: str, label: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, value: str) -> Histogram:
+        """Return the histogram for a label value, creating it on first use"""
+        child = self._children.get(value)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(
+                    value, Histogram(self.name, self.description, self.buckets, register=False)
+                )
+        return child
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for value, child in sorted(self._children.items()):
+            lines.extend(child.samples({self.label: value}))
+        return lines
+
+
+class Counter:
+    """A running total, optionally split by one label"""
+
+    def __init__(self, name: str, description: str, label: str = None):
+        self.name = name
+        self.description = description
+        self.label = label
+        self._values = {}  # label value (None without a label) -> total
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, value: str = None, amount: float = 1):
+        with self._lock:
+            self._values[value] = self._values.get(value, 0) + amount
+
+    def get(self, value: str = None) -> float:
+        """The total for a label value (or for the counter, without a label)"""
+        return self._values.get(value, 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: str(item[0]))
+        for value, total in values:
+            labels = {self.label: value} if self.label else {}
+            lines.append(f"{self.name}{format_labels(labels)} {format_value(total)}")
+        return lines
+
+
+class Gauge:
+    """A value computed by a callback each time metrics are scraped"""
+
+    def __init__(self, name: str, description: str, function: Callable[[], float] = None):
+        self.name = name
+        self.description = description
+        self.function = function or (lambda: 0)
+        REGISTRY.append(self)
+
+    def set_function(self, function: Callable[[], float]):
+        self.function = function
+
+    def render(self) -> list:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {format_value(self.function())}",
+        ]
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Time from receiving a streaming request to relaying the first completion token
+TIME_TO_FIRST_TOKEN = Histogram(
+    "debatebot_time_to_first_token_seconds",
+    "Time from request start to the first streamed completion token",
+)
+
+# Where the time of a request goes: extraction, prompt assembly, LLM call, ...
+STAGE_SECONDS = LabeledHistogram(
+    "debatebot_stage_seconds",
+    "Time spent in each stage of handling a debate turn",
+    label="stage",
+    buckets=STAGE_BUCKETS,
+)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the duration of the enclosed block as a stage latency"""
+    histogram = STAGE_SECONDS.labels(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+
+# Prompt size per debate turn, before and after context-window trimming
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000)
+PROMPT_TOKENS_BEFORE = Histogram(
+    "debatebot_prompt_tokens_before_trim",
+    "Estimated prompt tokens if the full history were sent",
+    buckets=TOKEN_BUCKETS,
+)
+PROMPT_TOKENS_AFTER = Histogram(
+    "debatebot_prompt_tokens_after_trim",
+    "Estimated prompt tokens actually sent after context-window trimming",
+    buckets=TOKEN_BUCKETS,
+)
+COMPLETION_TOKENS = Histogram(
+    "debatebot_completion_tokens",
+    "Completion tokens per LLM reply (reported by the provider when available)",
+    buckets=(25, 50, 100, 200, 300, 400, 500, 1000),
+)
+
+# Sampled at scrape time from callbacks the app installs
+CONVERSATION_STORE_SIZE = Gauge(
+    "debatebot_conversation_store_size", "Conversations held by the conversation store"
+)
+LLM_IN_FLIGHT = Gauge("debatebot_llm_in_flight", "LLM calls currently in flight")
+
+# Admission control in front of the LLM (see rate_limit.py and scheduler.py)
+LLM_QUEUE_DEPTH = Gauge(
+    "debatebot_llm_queue_depth", "LLM calls waiting for a slot in the fair scheduler"
+)
+LLM_QUEUE_WAIT = Histogram(
+    "debatebot_llm_queue_wait_seconds",
+    "Time LLM calls waited in the fair scheduler before running",
+    buckets=STAGE_BUCKETS,
+)
+RATE_LIMITED = Counter(
+    "debatebot_rate_limited_total",
+    "Requests rejected with 429 by the per-client rate limiter",
+    label="limit",
+)
+TOPIC_INDEX_LOOKUPS = Counter(
+    "debatebot_topic_index_total",
+    "Topics matched to a known canonical topic, added as new ones, or not added to a full index",
+    label="result",
+)
+OPENING_POOL_REQUESTS = Counter(
+    "debatebot_opening_pool_total",
+    "Plain debate openings served from the warm pool (hit) or generated (miss)",
+    label="result",
+)
+OPENING_POOL_SIZE = Gauge(
+    "debatebot_opening_pool_size", "Pre-generated openings waiting in the warm pool"
+)
+SPECULATIONS = Counter(
+    "debatebot_speculative_replies_total",
+    "Opening replies generated from a local topic guess during extraction, "
+    "kept (hit) or cancelled because extraction disagreed (miss)",
+    label="result",
+)
+SPECULATION_SAVED_SECONDS = Counter(
+    "debatebot_speculation_saved_seconds_total",
+    "Latency saved by overlapping extraction with kept speculative replies",
+)
+
+# The shard router (`shard_router.py`) serves these from its own process
+ROUTER_REQUESTS = Counter(
+    "debatebot_router_requests_total",
+    "Requests the shard router forwarded, by replica",
+    label="replica",
+)
+ROUTER_RING_CHANGES = Counter(
+    "debatebot_router_ring_changes_total",
+    "Replicas the shard router added to (join) or removed from (leave) its ring",
+    label="event",
+)
+ROUTER_REPLICAS = Gauge("debatebot_router_replicas", "Replicas on the shard router's ring")
@@ -0,0 +1,470 @@
+"""
+Model routing across OpenAI-compatible backends
+
+A `ModelRouter` holds a registry of `ModelBackend`s: OpenAI itself, another
+hosted OpenAI-compatible provider, or a local server (vLLM, llama.cpp,
+Ollama). Each backend is described by its model, cost and context size, owns
+its own clients and resilience layer, and tracks the latency and error rate
+it has shown recently.
+
+Per call the router orders the backends able to serve the task:
+- `debate` turns go to the main model, in registry order
+- `extract` calls go to the cheapest backend, preferring dedicated
+  extraction models and then the fastest at equal cost
+Backends that can't fit the prompt are skipped. Backends whose circuit is
+open or whose recent latency or error rate degraded are tried last, and a
+call that fails on one backend fails over to the next.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from debate_core.metrics import LabeledHistogram
+from debate_core.resilience import (
+    CircuitBreaker,
+    LLMUnavailableError,
+    ResilientClient,
+    is_retryable,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+DEBATE = "debate"
+EXTRACT = "extract"
+TASKS = (DEBATE, EXTRACT)
+
+BACKEND_SECONDS = LabeledHistogram(
+    "debatebot_llm_backend_seconds",
+    "Latency of LLM calls (time to first token for streams) per backend",
+    label="backend",
+)
+
+
+def should_fail_over(error: Exception) -> bool:
+    """Whether another backend might succeed where this one failed"""
+    return isinstance(error, LLMUnavailableError) or is_retryable(error)
+
+
+class BackendHealth:
+    """
+    Exponentially weighted latency and error rate of one backend.
+
+    Once either crosses its limit the backend counts as degraded for
+    `cooldown` seconds. After that its history is forgotten, so traffic
+    returns to it and shows whether it recovered.
+    """
+
+    def __init__(
+        self,
+        max_latency: Optional[float] = None,
+        max_error_rate: float = 0.5,
+        min_samples: int = 5,
+        cooldown: float = 30.0,
+        alpha: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_latency = max_latency
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.clock = clock
+        self.latency = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.degraded_until = None
+        self._lock = threading.Lock()
+
+    def observe(self, latency: Optional[float], ok: bool):
+        """Record the outcome of a call; `latency` is None for failures"""
+        with self._lock:
+            self.samples += 1
+            self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+            if latency is not None:
+                self.latency = (
+                    latency
+                    if self.latency is None
+                    else self.latency + self.alpha * (latency - self.latency)
+                )
+
+            too_slow = (
+                self.max_latency is not None
+                and self.latency is not None
+                and self.latency > self.max_latency
+            )
+            failing = self.samples >= self.min_samples and self.error_rate > self.max_error_rate
+            if (too_slow or failing) and self.degraded_until is None:
+                self.degraded_until = self.clock() + self.cooldown
+
+    @property
+    def degraded(self) -> bool:
+        with self._lock:
+            if self.degraded_until is None:
+                return False
+            if self.clock() < self.degraded_until:
+                return True
+            self.latency = None
+            self.error_rate = 0.0
+            self.samples = 0
+            self.degraded_until = None
+            return False
+
+
+class ModelBackend:
+    """One model on one OpenAI-compatible endpoint"""
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        tasks=TASKS,
+        cost_per_1k_tokens: float = 0.0,
+        context_tokens: int = 16_385,
+        max_connections: int = 100,
+        resilience: Optional[ResilientClient] = None,
+        health: Optional[BackendHealth] = None,
+    ):
+        self.name = name
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.tasks = tuple(tasks)
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self.context_tokens = context_tokens
+        self.max_connections = max_connections
+        self.resilience = resilience or ResilientClient()
+        self.health = health or BackendHealth()
+        self.tokens = 0
+
+        self._client = None
+        self._async_client = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ModelBackend":
+        """
+        Build a backend from a registry entry.
+
+        The API key is read from the variable named by `api_key_env`
+        (OPENAI_API_KEY by default), or given directly as `api_key`.
+        """
+        unknown = set(data.get("tasks", TASKS)) - set(TASKS)
+        if unknown:
+            raise ValueError(f"Unknown tasks for backend {data.get('name')!r}: {sorted(unknown)}")
+        return cls(
+            name=data.get("name", data["model"]),
+            model=data["model"],
+            api_key=data.get("api_key") or os.getenv(data.get("api_key_env", "OPENAI_API_KEY")),
+            base_url=data.get("base_url"),
+            tasks=data.get("tasks", TASKS),
+            cost_per_1k_tokens=float(data.get("cost_per_1k_tokens", 0.0)),
+            context_tokens=int(data.get("context_tokens", 16_385)),
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+            resilience=ResilientClient.from_env(),
+            health=BackendHealth(
+                max_latency=data.get("max_latency_seconds"),
+                cooldown=float(os.getenv("LLM_BACKEND_COOLDOWN_SECONDS", "30")),
+            ),
+        )
+
+    @property
+    def client(self):
+        """Synchronous OpenAI client, created on first use"""
+        if self._client is None:
+            from openai import OpenAI
+
+            # Retries are handled by self.resilience, not the SDK
+            self._client = OpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.resilience.timeout,
+                max_retries=0,
+            )
+        return self._client
+
+    @property
+    def async_client(self):
+        """Async OpenAI client backed by a shared connection pool, created on first use"""
+        if self._async_client is None:
+            import httpx
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.resilience.timeout,
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    )
+                ),
+            )
+        return self._async_client
+
+    async def aclose(self):
+        """Release pooled connections"""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    @property
+    def available(self) -> bool:
+        """False while the circuit is open or recent calls were slow or failing"""
+        return (
+            self.resilience.breaker.state == CircuitBreaker.CLOSED and not self.health.degraded
+        )
+
+    def fits(self, prompt_tokens: int, max_tokens: int) -> bool:
+        return prompt_tokens + max_tokens <= self.context_tokens
+
+    def record_success(self, started: float, tokens: int = 0):
+        elapsed = time.perf_counter() - started
+        BACKEND_SECONDS.labels(self.name).observe(elapsed)
+        self.health.observe(elapsed, ok=True)
+        self.tokens += tokens
+
+    def record_failure(self):
+        self.health.observe(None, ok=False)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "available": self.available,
+            "latency_ms": (
+                None if self.health.latency is None else round(self.health.latency * 1000, 1)
+            ),
+            "error_rate": round(self.health.error_rate, 3),
+            "tokens": self.tokens,
+            "estimated_cost": round(self.tokens / 1000 * self.cost_per_1k_tokens, 4),
+            **self.resilience.stats(),
+        }
+
+
+class ModelRouter:
+    """Picks a backend per call and fails over between them"""
+
+    def __init__(self, backends: list):
+        if not backends:
+            raise ValueError("ModelRouter needs at least one backend")
+        for task in TASKS:
+            if not any(task in backend.tasks for backend in backends):
+                raise ValueError(f"No backend serves {task!r} calls")
+        self.backends = list(backends)
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """
+        Build the router from LLM_BACKENDS, a JSON file listing backends.
+
+        Without it there is one backend for OPENAI_MODEL at OPENAI_BASE_URL,
+        plus one for OPENAI_EXTRACTION_MODEL on the same endpoint if set.
+        """
+        path = os.getenv("LLM_BACKENDS")
+        if path:
+            with open(path) as f:
+                return cls([ModelBackend.from_dict(entry) for entry in json.load(f)])
+
+        main = {
+            "name": "main",
+            "model": os.getenv("OPENAI_MODEL", DEFAULT_MODEL),
+            "base_url": os.getenv("OPENAI_BASE_URL"),
+        }
+        extraction_model = os.getenv("OPENAI_EXTRACTION_MODEL")
+        if not extraction_model:
+            return cls([ModelBackend.from_dict(main)])
+        return cls(
+            [
+                ModelBackend.from_dict(main),
+                ModelBackend.from_dict(
+                    {
+                        "name": "extraction",
+                        "model": extraction_model,
+                        "base_url": main["base_url"],
+                        "tasks": [EXTRACT],
+                    }
+                ),
+            ]
+        )
+
+    @property
+    def main(self) -> ModelBackend:
+        """The preferred backend for debate turns"""
+        return next(backend for backend in self.backends if DEBATE in backend.tasks)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(backend.resilience.in_flight for backend in self.backends)
+
+    def candidates(self, task: str, prompt_tokens: int = 0, max_tokens: int = 0) -> list:
+        """Backends to try for a call, best first"""
+        serving = [backend for backend in self.backends if task in backend.tasks]
+        fitting = [backend for backend in serving if backend.fits(prompt_tokens, max_tokens)]
+        if not fitting:
+            # Nothing is big enough; let the largest try rather than fail here
+            return sorted(serving, key=lambda backend: -backend.context_tokens)
+
+        if task == EXTRACT:
+            # Cheapest first; at equal cost, dedicated extraction models, then the fastest
+            fitting.sort(
+                key=lambda backend: (
+                    backend.cost_per_1k_tokens,
+                    len(backend.tasks),
+                    backend.health.latency if backend.health.latency is not None else 0.0,
+                )
+            )
+        # Stable sort: healthy backends first, keeping the order above
+        return sorted(fitting, key=lambda backend: not backend.available)
+
+    def _fail_over(self, backend: ModelBackend, error: Exception, last: bool):
+        """Record a failed backend; re-raise unless the next one should be tried"""
+        if not should_fail_over(error):
+            # Our own bad request: another backend would reject it too
+            raise error
+        backend.record_failure()
+        if last:
+            raise error
+        logger.warning(
+            "LLM backend %s failed (%s); failing over", backend.name, error.__class__.__name__
+        )
+
+    def call(
+        self,
+        task: str,
+        prompt_tokens: int = 0,
+        on_backend: Optional[Callable[[ModelBackend], None]] = None,
+        **kwargs,
+    ):
+        """
+        Create a chat completion with the synchronous clients.
+
+        `on_backend` is called with the backend that answered, which after a
+        failover is not the preferred one.
+        """
+        backends = self.candidates(task, prompt_tokens, kwargs.get("max_tokens", 0))
+        for backend in backends:
+            started = time.perf_counter()
+            try:
+                response = backend.resilience.call(
+                    backend.client.chat.completions.create, model=backend.model, **kwargs
+                )
+            except Exception as e:
+                self._fail_over(backend, e, backend is backends[-1])
+                continue
+            backend.record_success(started, usage_tokens(response))
+            if on_backend is not None:
+                on_backend(backend)
+            return response
+
+    async def acall(
+        self,
+        task: str,
+        prompt_tokens: int = 0,
+        on_backend: Optional[Callable[[ModelBackend], None]] = None,
+        **kwargs,
+    ):
+        """Create a chat completion without blocking the event loop (see `call`)"""
+        backends = self.candidates(task, prompt_tokens, kwargs.get("max_tokens", 0))
+        for backend in backends:
+            started = time.perf_counter()
+            try:
+                response = await backend.resilience.acall(
+                    backend.async_client.chat.completions.create, model=backend.model, **kwargs
+                )
+            except Exception as e:
+                self._fail_over(backend, e, backend is backends[-1])
+                continue
+            backend.record_success(started, usage_tokens(response))
+            if on_backend is not None:
+                on_backend(backend)
+            return response
+
+    def stream(
+        self,
+        task: str,
+        prompt_tokens: int = 0,
+        on_backend: Optional[Callable[[ModelBackend], None]] = None,
+        **kwargs,
+    ):
+        """
+        Yield chunks of a streamed chat completion.
+
+        Failover only happens before the first chunk; once a backend has
+        started answering, its errors are raised. `on_backend` is called
+        with that backend before its first chunk is yielded.
+        """
+        backends = self.candidates(task, prompt_tokens, kwargs.get("max_tokens", 0))
+        for backend in backends:
+            started = time.perf_counter()
+            chunks = backend.resilience.stream(
+                backend.client.chat.completions.create, model=backend.model, stream=True, **kwargs
+            )
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                self._fail_over(backend, e, backend is backends[-1])
+                continue
+            backend.record_success(started)
+            if on_backend is not None:
+                on_backend(backend)
+            if first is not None:
+                yield first
+                yield from chunks
+            return
+
+    async def astream(
+        self,
+        task: str,
+        prompt_tokens: int = 0,
+        on_backend: Optional[Callable[[ModelBackend], None]] = None,
+        **kwargs,
+    ):
+        """Yield chunks of a streamed chat completion (see `stream`)"""
+        backends = self.candidates(task, prompt_tokens, kwargs.get("max_tokens", 0))
+        for backend in backends:
+            started = time.perf_counter()
+            chunks = backend.resilience.astream(
+                backend.async_client.chat.completions.create,
+                model=backend.model,
+                stream=True,
+                **kwargs,
+            )
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = None
+            except Exception as e:
+                self._fail_over(backend, e, backend is backends[-1])
+                continue
+            backend.record_success(started)
+            if on_backend is not None:
+                on_backend(backend)
+            if first is not None:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+    async def aclose(self):
+        for backend in self.backends:
+            await backend.aclose()
+
+    def stats(self) -> dict:
+        return {backend.name: backend.stats() for backend in self.backends}
+
+
+def usage_tokens(response) -> int:
+    """Total tokens billed for a response, 0 if the provider didn't say"""
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) or 0
@@ -0,0 +1,205 @@
+"""
+Warm pool of pre-generated opening replies
+
+The bot's first reply is the slowest turn of a debate and the most
+predictable one: it depends only on the topic and side. The pool counts the
+(topic, side) pairs of new debates and, for the most popular ones, keeps a
+few openings generated ahead of time in background tasks. A new debate on a
+popular pair takes one instead of waiting for the LLM, and the pool is
+refilled behind it.
+
+Pairs are keyed by the engine's topic ID (see `topic_index`), so paraphrased
+topics count as one pair; openings are generated for the first wording seen.
+Only plain openings, the topic and side assignments the local parser
+recognizes, are served from the pool. Anything more may need a reply to what
+else the user said.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from debate_core.metrics import OPENING_POOL_REQUESTS
+from debate_core.topic_parser import parse_topic_and_side
+
+logger = logging.getLogger(__name__)
+
+# The opening the pool's replies are generated for
+OPENING_TEMPLATE = "Let's debate: {topic}. You argue {position} this position."
+
+
+class OpeningPool:
+    """Pre-generated openings for the most frequent (topic, side) pairs"""
+
+    def __init__(
+        self,
+        engine,
+        top_pairs: int = 50,
+        per_pair: int = 3,
+        ttl_seconds: float = 3600,
+        min_requests: int = 3,
+        max_tracked: int = 10_000,
+        refill_concurrency: int = 2,
+        clock=time.monotonic,
+    ):
+        self.engine = engine
+        self.top_pairs = top_pairs
+        self.per_pair = per_pair
+        self.ttl_seconds = ttl_seconds
+        self.min_requests = min_requests
+        self.max_tracked = max_tracked
+        self.refill_concurrency = refill_concurrency
+        self.clock = clock
+
+        # (topic ID, side) -> new debates seen, halved whenever too many pairs
+        # are tracked so old favourites fade, and the topic's first wording
+        self._counts = {}
+        self._wordings = {}
+        self._popular = frozenset()
+        self._popular_stale = False
+        # (topic ID, side) -> deque of (created_at, reply), oldest first
+        self._pools = {}
+        self._refilling = set()
+        self._tasks = set()
+        self._semaphore = None
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @classmethod
+    def from_env(cls, engine) -> Optional["OpeningPool"]:
+        """Build the pool from OPENING_POOL_* variables, or None if disabled"""
+        if os.getenv("OPENING_POOL_ENABLED", "false").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            engine,
+            top_pairs=int(os.getenv("OPENING_POOL_TOP_PAIRS", "50")),
+            per_pair=int(os.getenv("OPENING_POOL_PER_PAIR", "3")),
+            ttl_seconds=float(os.getenv("OPENING_POOL_TTL_SECONDS", "3600")),
+            min_requests=int(os.getenv("OPENING_POOL_MIN_REQUESTS", "3")),
+            refill_concurrency=int(os.getenv("OPENING_POOL_REFILL_CONCURRENCY", "2")),
+        )
+
+    # --- Popularity ---
+
+    def record(self, topic: str, side: str):
+        """Count a new debate, and start filling its pair's pool if it is popular"""
+        pair = (self.engine.topic_id(topic), side)
+        self._wordings.setdefault(pair, topic)
+        count = self._counts.get(pair, 0) + 1
+        self._counts[pair] = count
+        if len(self._counts) > self.max_tracked:
+            self._decay()
+        if count >= self.min_requests and pair not in self._popular:
+            self._popular_stale = True
+        self._refill(pair)
+
+    def _decay(self):
+        self._counts = {pair: count // 2 for pair, count in self._counts.items() if count > 1}
+        self._wordings = {pair: self._wordings[pair] for pair in self._counts}
+        self._popular_stale = True
+
+    def popular(self) -> frozenset:
+        """The pairs openings are kept for"""
+        if self._popular_stale:
+            ranked = heapq.nlargest(self.top_pairs, self._counts.items(), key=lambda item: item[1])
+            self._popular = frozenset(
+                pair for pair, count in ranked if count >= self.min_requests
+            )
+            self._popular_stale = False
+            # Pairs that dropped out keep no openings
+            for pair in list(self._pools):
+                if pair not in self._popular:
+                    del self._pools[pair]
+        return self._popular
+
+    # --- Serving ---
+
+    def take(self, topic: str, side: str, message: str) -> Optional[str]:
+        """A pre-generated reply to `message`, the opening of a new debate, if pooled"""
+        guess = parse_topic_and_side(message)
+        if guess.confidence < self.engine.topic_fast_path_min_confidence:
+            # Not a plain opening: the reply should answer the rest of it
+            return None
+
+        pair = (self.engine.topic_id(topic), side)
+        pool = self._pools.get(pair)
+        reply = None
+        while pool:
+            created_at, candidate = pool.popleft()
+            if self.clock() - created_at <= self.ttl_seconds:
+                reply = candidate
+                break
+            self.expired += 1
+
+        if reply is None:
+            self.misses += 1
+            OPENING_POOL_REQUESTS.inc("miss")
+        else:
+            self.hits += 1
+            OPENING_POOL_REQUESTS.inc("hit")
+        self._refill(pair)
+        return reply
+
+    # --- Refilling ---
+
+    def _refill(self, pair: tuple):
+        """Start a background task topping up the pair's pool, if it needs one"""
+        if pair in self._refilling or pair not in self.popular():
+            return
+        pool = self._pools.setdefault(pair, deque())
+        now = self.clock()
+        while pool and now - pool[0][0] > self.ttl_seconds:
+            pool.popleft()
+            self.expired += 1
+        if len(pool) >= self.per_pair:
+            return
+
+        self._refilling.add(pair)
+        task = asyncio.get_running_loop().create_task(self._fill(pair))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fill(self, pair: tuple):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.refill_concurrency)
+        topic, side = self._wordings[pair], pair[1]
+        opening = OPENING_TEMPLATE.format(
+            topic=topic, position="FOR" if side == "pro" else "AGAINST"
+        )
+        try:
+            while pair in self._pools and len(self._pools[pair]) < self.per_pair:
+                async with self._semaphore:
+                    reply = await self.engine.agenerate(opening, topic, side, [])
+                pool = self._pools.get(pair)
+                if pool is not None:
+                    pool.append((self.clock(), reply))
+        except Exception as e:
+            # Failed openings aren't pooled; the next debate on the pair retries
+            logger.warning("Could not pre-generate an opening for %s: %r", pair, e)
+        finally:
+            self._refilling.discard(pair)
+
+    async def aclose(self):
+        """Cancel refills in progress"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def __len__(self) -> int:
+        """Pooled openings"""
+        return sum(len(pool) for pool in self._pools.values())
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self),
+            "pairs": len(self._pools),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+        }
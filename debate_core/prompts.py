@@ -0,0 +1,77 @@
+"""
+Versioned system-prompt templates
+
+Each template is rendered once per (topic, side) and the result is cached
+together with its token count, so conversations can store their rendered
+prompt and context-budget decisions never re-tokenize it.
+"""
+
+import os
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Optional
+
+from debate_core.context import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+from task_2.prompt import SYSTEM_PROMPT, SYSTEM_PROMPT_CONCISE
+
+DEFAULT_TOPIC = "the given topic"
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    """A system prompt rendered for one (topic, side) with its token count"""
+
+    version: str
+    text: str
+    tokens: int
+
+    def as_message(self) -> dict:
+        return {"role": "system", "content": self.text}
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RenderedPrompt":
+        return cls(data["version"], data["text"], data["tokens"])
+
+
+class PromptTemplate:
+    """A versioned system-prompt template with cached renders"""
+
+    def __init__(self, version: str, template: str, render_cache_size: int = 4096):
+        self.version = version
+        self.template = template
+        # Tokens contributed by the fixed text, before topic/side are filled in
+        self.base_tokens = estimate_tokens(
+            template.replace("{topic}", "").replace("{side}", "")
+        )
+        self.render = lru_cache(maxsize=render_cache_size)(self._render)
+
+    def _render(self, topic: Optional[str], side: str) -> RenderedPrompt:
+        text = self.template.format(topic=topic or DEFAULT_TOPIC, side=side)
+        return RenderedPrompt(
+            self.version, text, estimate_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+        )
+
+
+PROMPT_TEMPLATES = {
+    template.version: template
+    for template in (
+        PromptTemplate("v1", SYSTEM_PROMPT),
+        PromptTemplate("v1-concise", SYSTEM_PROMPT_CONCISE),
+    )
+}
+
+DEFAULT_PROMPT_VERSION = "v1"
+
+
+def get_prompt_template(version: Optional[str] = None) -> PromptTemplate:
+    """Look up a template by version (defaults to PROMPT_VERSION or v1)"""
+    version = version or os.getenv("PROMPT_VERSION", DEFAULT_PROMPT_VERSION)
+    try:
+        return PROMPT_TEMPLATES[version]
+    except KeyError:
+        raise ValueError(
+            f"Unknown prompt version {version!r}; available: {', '.join(PROMPT_TEMPLATES)}"
+        )
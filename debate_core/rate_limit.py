@@ -0,0 +1,123 @@
+"""
+Per-client rate limiting for the debate API
+
+Each client (a known API key, or else its IP address) gets two token
+buckets: one for requests and one for estimated LLM tokens. A request is
+admitted only if both buckets can pay for it. Otherwise it is rejected with
+the time until they can, which the API returns as Retry-After.
+
+Buckets are kept in the process, so every uvicorn worker enforces the limits
+on its own.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from debate_core.metrics import RATE_LIMITED
+
+
+class TokenBucket:
+    """Holds up to `capacity` tokens, refilled at `rate` tokens per second"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # Requests bigger than the bucket take all of it rather than never passing
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Request and token buckets per client.
+
+    A limit of 0 disables it. Buckets of the least recently seen clients are
+    dropped beyond `max_clients`, which only forgives clients that have been
+    quiet the longest.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60,
+        request_burst: float = 10,
+        tokens_per_minute: float = 30_000,
+        max_clients: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.request_burst = request_burst
+        self.tokens_per_minute = tokens_per_minute
+        self.max_clients = max_clients
+        self.clock = clock
+        # client -> (request bucket, token bucket), least recently seen first
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["RateLimiter"]:
+        """Build the limiter from RATE_LIMIT_* variables, or None if both limits are 0"""
+        limiter = cls(
+            requests_per_minute=float(os.getenv("RATE_LIMIT_REQUESTS_PER_MINUTE", "60")),
+            request_burst=float(os.getenv("RATE_LIMIT_REQUEST_BURST", "10")),
+            tokens_per_minute=float(os.getenv("RATE_LIMIT_TOKENS_PER_MINUTE", "30000")),
+        )
+        if not limiter.requests_per_minute and not limiter.tokens_per_minute:
+            return None
+        return limiter
+
+    def _buckets(self, client: str, now: float) -> tuple:
+        buckets = self._clients.get(client)
+        if buckets is None:
+            buckets = self._clients[client] = (
+                TokenBucket(self.requests_per_minute / 60, max(1, self.request_burst), now)
+                if self.requests_per_minute
+                else None,
+                TokenBucket(self.tokens_per_minute / 60, self.tokens_per_minute, now)
+                if self.tokens_per_minute
+                else None,
+            )
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        return buckets
+
+    def check(self, client: str, tokens: int = 0) -> Optional[float]:
+        """
+        Admit a request costing `tokens` estimated LLM tokens.
+
+        Returns None if admitted, or the seconds to wait before retrying.
+        Rejected requests don't consume anything.
+        """
+        with self._lock:
+            now = self.clock()
+            requests, token_bucket = self._buckets(client, now)
+            request_wait = requests.wait_time(1, now) if requests else 0.0
+            token_wait = token_bucket.wait_time(tokens, now) if token_bucket else 0.0
+            if request_wait or token_wait:
+                RATE_LIMITED.inc("requests" if request_wait >= token_wait else "tokens")
+                return max(request_wait, token_wait)
+
+            if requests:
+                requests.take(1)
+            if token_bucket:
+                token_bucket.take(tokens)
+            return None
+
+    def __len__(self) -> int:
+        return len(self._clients)
@@ -0,0 +1,294 @@
+"""
+Redis conversation backend for DebateBot
+
+Keeps conversations in Redis (or anything speaking its protocol), so several
+API containers behind nginx share the same debates. Each conversation is two
+keys:
+- `{prefix}{id}`: a hash of topic, side, system prompt and update time
+- `{prefix}{id}:messages`: a list of messages, each the role's code digit
+  followed by the text, capped at the newest `max_messages`
+
+A sorted set `{prefix}index` scores conversations by their last update, so
+the store can count them and drop idle ones from the count.
+
+Commands are pipelined: a turn (append both messages, trim, touch the hash
+and the TTLs) and a load (hash and list) each cost one round-trip. The client
+speaks RESP over plain sockets, so no Redis library is needed; tests run
+against the in-process server in `benchmarks.fake_redis`.
+"""
+
+import json
+import socket
+import threading
+import time
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+from debate_core.store import ConversationStore
+from debate_core.turns import ROLE_CODES, TurnLog
+
+# Role codes are stored as an ASCII digit in front of each message
+DIGIT_ZERO = ord("0")
+
+
+class RedisError(Exception):
+    """An error reply from the server"""
+
+
+def encode_command(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%b\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def read_reply(reader):
+    """Read one RESP reply; error replies are returned as `RedisError`s"""
+    line = reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by the server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode("utf-8")
+    if kind == b"-":
+        return RedisError(payload.decode("utf-8"))
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Connection closed by the server")
+        return data[:-2]
+    if kind == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected reply from the server: {line[:40]!r}")
+
+
+class RedisClient:
+    """
+    Minimal thread-safe RESP client with pipelining.
+
+    Connections are pooled; each `execute` or `pipeline` call borrows one, so
+    concurrent requests don't wait on each other's round-trips.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", timeout: float = 5.0):
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported Redis URL: {url}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.round_trips = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile("rb"))
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._roundtrip(connection, setup)
+        return connection
+
+    @staticmethod
+    def _roundtrip(connection, commands: list) -> list:
+        sock, reader = connection
+        sock.sendall(b"".join(encode_command(*command) for command in commands))
+        replies = [read_reply(reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def pipeline(self, *commands: tuple) -> list:
+        """Send several commands in one round-trip and return their replies"""
+        with self._lock:
+            self.round_trips += 1
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._connect()
+        try:
+            replies = self._roundtrip(connection, commands)
+        except RedisError:
+            # The connection is still in sync: every reply was read
+            self._release(connection)
+            raise
+        except BaseException:
+            # A half-read reply would corrupt the next caller's
+            self._discard(connection)
+            raise
+        self._release(connection)
+        return replies
+
+    def execute(self, *command):
+        return self.pipeline(command)[0]
+
+    def _release(self, connection):
+        with self._lock:
+            self._idle.append(connection)
+
+    @staticmethod
+    def _discard(connection):
+        sock, reader = connection
+        reader.close()
+        sock.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._discard(connection)
+
+
+def encode_message(role: str, text: str) -> bytes:
+    try:
+        code = ROLE_CODES[role]
+    except KeyError:
+        raise ValueError(f"Unknown message role: {role!r}") from None
+    return bytes((DIGIT_ZERO + code,)) + text.encode("utf-8")
+
+
+def decode_messages(items: list) -> TurnLog:
+    roles = bytes(item[0] - DIGIT_ZERO for item in items)
+    return TurnLog.from_columns(roles, [item[1:].decode("utf-8") for item in items])
+
+
+class RedisConversationStore(ConversationStore):
+    """Shared store backed by Redis hashes and capped lists"""
+
+    blocking = True
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        prefix: str = "debatebot:",
+        max_messages: int = 1000,
+        ttl_seconds: Optional[float] = 3600,
+        timeout: float = 5.0,
+    ):
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+        self.client = RedisClient(url, timeout=timeout)
+        self.prefix = prefix
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.index_key = prefix + "index"
+
+    def _keys(self, conversation_id: str) -> tuple:
+        key = self.prefix + conversation_id
+        return key, key + ":messages"
+
+    def _touch(self, conversation_id: str, now: float, new: bool = False) -> list:
+        """Commands refreshing a conversation's TTLs and its place in the index"""
+        # XX: reading or appending to a missing conversation mustn't index it
+        zadd = ("ZADD", self.index_key) if new else ("ZADD", self.index_key, "XX")
+        commands = [(*zadd, now, conversation_id)]
+        if self.ttl_seconds is not None:
+            ttl_ms = int(self.ttl_seconds * 1000)
+            commands.extend(("PEXPIRE", key, ttl_ms) for key in self._keys(conversation_id))
+        return commands
+
+    def get(self, conversation_id: str) -> Optional[dict]:
+        key, messages_key = self._keys(conversation_id)
+        fields, items, *_ = self.client.pipeline(
+            ("HGETALL", key),
+            ("LRANGE", messages_key, 0, -1),
+            *self._touch(conversation_id, time.time()),
+        )
+        fields = dict(zip(fields[::2], fields[1::2]))
+        if b"topic" not in fields:
+            # Missing, or the leftover of a failed append being cleaned up
+            return None
+
+        system_prompt = fields.get(b"system_prompt")
+        return {
+            "topic": fields[b"topic"].decode("utf-8"),
+            "side": fields[b"side"].decode("utf-8"),
+            "history": decode_messages(items),
+            "system_prompt": json.loads(system_prompt) if system_prompt else None,
+        }
+
+    def put(self, conversation_id: str, conversation: dict):
+        key, messages_key = self._keys(conversation_id)
+        now = time.time()
+        fields = ["topic", conversation["topic"], "side", conversation["side"], "updated_at", now]
+        system_prompt = conversation.get("system_prompt")
+        if system_prompt:
+            fields += ["system_prompt", json.dumps(system_prompt)]
+
+        commands = [("DEL", key, messages_key), ("HSET", key, *fields)]
+        history = conversation["history"][-self.max_messages :]
+        if history:
+            commands.append(
+                ("RPUSH", messages_key, *(encode_message(m["role"], m["message"]) for m in history))
+            )
+        self.client.pipeline(*commands, *self._touch(conversation_id, now, new=True))
+
+    def append(self, conversation_id: str, *messages: dict):
+        key, messages_key = self._keys(conversation_id)
+        now = time.time()
+        # HSET reports how many fields it created: 1 means the hash was missing
+        created, *_ = self.client.pipeline(
+            ("HSET", key, "updated_at", now),
+            ("RPUSH", messages_key, *(encode_message(m["role"], m["message"]) for m in messages)),
+            ("LTRIM", messages_key, -self.max_messages, -1),
+            *self._touch(conversation_id, now),
+        )
+        if created:
+            self.delete(conversation_id)
+            raise KeyError(conversation_id)
+
+    def recent(self, conversation_id: str, n: int) -> list:
+        if n <= 0:
+            return []
+        _, messages_key = self._keys(conversation_id)
+        items = self.client.execute("LRANGE", messages_key, -n, -1)
+        return [turn.to_dict() for turn in decode_messages(items)]
+
+    def delete(self, conversation_id: str):
+        self.client.pipeline(
+            ("DEL", *self._keys(conversation_id)),
+            ("ZREM", self.index_key, conversation_id),
+        )
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return bool(self.client.execute("EXISTS", self._keys(conversation_id)[0]))
+
+    def __len__(self) -> int:
+        if self.ttl_seconds is None:
+            return self.client.execute("ZCARD", self.index_key)
+        # Conversations Redis has expired still have an index entry; drop them
+        _, count = self.client.pipeline(
+            ("ZREMRANGEBYSCORE", self.index_key, "-inf", time.time() - self.ttl_seconds),
+            ("ZCARD", self.index_key),
+        )
+        return count
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self),
+            "host": f"{self.client.host}:{self.client.port}",
+            "max_messages": self.max_messages,
+            "round_trips": self.client.round_trips,
+        }
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,343 @@
+"""
+Resilience layer for outbound LLM calls
+
+Wraps OpenAI SDK calls with the protections a provider brownout needs:
+- a per-request timeout (set on the SDK clients from `API_TIMEOUT`)
+- retries of 429/5xx, timeouts and dropped connections with exponential
+  backoff, full jitter, and any Retry-After the provider sends
+- a cap on in-flight calls so slow responses can't pile up unboundedly
+- a circuit breaker that fails fast once the provider keeps failing
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when a call is rejected without reaching the provider"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised while the circuit breaker is open"""
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Return the delay requested by a Retry-After(-Ms) header, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        # HTTP-date form
+        import email.utils
+
+        parsed = email.utils.parsedate_to_datetime(retry_after)
+        if parsed is None:
+            return None
+        return max(0.0, parsed.timestamp() - time.time())
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an error is transient on the provider side and worth retrying"""
+    import openai
+
+    if isinstance(error, openai.APIConnectionError):
+        # Includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honoring Retry-After"""
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_retry_after: float = 30.0,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number `attempt` (starting at 0)"""
+        if retry_after is not None:
+            # The provider knows best; add a little jitter to avoid a thundering herd
+            return min(retry_after, self.max_retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `failure_threshold` failed attempts in a row the circuit opens and
+    calls are rejected for `reset_timeout` seconds. Then a single trial call
+    is let through (half-open): success closes the circuit, failure opens it
+    again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError("LLM provider is failing; circuit breaker is open")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Let another trial through after one was abandoned (e.g. cancelled)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("LLM circuit breaker opened after %d failures", self.failures)
+                self.opened_at = self.clock()
+            self._trial_in_flight = False
+
+
+class ResilientClient:
+    """Runs OpenAI SDK calls under a retry policy, concurrency cap and breaker"""
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_concurrency: int = 50,
+        queue_timeout: Optional[float] = None,
+    ):
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_concurrency = max_concurrency
+        # How long a call may wait for a free slot before giving up
+        self.queue_timeout = timeout if queue_timeout is None else queue_timeout
+
+        # Calls holding a slot, including ones waiting to retry
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._sync_slots = threading.BoundedSemaphore(max_concurrency)
+        # asyncio semaphores belong to one event loop, so keep one per loop
+        self._async_slots = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_env(cls) -> "ResilientClient":
+        """Build the client from API_TIMEOUT and LLM_* environment variables"""
+        return cls(
+            timeout=float(os.getenv("API_TIMEOUT", "10")),
+            retry=RetryPolicy(
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+                base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+            ),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "50")),
+        )
+
+    # --- Concurrency slots ---
+
+    def _track(self, delta: int):
+        with self._in_flight_lock:
+            self.in_flight += delta
+
+    @contextmanager
+    def _slot(self):
+        if not self._sync_slots.acquire(timeout=self.queue_timeout):
+            raise LLMUnavailableError("Too many concurrent LLM requests")
+        self._track(1)
+        try:
+            yield
+        finally:
+            self._track(-1)
+            self._sync_slots.release()
+
+    @asynccontextmanager
+    async def _aslot(self):
+        loop = asyncio.get_running_loop()
+        slots = self._async_slots.get(loop)
+        if slots is None:
+            slots = self._async_slots[loop] = asyncio.Semaphore(self.max_concurrency)
+
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMUnavailableError("Too many concurrent LLM requests") from None
+        self._track(1)
+        try:
+            yield
+        finally:
+            self._track(-1)
+            slots.release()
+
+    # --- Retries ---
+
+    def _next_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Record a failed attempt; return the backoff delay or None to give up"""
+        if not is_retryable(error):
+            # Our own bad request: the provider answered, so it is healthy
+            self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+        if attempt >= self.retry.max_retries or self.breaker.state != CircuitBreaker.CLOSED:
+            return None
+
+        delay = self.retry.delay(attempt, retry_after_seconds(error))
+        logger.warning(
+            "LLM call failed (%s); retry %d/%d in %.2fs",
+            error.__class__.__name__,
+            attempt + 1,
+            self.retry.max_retries,
+            delay,
+        )
+        return delay
+
+    def _call_with_retries(self, fn, args, kwargs):
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    self.breaker.release_trial()
+                    raise
+                delay = self._next_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def _acall_with_retries(self, fn, args, kwargs):
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    self.breaker.release_trial()
+                    raise
+                delay = self._next_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    # --- Public API ---
+
+    def call(self, fn, *args, **kwargs):
+        """Call a synchronous SDK method"""
+        with self._slot():
+            return self._call_with_retries(fn, args, kwargs)
+
+    async def acall(self, fn, *args, **kwargs):
+        """Await an async SDK method"""
+        async with self._aslot():
+            return await self._acall_with_retries(fn, args, kwargs)
+
+    def stream(self, fn, *args, **kwargs):
+        """
+        Open a synchronous SDK stream and yield its chunks.
+
+        Only opening the stream is retried; the concurrency slot is held until
+        the stream is exhausted.
+        """
+        with self._slot():
+            yield from self._call_with_retries(fn, args, kwargs)
+
+    async def astream(self, fn, *args, **kwargs):
+        """
+        Open an async SDK stream and yield its chunks.
+
+        Only opening the stream is retried; the concurrency slot is held until
+        the stream is exhausted.
+        """
+        async with self._aslot():
+            stream = await self._acall_with_retries(fn, args, kwargs)
+            async for chunk in stream:
+                yield chunk
+
+    def stats(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+        }
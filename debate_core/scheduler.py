@@ -0,0 +1,90 @@
+"""
+Fair scheduling of LLM calls across clients
+
+At most `max_concurrency` calls run at once. When every slot is busy, calls
+queue per client, and each freed slot goes to the next client in
+round-robin order rather than to the oldest queued call. A client with a
+hundred queued calls then delays everyone else by one call, not a hundred.
+Slots and queues belong to one worker process.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from debate_core.metrics import LLM_QUEUE_WAIT
+
+
+class FairScheduler:
+    """Round-robin slot allocation across clients, for one event loop"""
+
+    def __init__(self, max_concurrency: int = 50):
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.queued = 0
+        # client -> futures of its waiting calls; clients in round-robin order
+        self._queues = OrderedDict()
+
+    async def acquire(self, client: str):
+        """Wait for a slot; the caller must release() it"""
+        if self.active < self.max_concurrency and not self._queues:
+            self.active += 1
+            LLM_QUEUE_WAIT.observe(0.0)
+            return
+
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client, deque()).append(future)
+        self.queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the call was cancelled
+                self.release()
+            else:
+                self._discard(client, future)
+            raise
+        LLM_QUEUE_WAIT.observe(time.perf_counter() - started)
+
+    def release(self):
+        """Hand the slot to the next client in turn, or free it"""
+        while self._queues:
+            client, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            if not future.cancelled():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def _discard(self, client: str, future: asyncio.Future):
+        queue = self._queues.get(client)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        self.queued -= 1
+        if not queue:
+            del self._queues[client]
+
+    @asynccontextmanager
+    async def slot(self, client: str):
+        """Hold a slot for the enclosed block"""
+        await self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "queued_clients": len(self._queues),
+            "max_concurrency": self.max_concurrency,
+        }
@@ -0,0 +1,142 @@
+"""
+Shard-aware conversation IDs and the consistent-hash ring that places them
+
+Conversation IDs start with the conversation's shard, one of `SHARDS`, as
+three hex digits: "1a7-5f0e...". A router can then send every turn of a
+debate to the same replica, where its conversation (with the in-memory
+backend) and its caches live, without a lookup table.
+
+Shards are placed on replicas by a consistent-hash ring: each replica owns
+the shards hashing between its virtual nodes and the next replica's. When a
+replica joins or leaves, only the shards it gains or loses move, about 1/N
+of them, and every other debate stays where its state is.
+
+IDs from before sharding (plain UUIDs) have no prefix; their shard is a hash
+of the whole ID, so they are routed consistently too.
+"""
+
+import bisect
+import hashlib
+import random
+import re
+import threading
+import uuid
+from typing import Iterable, Optional
+
+# Fixed for the life of a deployment: it is baked into conversation IDs
+SHARDS = 4096
+SHARD_ID = re.compile(r"^([0-9a-f]{3})-")
+
+# Request header the router uses to tell a replica which shard to create a
+# new conversation in
+SHARD_HEADER = "X-Debate-Shard"
+
+
+def new_conversation_id(shard: Optional[int] = None) -> str:
+    """A new conversation ID in `shard`, or in a random shard"""
+    if shard is None:
+        shard = random.randrange(SHARDS)
+    if not 0 <= shard < SHARDS:
+        raise ValueError(f"shard must be in [0, {SHARDS})")
+    return f"{shard:03x}-{uuid.uuid4()}"
+
+
+def conversation_shard(conversation_id: str) -> int:
+    """The shard a conversation ID belongs to"""
+    match = SHARD_ID.match(conversation_id)
+    if match:
+        return int(match.group(1), 16)
+    return ring_hash(conversation_id) % SHARDS
+
+
+def parse_shard(value: Optional[str]) -> Optional[int]:
+    """A shard from the `SHARD_HEADER` header, or None if missing or invalid"""
+    if not value:
+        return None
+    try:
+        shard = int(value)
+    except ValueError:
+        return None
+    return shard if 0 <= shard < SHARDS else None
+
+
+def ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent-hash ring from shards to nodes.
+
+    Each node gets `vnodes` points on the ring; a shard belongs to the node
+    of the first point at or after its own hash. Shard owners are cached and
+    recomputed when a node joins or leaves.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        if vnodes < 1:
+            raise ValueError("vnodes must be at least 1")
+        self.vnodes = vnodes
+        self._nodes = set()
+        self._points = []  # sorted (hash, node)
+        self._owners = None  # shard -> node, rebuilt lazily
+        self._shard_hashes = [ring_hash(f"shard-{shard}") for shard in range(SHARDS)]
+        self._lock = threading.Lock()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> frozenset:
+        return frozenset(self._nodes)
+
+    def add(self, node: str) -> bool:
+        """Add a node; return False if it was already on the ring"""
+        with self._lock:
+            if node in self._nodes:
+                return False
+            self._nodes.add(node)
+            for replica in range(self.vnodes):
+                bisect.insort(self._points, (ring_hash(f"{node}#{replica}"), node))
+            self._owners = None
+            return True
+
+    def remove(self, node: str) -> bool:
+        """Remove a node; return False if it wasn't on the ring"""
+        with self._lock:
+            if node not in self._nodes:
+                return False
+            self._nodes.discard(node)
+            self._points = [point for point in self._points if point[1] != node]
+            self._owners = None
+            return True
+
+    def _assign(self) -> list:
+        if not self._points:
+            return [None] * SHARDS
+        hashes = [point[0] for point in self._points]
+        owners = []
+        for shard_hash in self._shard_hashes:
+            index = bisect.bisect_left(hashes, shard_hash)
+            owners.append(self._points[index % len(self._points)][1])
+        return owners
+
+    def node_for_shard(self, shard: int) -> Optional[str]:
+        """The node owning `shard`, or None if the ring is empty"""
+        owners = self._owners
+        if owners is None:
+            with self._lock:
+                if self._owners is None:
+                    self._owners = self._assign()
+                owners = self._owners
+        return owners[shard]
+
+    def node_for(self, conversation_id: str) -> Optional[str]:
+        """The node owning a conversation"""
+        return self.node_for_shard(conversation_shard(conversation_id))
+
+    def shards_of(self, node: str) -> list:
+        """The shards a node owns"""
+        return [shard for shard in range(SHARDS) if self.node_for_shard(shard) == node]
+
+    def __len__(self) -> int:
+        return len(self._nodes)
@@ -0,0 +1,260 @@
+"""
+SQLite conversation backend for DebateBot
+
+Stores conversations in a WAL-mode SQLite database so several uvicorn workers
+(or restarts of a single worker) share the same debates. Messages are
+append-only rows keyed by (conversation_id, seq), so reading the latest turns
+is an index range scan rather than a full transcript load.
+
+`get` returns the history as a `SqliteHistory`, which reads rows only when
+they are indexed or sliced. A turn reads the last few messages for its
+response and the messages added since the engine last converted the
+conversation (see `MessageBuffer`), not the whole transcript. The API reads
+those ahead with `prefetch()` in a worker thread (see
+`DebateEngine.prefetch_history`), so the event loop is served from memory.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Union
+
+from debate_core.store import ConversationStore
+from debate_core.turns import Turn, TurnLog
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    side TEXT NOT NULL,
+    system_prompt TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_conversation_seq
+    ON messages (conversation_id, seq);
+"""
+
+
+class SqliteHistory:
+    """
+    A stored conversation's messages, read on demand.
+
+    Behaves like a `TurnLog` for reading (len, indexing, slicing,
+    iteration); each access reads just its rows through the
+    (conversation_id, seq) index. Rows read up to the end are kept, so the
+    newest messages are read once, and `prefetch()` reads them ahead. The
+    length is fixed when the conversation is loaded, so turns appended
+    meanwhile don't shift it.
+    """
+
+    __slots__ = ("_store", "_conversation_id", "_length", "_tail_start", "_tail")
+
+    def __init__(self, store: "SqliteConversationStore", conversation_id: str, length: int):
+        self._store = store
+        self._conversation_id = conversation_id
+        self._length = length
+        # Rows from _tail_start to the end, once read
+        self._tail_start = length
+        self._tail = []
+
+    def _query(self, start: int, stop: int) -> list:
+        rows = self._store._connection().execute(
+            "SELECT role, message FROM messages "
+            "WHERE conversation_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+            (self._conversation_id, start, stop),
+        ).fetchall()
+        return [Turn(role, message) for role, message in rows]
+
+    def _read(self, start: int, stop: int) -> list:
+        if start >= stop:
+            return []
+        if stop < self._tail_start:
+            return self._query(start, stop)
+        if start < self._tail_start:
+            self._tail[:0] = self._query(start, self._tail_start)
+            self._tail_start = start
+        return self._tail[start - self._tail_start : stop - self._tail_start]
+
+    def prefetch(self, start: int):
+        """Read the messages from `start` to the end now, so later accesses don't query"""
+        self._read(max(start, 0), self._length)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                return list(self)[index]
+            return self._read(start, stop)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("history index out of range")
+        return self._read(index, index + 1)[0]
+
+    def __iter__(self):
+        return iter(self._read(0, self._length))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (SqliteHistory, TurnLog, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"SqliteHistory({list(self)!r})"
+
+
+class SqliteConversationStore(ConversationStore):
+    """Persistent store backed by a WAL-mode SQLite database"""
+
+    blocking = True
+
+    def __init__(self, path: str = "conversations.db", busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        # sqlite3 connections must not be shared across threads
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+
+        # Databases created before system prompts were stored lack the column
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(conversations)")}
+        if "system_prompt" not in columns:
+            conn.execute("ALTER TABLE conversations ADD COLUMN system_prompt TEXT")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly below
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        # Take the write lock up front so concurrent workers can't allocate
+        # the same sequence numbers
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get(self, conversation_id: str) -> Optional[dict]:
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT topic, side, system_prompt FROM conversations WHERE id = ?",
+            (conversation_id,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        # Sequence numbers run from 0 without gaps, so this is the length
+        (length,) = conn.execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE conversation_id = ?",
+            (conversation_id,),
+        ).fetchone()
+        return {
+            "topic": row[0],
+            "side": row[1],
+            "history": SqliteHistory(self, conversation_id, length),
+            "system_prompt": json.loads(row[2]) if row[2] else None,
+        }
+
+    def put(self, conversation_id: str, conversation: dict):
+        now = time.time()
+        with self._transaction() as conn:
+            system_prompt = conversation.get("system_prompt")
+            conn.execute(
+                "INSERT OR REPLACE INTO conversations "
+                "(id, topic, side, system_prompt, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    conversation_id,
+                    conversation["topic"],
+                    conversation["side"],
+                    json.dumps(system_prompt) if system_prompt else None,
+                    now,
+                    now,
+                ),
+            )
+            conn.execute(
+                "DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)
+            )
+            self._insert_messages(conn, conversation_id, 0, conversation["history"], now)
+
+    def append(self, conversation_id: str, *messages: dict):
+        now = time.time()
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE conversations SET updated_at = ? WHERE id = ?",
+                (now, conversation_id),
+            ).rowcount
+            if not updated:
+                raise KeyError(conversation_id)
+
+            (next_seq,) = conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+            self._insert_messages(conn, conversation_id, next_seq, messages, now)
+
+    @staticmethod
+    def _insert_messages(conn, conversation_id, first_seq, messages, now):
+        conn.executemany(
+            "INSERT INTO messages (conversation_id, seq, role, message, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (conversation_id, first_seq + offset, msg["role"], msg["message"], now)
+                for offset, msg in enumerate(messages)
+            ],
+        )
+
+    def recent(self, conversation_id: str, n: int) -> list:
+        rows = self._connection().execute(
+            "SELECT role, message FROM messages WHERE conversation_id = ? "
+            "ORDER BY seq DESC LIMIT ?",
+            (conversation_id, n),
+        ).fetchall()
+        return [{"role": role, "message": message} for role, message in reversed(rows)]
+
+    def delete(self, conversation_id: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+
+    def __contains__(self, conversation_id: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        (count,) = self._connection().execute(
+            "SELECT COUNT(*) FROM conversations"
+        ).fetchone()
+        return count
+
+    def stats(self) -> dict:
+        return {"size": len(self), "path": self.path}
@@ -0,0 +1,201 @@
+"""
+Conversation storage backends for DebateBot
+
+A conversation is a dict with the debate `topic`, the bot's `side`, the
+message `history` and, optionally, its rendered `system_prompt` (see
+`debate_core.prompts`). Stores hand out histories as compact `TurnLog`s
+(see `debate_core.turns`) and accept any list of message dicts.
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from debate_core.turns import TurnLog
+
+
+class ConversationStore(ABC):
+    """Interface the API uses to load and save conversations"""
+
+    # Whether calls wait on the network or the disk; the API then makes them
+    # from a worker thread rather than the event loop
+    blocking = False
+
+    @abstractmethod
+    def get(self, conversation_id: str) -> Optional[dict]:
+        """Return the conversation, or None if it does not exist"""
+
+    @abstractmethod
+    def put(self, conversation_id: str, conversation: dict):
+        """Create or replace a conversation"""
+
+    @abstractmethod
+    def append(self, conversation_id: str, *messages: dict):
+        """Append messages to an existing conversation's history"""
+
+    def recent(self, conversation_id: str, n: int) -> list:
+        """Return the last `n` messages of a conversation"""
+        conversation = self.get(conversation_id)
+        return conversation["history"][-n:] if conversation else []
+
+    @abstractmethod
+    def delete(self, conversation_id: str):
+        """Remove a conversation if it exists"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored conversations"""
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return self.get(conversation_id) is not None
+
+    def stats(self) -> dict:
+        """Backend counters for monitoring"""
+        return {"size": len(self)}
+
+    def close(self):
+        """Flush and release the backend on shutdown"""
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    Bounded in-process store with LRU eviction and an idle TTL.
+
+    Entries live in an OrderedDict ordered from least to most recently used,
+    so get/put are O(1) and the eviction candidates are always at the front.
+    """
+
+    # Container histories are kept in; `list` keeps plain message dicts
+    history_type = TurnLog
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: Optional[float] = 3600):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # conversation_id -> (conversation, last_access)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - last_access > self.ttl_seconds
+
+    def _purge_expired(self, now: float):
+        # Least recently used entries come first, so stop at the first live one
+        while self._entries:
+            conversation_id, (_, last_access) = next(iter(self._entries.items()))
+            if not self._expired(last_access, now):
+                break
+            del self._entries[conversation_id]
+            self.expirations += 1
+
+    def get(self, conversation_id: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            conversation, last_access = entry
+            if self._expired(last_access, now):
+                del self._entries[conversation_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries[conversation_id] = (conversation, now)
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+            return conversation
+
+    def put(self, conversation_id: str, conversation: dict):
+        if not isinstance(conversation["history"], self.history_type):
+            conversation = {**conversation, "history": self.history_type(conversation["history"])}
+
+        now = time.monotonic()
+        with self._lock:
+            self._entries[conversation_id] = (conversation, now)
+            self._entries.move_to_end(conversation_id)
+
+            self._purge_expired(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def append(self, conversation_id: str, *messages: dict):
+        conversation = self.get(conversation_id)
+        if conversation is None:
+            raise KeyError(conversation_id)
+        conversation["history"].extend(messages)
+
+    def delete(self, conversation_id: str):
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def create_store_from_env() -> ConversationStore:
+    """Build the conversation store configured by environment variables"""
+    backend = os.getenv("CONVERSATION_BACKEND", "memory").lower()
+
+    if backend == "memory":
+        ttl = float(os.getenv("CONVERSATION_TTL_SECONDS", "3600"))
+        return InMemoryConversationStore(
+            max_entries=int(os.getenv("CONVERSATION_MAX_ENTRIES", "10000")),
+            ttl_seconds=ttl if ttl > 0 else None,
+        )
+
+    if backend == "sqlite":
+        from debate_core.sqlite_store import SqliteConversationStore
+
+        return SqliteConversationStore(
+            os.getenv("CONVERSATION_DB_PATH", "conversations.db")
+        )
+
+    if backend == "wal":
+        from debate_core.wal_store import WalConversationStore
+
+        ttl = float(os.getenv("CONVERSATION_TTL_SECONDS", "3600"))
+        return WalConversationStore(
+            os.getenv("CONVERSATION_WAL_DIR", "conversation-wal"),
+            sync=os.getenv("WAL_SYNC", "batch"),
+            fsync_interval=float(os.getenv("WAL_FSYNC_INTERVAL_MS", "10")) / 1000,
+            snapshot_every=int(os.getenv("WAL_SNAPSHOT_EVERY", "100000")),
+            segment_bytes=int(os.getenv("WAL_SEGMENT_MB", "64")) * 1024 * 1024,
+            max_entries=int(os.getenv("CONVERSATION_MAX_ENTRIES", "10000")),
+            ttl_seconds=ttl if ttl > 0 else None,
+        )
+
+    if backend == "redis":
+        from debate_core.redis_store import RedisConversationStore
+
+        ttl = float(os.getenv("CONVERSATION_TTL_SECONDS", "3600"))
+        return RedisConversationStore(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            prefix=os.getenv("REDIS_KEY_PREFIX", "debatebot:"),
+            max_messages=int(os.getenv("CONVERSATION_MAX_MESSAGES", "1000")),
+            ttl_seconds=ttl if ttl > 0 else None,
+        )
+
+    raise ValueError(f"Unknown CONVERSATION_BACKEND: {backend}")
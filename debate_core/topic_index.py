@@ -0,0 +1,290 @@
+"""
+Local index of canonical debate topics
+
+Users phrase the same topic many ways ("Is climate change real?", "climate
+change is real"), so extracted topics are matched against the topics seen
+before and near-duplicates share the first one's canonical ID. Caches,
+precomputed openings and analytics can then key on the ID. The user's own
+wording is what the debate is about; the index never replaces it.
+
+Topics are compared by their features: content words (lowercased, stopwords
+dropped and suffixes stripped, so "regulating" and "regulation" both become
+"regulat") and each pair of neighboring content words in order. Word order
+and numbers decide what a motion says ("dogs are better than cats", "a $25
+minimum wage"), so swapping words shares few features, and topics with
+different numbers or a negation share none. Each topic gets a MinHash
+signature of its features, whose agreement estimates the Jaccard similarity
+of two feature sets. Nearest neighbors are found with locality-sensitive
+hashing: the signature is cut into bands of 4 values, and topics sharing any
+band are candidates. The candidates agreeing most are then compared exactly.
+
+Band keys live in a sorted NumPy array that one `searchsorted` call probes
+for all bands. New topics' keys go to a dict first and are merged into the
+sorted array in batches, so inserts stay cheap at millions of topics. Once
+the index holds `max_topics`, new topics are no longer added and get IDs of
+their own wording. The index matches wording, not meaning: synonyms
+("global warming" for "climate change") are different topics.
+"""
+
+import hashlib
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from debate_core.metrics import TOPIC_INDEX_LOOKUPS
+
+WORD = re.compile(r"[a-z0-9]+")
+
+# Framing words that don't change what a debate is about
+STOPWORDS = frozenset(
+    """
+    a an the is are was were be been being am should would could can will shall
+    must may might do does did it its this that these those there of to in on
+    for with by as at from into about and or but whether if we our us you your
+    i me my they them their he she his her really truly very just than debate
+    topic motion
+    """.split()
+)
+
+# "nuclear power is not safe" is the opposite motion, not a paraphrase
+NEGATION = re.compile(r"\b(?:not|no|never|nor)\b")
+CONTRACTION = re.compile(r"n['’]t\b")
+# Negation words, and what "can't" and "won't" leave behind
+NEGATION_WORDS = frozenset(("not", "no", "never", "nor", "ca", "wo"))
+
+# Stripped in order, the first that leaves a stem of at least 3 letters
+SUFFIXES = ("ings", "ing", "ions", "ion", "ies", "es", "ed", "ly", "s", "e", "y")
+
+# Signature values per band; four 16-bit values pack into one 64-bit key
+ROWS_PER_BAND = 4
+
+
+# Candidates compared exactly, out of those whose signatures agree most
+VERIFIED_CANDIDATES = 4
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def topic_features(topic: str) -> frozenset:
+    """
+    The stemmed content words of a topic, and its neighboring pairs in order.
+
+    In a negated topic, or one with numbers, every feature is marked with
+    them, so it shares nothing with the same topic negated or with other
+    numbers.
+    """
+    lowered = CONTRACTION.sub(" not", topic.lower())
+    words = WORD.findall(lowered)
+    tokens = [stem(word) for word in words if word not in STOPWORDS and word not in NEGATION_WORDS]
+    features = set(tokens)
+    features.update(f"{a}>{b}" for a, b in zip(tokens, tokens[1:]))
+
+    marks = [word for word in tokens if word.isdigit()]
+    if NEGATION.search(lowered):
+        marks.append("not")
+    if marks:
+        mark = ",".join(marks) + ":"
+        features = {mark + feature for feature in features}
+    # All-stopword topics still need something to compare
+    return frozenset(features or {" ".join(words)})
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b)
+
+
+def topic_id(topic: str) -> str:
+    """Stable ID of a canonical topic, the same in every process"""
+    normalized = " ".join(WORD.findall(topic.lower()))
+    return "t-" + hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@dataclass(frozen=True)
+class TopicMatch:
+    """The canonical topic a topic resolved to"""
+
+    topic_id: str
+    topic: str
+    similarity: float
+    new: bool = False
+
+
+class TopicIndex:
+    """Incremental nearest-neighbor index from topics to canonical topics"""
+
+    def __init__(
+        self,
+        threshold: float = 0.6,
+        num_perm: int = 64,
+        buffer_size: int = 16384,
+        max_bucket: int = 64,
+        max_topics: int = 1_000_000,
+        seed: int = 1,
+    ):
+        if num_perm % ROWS_PER_BAND:
+            raise ValueError(f"num_perm must be a multiple of {ROWS_PER_BAND}")
+        self.threshold = threshold
+        self.max_topics = max_topics
+        self.num_perm = num_perm
+        self.bands = num_perm // ROWS_PER_BAND
+        self.buffer_size = buffer_size
+        self.max_bucket = max_bucket
+
+        # Multiply-shift hash functions, one per signature value
+        rng = np.random.default_rng(seed)
+        self._mul = rng.integers(1, 2**63, num_perm, dtype=np.uint64) * 2 + 1
+        self._add = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        # Per-band salts, so equal values in different bands don't collide
+        self._salts = rng.integers(0, 2**63, self.bands, dtype=np.uint64)
+
+        self._topics = []
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint16)
+        # Band keys of merged topics, sorted, and the topic each belongs to
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._ids = np.empty(0, dtype=np.uint32)
+        # Band keys of the newest topics, not merged yet (ids follow _merged):
+        # as rows for merging, and key -> topic indexes for lookups
+        self._buffer = np.empty((buffer_size, self.bands), dtype=np.uint64)
+        self._buffered = 0
+        self._buffer_index = {}
+        self._merged = 0
+        self._lock = threading.Lock()
+
+    def signature(self, topic: str) -> np.ndarray:
+        """MinHash signature of the topic's features"""
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in topic_features(topic)),
+            dtype=np.uint64,
+        )
+        # Wrapping 64-bit multiply-shift; the top 16 bits are the hash value
+        values = self._mul[:, None] * hashes[None, :] + self._add[:, None]
+        return (values >> np.uint64(48)).astype(np.uint16).min(axis=1)
+
+    @staticmethod
+    def similarity(a: str, b: str) -> float:
+        """Overlap of two topics' features, from 0 to 1"""
+        return jaccard(topic_features(a), topic_features(b))
+
+    def band_keys(self, signature: np.ndarray) -> np.ndarray:
+        return signature.view(np.uint64) ^ self._salts
+
+    def _candidates(self, keys: np.ndarray) -> np.ndarray:
+        found = []
+        starts = np.searchsorted(self._keys, keys, side="left")
+        ends = np.searchsorted(self._keys, keys, side="right")
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end > start:
+                found.append(self._ids[start : min(end, start + self.max_bucket)])
+
+        for key in keys.tolist():
+            indexes = self._buffer_index.get(key)
+            if indexes is not None:
+                found.append(np.array(indexes, dtype=np.uint32))
+
+        if not found:
+            return np.empty(0, dtype=np.uint32)
+        return np.unique(np.concatenate(found))
+
+    def _nearest(self, topic: str, signature: np.ndarray) -> Optional[tuple]:
+        """(topic index, similarity) of the closest known topic, if any shares a band"""
+        candidates = self._candidates(self.band_keys(signature))
+        if not len(candidates):
+            return None
+        agreement = np.count_nonzero(self._signatures[candidates] == signature, axis=1)
+        # Signatures only estimate the overlap; compare the best few exactly
+        best = np.argsort(-agreement, kind="stable")[:VERIFIED_CANDIDATES]
+        features = topic_features(topic)
+        return max(
+            (
+                (index, jaccard(features, topic_features(self._topics[index])))
+                for index in candidates[best].tolist()
+            ),
+            key=lambda match: match[1],
+        )
+
+    def _match(self, index: int, similarity: float, new: bool = False) -> TopicMatch:
+        topic = self._topics[index]
+        return TopicMatch(topic_id(topic), topic, similarity, new)
+
+    def lookup(self, topic: str) -> Optional[TopicMatch]:
+        """The canonical topic for `topic`, or None if it is new"""
+        signature = self.signature(topic)
+        with self._lock:
+            nearest = self._nearest(topic, signature)
+            if nearest is None or nearest[1] < self.threshold:
+                return None
+            return self._match(*nearest)
+
+    def add(self, topic: str) -> TopicMatch:
+        """
+        Resolve `topic` to its canonical topic, making it canonical if it is new.
+
+        A full index resolves new topics to themselves without adding them.
+        """
+        signature = self.signature(topic)
+        with self._lock:
+            nearest = self._nearest(topic, signature)
+            if nearest is not None and nearest[1] >= self.threshold:
+                TOPIC_INDEX_LOOKUPS.inc("matched")
+                return self._match(*nearest)
+
+            if len(self._topics) >= self.max_topics:
+                TOPIC_INDEX_LOOKUPS.inc("full")
+                return TopicMatch(topic_id(topic), topic, 1.0, new=True)
+
+            TOPIC_INDEX_LOOKUPS.inc("new")
+            index = len(self._topics)
+            if index == len(self._signatures):
+                self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+            self._signatures[index] = signature
+            self._topics.append(topic)
+
+            keys = self.band_keys(signature)
+            self._buffer[self._buffered] = keys
+            self._buffered += 1
+            for key in keys.tolist():
+                self._buffer_index.setdefault(key, []).append(index)
+            if self._buffered == self.buffer_size:
+                self._merge()
+            return self._match(index, 1.0, new=True)
+
+    def _merge(self):
+        """Move buffered band keys into the sorted arrays; the caller holds _lock"""
+        keys = self._buffer[: self._buffered].ravel()
+        ids = np.repeat(
+            np.arange(self._merged, self._merged + self._buffered, dtype=np.uint32), self.bands
+        )
+        order = np.argsort(keys, kind="stable")
+        keys, ids = keys[order], ids[order]
+        positions = np.searchsorted(self._keys, keys, side="right")
+        self._keys = np.insert(self._keys, positions, keys)
+        self._ids = np.insert(self._ids, positions, ids)
+        self._merged += self._buffered
+        self._buffered = 0
+        self._buffer_index.clear()
+
+    def __len__(self) -> int:
+        return len(self._topics)
+
+    def stats(self) -> dict:
+        return {
+            "topics": len(self),
+            "max_topics": self.max_topics,
+            "buffered": self._buffered,
+            "index_bytes": self._keys.nbytes
+            + self._ids.nbytes
+            + self._buffer.nbytes
+            + self._signatures[: len(self)].nbytes,
+        }
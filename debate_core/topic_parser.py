@@ -0,0 +1,147 @@
+"""
+Local fast-path parser for debate openings
+
+Recognizes common phrasings such as "Let's debate: X. You argue FOR this
+position." without an LLM call. Each guess carries a confidence so callers
+can fall back to LLM extraction when the phrasing is unusual.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+# Phrases that introduce the debate topic; the topic runs to the end of the sentence
+TOPIC_PATTERNS = [
+    re.compile(
+        r"\blet'?s debate\s*:?\s*(?:(?:about|on)\s+)?(?:(?:whether|if)\s+)?(?P<topic>[^.!?\n]+)",
+        re.I,
+    ),
+    re.compile(r"\bdebate (?:topic|motion)\s*(?::|is)\s*(?P<topic>[^.!?\n]+)", re.I),
+    re.compile(r"\b(?:topic|motion)\s*:\s*(?P<topic>[^.!?\n]+)", re.I),
+    re.compile(
+        r"\bdebate (?:about|on|whether|if)\s+(?:(?:whether|if)\s+)?(?P<topic>[^.!?\n]+)",
+        re.I,
+    ),
+    re.compile(
+        r"\b(?:i want to|i'd like to|let's|let us) (?:discuss|talk about|argue about)\s+(?P<topic>[^.!?\n]+)",
+        re.I,
+    ),
+]
+
+# Phrases that assign the bot's side
+CON_PATTERN = re.compile(
+    r"\b(?:argue|arguing|take|taking|you(?:'re| are)?|be|play)\b[^.!?\n]{0,30}?\b"
+    r"(?:against|con|oppos(?:e|ing|ed)|negative)\b"
+    r"|\b(?:con|against|opposing|negative) (?:side|position)\b"
+    r"|\byou oppose\b",
+    re.I,
+)
+PRO_PATTERN = re.compile(
+    r"\b(?:argue|arguing|take|taking|you(?:'re| are)?|be|play)\b[^.!?\n]{0,30}?\b"
+    r"(?:for|pro|in favou?r|support(?:ing)?|affirmative)\b"
+    r"|\b(?:pro|for|supporting|affirmative) (?:side|position)\b"
+    r"|\byou support\b",
+    re.I,
+)
+
+# Words that turn a side against its object ("argue for abolishing it"): the
+# side is then not the topic's, so the fast path leaves it to the LLM
+NEGATING_PATTERN = re.compile(
+    r"\b(?:abolish\w*|ban(?:s|ned|ning)?|prohibit\w*|outlaw\w*|eliminat\w*"
+    r"|end(?:s|ing)?|get(?:ting)? rid of|scrap(?:s|ped|ping)?|repeal\w*|against"
+    r"|oppos\w*|reject\w*|stop(?:s|ped|ping)?|not)\b",
+    re.I,
+)
+REST_OF_SENTENCE = re.compile(r"[^.!?\n]*")
+
+# Trailing clauses that belong to the side assignment, not the topic
+SIDE_CLAUSE = re.compile(
+    r"\s*[,;(–—]\s*(?:and\s+)?(?:you|please|take|argue|i'm|i am|i'll|i will)\b.*$",
+    re.I,
+)
+
+HIGH_CONFIDENCE = 0.9
+
+
+@dataclass(frozen=True)
+class TopicGuess:
+    """A locally parsed topic and side with how much to trust them"""
+
+    topic: Optional[str]
+    side: Optional[str]
+    confidence: float
+
+
+def _clean_topic(topic: str) -> str:
+    topic = SIDE_CLAUSE.sub("", topic).strip(" \"'“”:,")
+    return topic
+
+
+def _assigned_side(message: str) -> Optional[str]:
+    """The side the message assigns the bot, None if unclear"""
+    con = CON_PATTERN.search(message)
+    pro = PRO_PATTERN.search(message)
+    if (con is None) == (pro is None):
+        return None
+    match = con or pro
+    # "Argue for abolishing it" is against the topic, whatever the keyword says
+    if NEGATING_PATTERN.search(REST_OF_SENTENCE.match(message, match.end()).group()):
+        return None
+    return "con" if con else "pro"
+
+
+def parse_topic_and_side(message: str) -> TopicGuess:
+    """Guess the debate topic and bot side from an opening message"""
+    topic = None
+    for pattern in TOPIC_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            topic = _clean_topic(match.group("topic")) or None
+            if topic:
+                break
+
+    side = _assigned_side(message)
+
+    if topic and side:
+        confidence = HIGH_CONFIDENCE
+    elif topic or side:
+        confidence = 0.4
+    else:
+        confidence = 0.0
+
+    return TopicGuess(topic, side, confidence)
+
+
+def normalize_message(message: str) -> str:
+    """Normalize an opening message for memoization"""
+    return " ".join(message.lower().split())
+
+
+class ExtractionMemo:
+    """Bounded LRU memo of (topic, side) results keyed by normalized message"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, message: str) -> Optional[tuple]:
+        key = normalize_message(message)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, message: str, result: tuple):
+        key = normalize_message(message)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
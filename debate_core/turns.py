@@ -0,0 +1,141 @@
+"""
+Compact storage for debate histories
+
+A debate used to keep each message as its own `{"role": ..., "message": ...}`
+dict, and the dict costs more memory than a typical message. `TurnLog` keeps
+a history in columns instead: roles as one-byte codes in a `bytearray`, and
+message strings in a list. That is 9 bytes per message on top of the text.
+`Turn` records are created only when a message is read, and are converted to
+Pydantic models only at the API boundary.
+"""
+
+from typing import Iterable, Union
+
+# Role codes; "bot" is the API's name for the assistant, "assistant" Streamlit's
+ROLES = ("user", "bot", "assistant", "system")
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+
+def turn_fields(message) -> tuple:
+    """Return (role, message) of a dict, `Turn` or Pydantic `Message`"""
+    if isinstance(message, dict):
+        return message["role"], message["message"]
+    return message.role, message.message
+
+
+class Turn:
+    """One message of a debate, as read from a `TurnLog`"""
+
+    __slots__ = ("role", "message")
+
+    def __init__(self, role: str, message: str):
+        self.role = role
+        self.message = message
+
+    def __getitem__(self, key: str) -> str:
+        # Dict-style access, for code written against the old message dicts
+        if key == "role":
+            return self.role
+        if key == "message":
+            return self.message
+        raise KeyError(key)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Turn, dict)):
+            return turn_fields(self) == turn_fields(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Turn(role={self.role!r}, message={self.message!r})"
+
+    def to_dict(self) -> dict:
+        return {"role": self.role, "message": self.message}
+
+
+class TurnLog:
+    """
+    Append-only, columnar debate history.
+
+    Behaves like a list of `Turn`s for reading (len, indexing, slicing,
+    iteration) and accepts dicts, `Turn`s or `Message` models when appending.
+    """
+
+    __slots__ = ("_roles", "_messages")
+
+    def __init__(self, messages: Iterable = ()):
+        self._roles = bytearray()
+        self._messages = []
+        self.extend(messages)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "TurnLog":
+        """Build a log from (role, message) pairs, such as database rows"""
+        log = cls()
+        for role, text in rows:
+            log.append_fields(role, text)
+        return log
+
+    @classmethod
+    def from_columns(cls, roles: bytes, messages: list) -> "TurnLog":
+        """Rebuild a log from the output of `columns()`"""
+        log = cls()
+        log.extend_columns(roles, messages)
+        return log
+
+    def extend_columns(self, roles: bytes, messages: list):
+        """Append messages given as role codes and texts, as from `columns()`"""
+        if len(roles) != len(messages) or max(roles, default=0) >= len(ROLES):
+            raise ValueError("Role codes don't match the messages")
+        self._roles.extend(roles)
+        self._messages.extend(messages)
+
+    def columns(self, length: int = None) -> tuple:
+        """(role codes, message texts) of the first `length` messages, for serializing"""
+        if length is None:
+            length = len(self._messages)
+        return bytes(self._roles[:length]), self._messages[:length]
+
+    def append(self, message):
+        self.append_fields(*turn_fields(message))
+
+    def append_fields(self, role: str, text: str):
+        try:
+            code = ROLE_CODES[role]
+        except KeyError:
+            raise ValueError(f"Unknown message role: {role!r}") from None
+        self._roles.append(code)
+        self._messages.append(text)
+
+    def extend(self, messages: Iterable):
+        for message in messages:
+            self.append(message)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [
+                Turn(ROLES[code], text)
+                for code, text in zip(self._roles[index], self._messages[index])
+            ]
+        return Turn(ROLES[self._roles[index]], self._messages[index])
+
+    def __iter__(self):
+        for code, text in zip(self._roles, self._messages):
+            yield Turn(ROLES[code], text)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (TurnLog, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"TurnLog({list(self)!r})"
+
+    def to_list(self) -> list:
+        """The history as plain message dicts"""
+        return [
+            {"role": ROLES[code], "message": text}
+            for code, text in zip(self._roles, self._messages)
+        ]
@@ -0,0 +1,249 @@
+"""
+Segmented write-ahead log
+
+Records are opaque byte payloads, each framed as a little-endian header
+(payload length, CRC-32 of the payload) followed by the payload. They are
+appended to numbered segment files (`wal-00000001.log`, ...) and a new
+segment starts once the current one passes `segment_bytes`, or when a
+snapshot asks for one with `rotate()`.
+
+Appends only add the frame to an in-process buffer. A background thread
+writes the buffer out and fsyncs it, so every record appended in the
+meantime shares one write and one fsync (group commit). How long `append()`
+waits depends on `sync`:
+- "always": until its record is on disk. Callers that serialize appends
+  under a lock of their own should append with `wait=False` and call
+  `wait_durable()` after releasing it, or only one record is ever pending
+  and nothing is shared
+- "batch": not at all; the log is fsynced every `fsync_interval` seconds,
+  so a crash loses at most that much
+- "none": not at all, and the OS decides when to write to disk
+
+On replay a torn or corrupt frame at the end of the last segment (a crash
+mid-write) is cut off. Anywhere else it raises `CorruptLogError`.
+"""
+
+import logging
+import os
+import re
+import struct
+import threading
+import zlib
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# Payload length and CRC-32 of the payload
+HEADER = struct.Struct("<II")
+SEGMENT_PATTERN = re.compile(r"^wal-(\d{8})\.log$")
+SYNC_MODES = ("always", "batch", "none")
+
+
+class CorruptLogError(ValueError):
+    """Raised when a record fails its checksum before the end of the log"""
+
+
+def frame(payload: bytes) -> bytes:
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_frames(data: bytes) -> tuple:
+    """
+    Split a buffer into payloads.
+
+    Returns (payloads, valid_bytes): the payloads of every intact frame, and
+    the offset just past the last one.
+    """
+    payloads = []
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, checksum = HEADER.unpack_from(data, offset)
+        start = offset + HEADER.size
+        payload = data[start : start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        payloads.append(payload)
+        offset = start + length
+    return payloads, offset
+
+
+class WriteAheadLog:
+    """Append-only, checksummed, segmented log with group commit"""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        sync: str = "batch",
+        fsync_interval: float = 0.01,
+    ):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"sync must be one of {SYNC_MODES}, not {sync!r}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.sync = sync
+        self.fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+
+        existing = self.segments()
+        self.segment = existing[-1] if existing else 1
+        self._file = None
+
+        # Frames waiting for the flusher, and sequence numbers of appended
+        # and of durable records
+        self._pending = []
+        self._appended = 0
+        self._durable = 0
+        self.fsyncs = 0
+        self._cond = threading.Condition()
+        # Serializes writes to the segment files (flushes and rotation)
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = None
+
+    # --- Segments ---
+
+    def segments(self) -> list:
+        """Numbers of the segment files on disk, oldest first"""
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"wal-{number:08d}.log")
+
+    def replay(self, start_segment: int = 1) -> Iterator[bytes]:
+        """Yield every payload from `start_segment` on, cutting off a torn tail"""
+        segments = [number for number in self.segments() if number >= start_segment]
+        for index, number in enumerate(segments):
+            path = self.segment_path(number)
+            with open(path, "rb") as f:
+                data = f.read()
+            payloads, valid = read_frames(data)
+            yield from payloads
+
+            if valid < len(data):
+                if index < len(segments) - 1:
+                    raise CorruptLogError(f"{path} is corrupt at byte {valid}")
+                logger.warning(
+                    "Cutting %d bytes of torn records off %s", len(data) - valid, path
+                )
+                with open(path, "r+b") as f:
+                    f.truncate(valid)
+
+    def open(self):
+        """Start appending to the newest segment; call after replay()"""
+        self._file = open(self.segment_path(self.segment), "ab")
+        self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+        self._flusher.start()
+
+    def rotate(self) -> int:
+        """
+        Start a new segment and return its number.
+
+        Every record appended before the call is in an older segment.
+        """
+        with self._io_lock:
+            self._write_pending()
+            self._next_segment()
+            return self.segment
+
+    def _next_segment(self):
+        self._file.flush()
+        if self.sync != "none":
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+        self._file.close()
+        self.segment += 1
+        self._file = open(self.segment_path(self.segment), "ab")
+
+    def remove_before(self, segment: int):
+        """Delete segments older than `segment`, once a snapshot covers them"""
+        for number in self.segments():
+            if number < segment:
+                os.remove(self.segment_path(number))
+
+    # --- Appending ---
+
+    def append(self, payload: bytes, wait: bool = True) -> int:
+        """
+        Append a record and return its sequence number.
+
+        With `wait=False` it returns without waiting for durability; pass the
+        sequence number to `wait_durable()` later.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-ahead log is closed")
+            self._pending.append(frame(payload))
+            self._appended += 1
+            sequence = self._appended
+
+        if self.sync == "always":
+            self._wake.set()
+            if wait:
+                self.wait_durable(sequence)
+        return sequence
+
+    def wait_durable(self, sequence: int):
+        """In "always" mode, wait until record `sequence` is on disk"""
+        if self.sync != "always":
+            return
+        with self._cond:
+            while self._durable < sequence:
+                self._cond.wait()
+
+    def _write_pending(self):
+        """Write out buffered frames in one go; the caller holds _io_lock"""
+        with self._cond:
+            frames, self._pending = self._pending, []
+            sequence = self._appended
+        if frames:
+            self._file.write(b"".join(frames))
+            self._file.flush()
+            if self.sync != "none":
+                os.fsync(self._file.fileno())
+                self.fsyncs += 1
+            if self._file.tell() >= self.segment_bytes:
+                self._next_segment()
+        with self._cond:
+            self._durable = sequence
+            self._cond.notify_all()
+
+    def flush(self):
+        """Write and fsync everything appended so far"""
+        with self._io_lock:
+            self._write_pending()
+
+    def _run_flusher(self):
+        while not self._closed:
+            # In "always" mode appends wake the flusher right away; records
+            # arriving while it writes are committed together next round
+            self._wake.wait(None if self.sync == "always" else self.fsync_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "segment": self.segment,
+            "segments": len(self.segments()),
+            "appended": self._appended,
+            "durable": self._durable,
+            "fsyncs": self.fsyncs,
+            "sync": self.sync,
+        }
@@ -0,0 +1,370 @@
+"""
+Durable in-memory conversation backend
+
+Conversations live in memory, and every change is first appended to a
+write-ahead log (see `debate_core.wal`): one record per new conversation,
+per chat turn and per deletion. A turn costs a JSON encode and a buffered
+write instead of a database round-trip, and fsyncs are shared between
+turns.
+
+Like the in-memory store, it is bounded: conversations idle for longer than
+`ttl_seconds`, and the least recently used beyond `max_entries`, are
+evicted, and each eviction is logged as a deletion. Idle time isn't logged;
+recovered conversations count as used at startup.
+
+Every `snapshot_every` records the whole state is written to a snapshot file
+in the background, and the log segments it covers are deleted. On startup
+the newest intact snapshot is loaded and the log written after it is
+replayed.
+
+The directory is locked, so only one process can use it: run a single
+uvicorn worker with this backend.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from debate_core.store import ConversationStore
+from debate_core.turns import TurnLog
+from debate_core.wal import CorruptLogError, WriteAheadLog, frame, read_frames
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATTERN = re.compile(r"^snapshot-(\d{8})\.snap$")
+# Role codes are written as ASCII digits, one per message
+TO_DIGITS = bytes.maketrans(bytes(range(10)), b"0123456789")
+FROM_DIGITS = bytes.maketrans(b"0123456789", bytes(range(10)))
+
+
+def encode_roles(roles: bytes) -> str:
+    return roles.translate(TO_DIGITS).decode("ascii")
+
+
+def decode_roles(digits: str) -> bytes:
+    return digits.encode("ascii").translate(FROM_DIGITS)
+
+
+def encode_messages(messages) -> tuple:
+    """(role digits, texts) of message dicts or turns, for a log record"""
+    log = TurnLog(messages)
+    roles, texts = log.columns()
+    return encode_roles(roles), texts
+
+
+def dumps(record: dict) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class WalConversationStore(ConversationStore):
+    """In-memory conversations made durable by a write-ahead log and snapshots"""
+
+    # Writes wait for their fsync with sync="always"
+    blocking = True
+
+    def __init__(
+        self,
+        directory: str = "conversation-wal",
+        sync: str = "batch",
+        fsync_interval: float = 0.01,
+        snapshot_every: int = 100_000,
+        segment_bytes: int = 64 * 1024 * 1024,
+        max_entries: int = 10_000,
+        ttl_seconds: Optional[float] = 3600,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._lock_directory()
+
+        # Least recently used first, and when each was last used
+        self._conversations = OrderedDict()
+        self._last_access = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        self._records_since_snapshot = 0
+        self._snapshot_thread = None
+        self.snapshots_written = 0
+
+        self.wal = WriteAheadLog(directory, segment_bytes, sync, fsync_interval)
+        self.recovery = self._recover()
+        now = time.monotonic()
+        self._last_access = dict.fromkeys(self._conversations, now)
+        self.wal.open()
+
+    def _lock_directory(self):
+        lock_file = open(os.path.join(self.directory, "LOCK"), "a")
+        try:
+            import fcntl
+
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            # No advisory locks on this platform; rely on a single worker
+            pass
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(f"{self.directory} is in use by another process") from None
+        return lock_file
+
+    # --- Applying records ---
+
+    def _apply(self, record: dict):
+        op = record["op"]
+        if op == "append":
+            conversation = self._conversations.get(record["id"])
+            if conversation is not None:
+                conversation["history"].extend_columns(
+                    decode_roles(record["roles"]), record["messages"]
+                )
+        elif op == "put":
+            self._conversations[record["id"]] = {
+                "topic": record["topic"],
+                "side": record["side"],
+                "history": TurnLog.from_columns(decode_roles(record["roles"]), record["messages"]),
+                "system_prompt": record.get("system_prompt"),
+            }
+        elif op == "delete":
+            self._conversations.pop(record["id"], None)
+            self._last_access.pop(record["id"], None)
+        else:
+            raise CorruptLogError(f"Unknown log record {op!r}")
+
+    def _log(self, record: dict) -> int:
+        """
+        Append a record to the log and apply it; the caller holds _lock.
+
+        Returns the record's sequence number. Callers wait for it to be
+        durable after releasing _lock, so concurrent writers share fsyncs.
+        """
+        sequence = self.wal.append(dumps(record), wait=False)
+        self._apply(record)
+        self._records_since_snapshot += 1
+        if self._records_since_snapshot >= self.snapshot_every:
+            self._start_snapshot()
+        return sequence
+
+    def _touch(self, conversation_id: str, now: float):
+        """Mark a conversation as just used; the caller holds _lock"""
+        self._conversations.move_to_end(conversation_id)
+        self._last_access[conversation_id] = now
+
+    def _expired(self, conversation_id: str, now: float) -> bool:
+        return (
+            self.ttl_seconds is not None
+            and now - self._last_access[conversation_id] > self.ttl_seconds
+        )
+
+    def _evict(self, now: float):
+        """
+        Drop idle and excess conversations; the caller holds _lock.
+
+        Nobody waits for these deletions to be durable: one lost in a crash
+        only brings an idle conversation back.
+        """
+        while self._conversations:
+            conversation_id = next(iter(self._conversations))
+            if self._expired(conversation_id, now):
+                self.expirations += 1
+            elif len(self._conversations) > self.max_entries:
+                self.evictions += 1
+            else:
+                break
+            self._log({"op": "delete", "id": conversation_id})
+
+    # --- ConversationStore ---
+
+    def get(self, conversation_id: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return None
+            if self._expired(conversation_id, now):
+                self.expirations += 1
+                self._log({"op": "delete", "id": conversation_id})
+                return None
+            self._touch(conversation_id, now)
+            return conversation
+
+    def put(self, conversation_id: str, conversation: dict):
+        roles, messages = encode_messages(conversation["history"])
+        now = time.monotonic()
+        with self._lock:
+            sequence = self._log(
+                {
+                    "op": "put",
+                    "id": conversation_id,
+                    "topic": conversation["topic"],
+                    "side": conversation["side"],
+                    "system_prompt": conversation.get("system_prompt"),
+                    "roles": roles,
+                    "messages": messages,
+                }
+            )
+            self._touch(conversation_id, now)
+            self._evict(now)
+        self.wal.wait_durable(sequence)
+
+    def append(self, conversation_id: str, *messages: dict):
+        roles, texts = encode_messages(messages)
+        now = time.monotonic()
+        with self._lock:
+            if conversation_id not in self._conversations:
+                raise KeyError(conversation_id)
+            sequence = self._log(
+                {"op": "append", "id": conversation_id, "roles": roles, "messages": texts}
+            )
+            self._touch(conversation_id, now)
+        self.wal.wait_durable(sequence)
+
+    def delete(self, conversation_id: str):
+        with self._lock:
+            if conversation_id not in self._conversations:
+                return
+            sequence = self._log({"op": "delete", "id": conversation_id})
+        self.wal.wait_durable(sequence)
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "snapshots_written": self.snapshots_written,
+            "recovery": self.recovery,
+            **self.wal.stats(),
+        }
+
+    # --- Snapshots ---
+
+    def snapshot_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{segment:08d}.snap")
+
+    def snapshots(self) -> list:
+        """Segment numbers of the snapshots on disk, oldest first"""
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = SNAPSHOT_PATTERN.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _start_snapshot(self):
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return
+        self._records_since_snapshot = 0
+        view = self._snapshot_view()
+        self._snapshot_thread = threading.Thread(
+            target=self._write_snapshot, args=view, daemon=True
+        )
+        self._snapshot_thread.start()
+
+    def _snapshot_view(self) -> tuple:
+        """
+        Start a new segment and capture the state as of that point; the
+        caller holds _lock.
+
+        Histories only grow, so remembering each one's length is enough to
+        serialize it later while turns keep being appended.
+        """
+        segment = self.wal.rotate()
+        entries = [
+            (conversation_id, conversation, len(conversation["history"]))
+            for conversation_id, conversation in self._conversations.items()
+        ]
+        return segment, entries
+
+    def _write_snapshot(self, segment: int, entries: list):
+        path = self.snapshot_path(segment)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(frame(dumps({"snapshot": 1, "segment": segment, "size": len(entries)})))
+            for conversation_id, conversation, length in entries:
+                roles, messages = conversation["history"].columns(length)
+                record = {
+                    "id": conversation_id,
+                    "topic": conversation["topic"],
+                    "side": conversation["side"],
+                    "system_prompt": conversation.get("system_prompt"),
+                    "roles": encode_roles(roles),
+                    "messages": messages,
+                }
+                f.write(frame(dumps(record)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+        # The snapshot covers everything before `segment`
+        self.wal.remove_before(segment)
+        for older in self.snapshots():
+            if older < segment:
+                os.remove(self.snapshot_path(older))
+        self.snapshots_written += 1
+        logger.info("Wrote snapshot of %d conversations to %s", len(entries), path)
+
+    def snapshot(self):
+        """Write a snapshot now and wait for it"""
+        with self._lock:
+            self._records_since_snapshot = 0
+            view = self._snapshot_view()
+        self._write_snapshot(*view)
+
+    def _load_snapshot(self, segment: int) -> bool:
+        with open(self.snapshot_path(segment), "rb") as f:
+            payloads, _ = read_frames(f.read())
+        if not payloads:
+            return False
+        header = json.loads(payloads[0])
+        if header.get("segment") != segment or header.get("size") != len(payloads) - 1:
+            return False
+
+        for payload in payloads[1:]:
+            record = json.loads(payload.decode("utf-8"))
+            record["op"] = "put"
+            self._apply(record)
+        return True
+
+    def _recover(self) -> dict:
+        """Load the newest intact snapshot and replay the log after it"""
+        started = time.perf_counter()
+        start_segment = 1
+        for segment in reversed(self.snapshots()):
+            if self._load_snapshot(segment):
+                start_segment = segment
+                break
+            logger.warning("Skipping damaged snapshot %s", self.snapshot_path(segment))
+            self._conversations.clear()
+
+        replayed = 0
+        for payload in self.wal.replay(start_segment):
+            self._apply(json.loads(payload.decode("utf-8")))
+            replayed += 1
+
+        recovery = {
+            "snapshot_segment": start_segment if start_segment > 1 else None,
+            "conversations": len(self._conversations),
+            "replayed_records": replayed,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info("Recovered conversation store: %s", recovery)
+        return recovery
+
+    def close(self):
+        """Flush the log and release the directory"""
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        self.wal.close()
+        self._lock_file.close()
@@ -1,27 +1,126 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import uuid
+from starlette.concurrency import run_in_threadpool
+import hashlib
+import json
+import math
+import threading
+import time
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
 from typing import Optional
 
-from task_2.prompt import SYSTEM_PROMPT
-
-# Load environment variables
-load_dotenv()
-
-app = FastAPI(
-    title="DebateBot API",
-    description="AI-powered debate conversation API",
-    version="1.0.0",
+from debate_core.context import estimate_tokens
+from debate_core.engine import DEBATE_PARAMS, DebateEngine, apology_message
+from debate_core.metrics import (
+    CONVERSATION_STORE_SIZE,
+    LLM_IN_FLIGHT,
+    LLM_QUEUE_DEPTH,
+    OPENING_POOL_SIZE,
+    TIME_TO_FIRST_TOKEN,
+    render_prometheus,
+    timed,
 )
+from debate_core.opening_pool import OpeningPool
+from debate_core.rate_limit import RateLimiter
+from debate_core.scheduler import FairScheduler
+from debate_core.sharding import SHARD_HEADER, new_conversation_id, parse_shard
+from debate_core.turns import Turn
+from debate_core.store import create_store_from_env
+
+# Shared debate engine (OpenAI client pool, context window, caches) and
+# conversation storage (bounded in-memory LRU by default, see CONVERSATION_*
+# env vars); both are created by create_app()
+engine: Optional[DebateEngine] = None
+conversation_store = None
+
+# Per-client admission in front of the LLM: rate limits (None when disabled),
+# round-robin scheduling of LLM calls, and the API keys clients are told
+# apart by (everyone else is keyed by IP address)
+rate_limiter: Optional[RateLimiter] = None
+scheduler: Optional[FairScheduler] = None
+api_keys: frozenset = frozenset()
+
+# Pre-generated first replies for popular topics (None when disabled)
+opening_pool: Optional[OpeningPool] = None
+
+router = APIRouter()
+
+# Seconds after startup before the OpenAI SDK is imported in the background
+PREWARM_DELAY_SECONDS = 1.0
+
+# Earlier messages returned with each turn's reply
+RECENT_MESSAGES = 8
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Import the OpenAI SDK in the background once the server is up, so the
+    # first debate doesn't pay for it and startup isn't slowed by it either
+    prewarm = None
+    if os.getenv("LLM_PREWARM", "true").lower() in ("1", "true", "yes"):
+        prewarm = threading.Timer(PREWARM_DELAY_SECONDS, engine.prewarm)
+        prewarm.daemon = True
+        prewarm.start()
+    yield
+    if prewarm is not None:
+        prewarm.cancel()
+    # Stop refilling openings, release pooled connections and flush the
+    # conversation store on shutdown
+    if opening_pool is not None:
+        await opening_pool.aclose()
+    await engine.aclose()
+    conversation_store.close()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the DebateBot API.
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# In-memory conversation storage
-conversations = {}
+    Loads `.env`, creates the engine and conversation store and registers the
+    routes. Heavy dependencies (the OpenAI SDK) are imported on first use, so
+    this stays fast for cold starts. Serve it with
+    `uvicorn --factory fastapi_app:create_app`.
+    """
+    global engine, conversation_store, rate_limiter, scheduler, api_keys, opening_pool
+    from dotenv import load_dotenv
+
+    # Load environment variables
+    load_dotenv()
+
+    engine = DebateEngine.from_env()
+    conversation_store = create_store_from_env()
+    rate_limiter = RateLimiter.from_env()
+    scheduler = FairScheduler(int(os.getenv("LLM_MAX_CONCURRENCY", "50")))
+    opening_pool = OpeningPool.from_env(engine)
+    api_keys = frozenset(
+        key.strip() for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if key.strip()
+    )
+
+    # Gauges are read only when /metrics is scraped
+    CONVERSATION_STORE_SIZE.set_function(lambda: len(conversation_store))
+    LLM_IN_FLIGHT.set_function(lambda: engine.router.in_flight)
+    LLM_QUEUE_DEPTH.set_function(lambda: scheduler.queued)
+    OPENING_POOL_SIZE.set_function(lambda: len(opening_pool) if opening_pool is not None else 0)
+
+    app = FastAPI(
+        title="DebateBot API",
+        description="AI-powered debate conversation API",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    app.include_router(router)
+    return app
+
+
+def __getattr__(name: str):
+    # `fastapi_app:app` keeps working: the app is built on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class ChatRequest(BaseModel):
@@ -47,90 +146,177 @@ class ChatResponse(BaseModel):
     message: list[MessageItem]
 
 
-def extract_topic_and_side(message: str):
-    """Extract topic and side from the first message using OpenAI"""
-    try:
-        extraction_prompt = """Analyze this message and extract:
-1. The debate topic
-2. What side the bot should argue (pro/for or con/against)
-
-Message: "{message}"
-
-Respond in this exact format:
-TOPIC: [the debate topic]
-SIDE: [pro or con]"""
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that extracts debate topics and positions from messages.",
-                },
-                {"role": "user", "content": extraction_prompt.format(message=message)},
-            ],
-            max_tokens=100,
-            temperature=0.3,
+def client_id(request: Request) -> str:
+    """Who a request counts against: a known API key, or else the client IP"""
+    api_key = request.headers.get("x-api-key")
+    authorization = request.headers.get("authorization", "")
+    if not api_key and authorization.lower().startswith("bearer "):
+        api_key = authorization[len("bearer ") :].strip()
+    if api_key and api_key in api_keys:
+        # Keys are only held hashed
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    # Behind a proxy this is the real client only if uvicorn trusts the
+    # proxy's X-Forwarded-For (--forwarded-allow-ips); otherwise every
+    # request counts against the proxy's IP
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+def turn_tokens(message: str) -> int:
+    """Estimated LLM tokens of a debate turn: the message plus the longest reply"""
+    return estimate_tokens(message) + DEBATE_PARAMS["max_tokens"]
+
+
+def admit(client: str, tokens: int):
+    """Reject the request with a 429 if the client is over its rate limits"""
+    if rate_limiter is None:
+        return
+    retry_after = rate_limiter.check(client, tokens)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
         )
 
-        result = response.choices[0].message.content
 
-        # Parse the response
-        topic = "the given topic"
-        side = "pro"
+async def store_call(method, *args):
+    """
+    Call a conversation store method without blocking the event loop.
 
-        for line in result.split("\n"):
-            if line.startswith("TOPIC:"):
-                topic = line.replace("TOPIC:", "").strip()
-            elif line.startswith("SIDE:"):
-                side_text = line.replace("SIDE:", "").strip().lower()
-                side = "pro" if "pro" in side_text or "for" in side_text else "con"
+    Backends that wait on the network or the disk run in a worker thread, so
+    a slow store doesn't stall every other debate; in-memory calls are
+    cheaper than the thread hop and run directly.
+    """
+    if conversation_store.blocking:
+        return await run_in_threadpool(method, *args)
+    return method(*args)
 
-        return topic, side
 
-    except Exception as e:
-        # Default fallback
-        return "the given topic", "pro"
+def load_conversation(conversation_id: str) -> Optional[dict]:
+    """
+    Load a conversation and the stored messages its next turn reads.
+
+    Histories some backends read lazily are read ahead here, so that with
+    `store_call` no query is left for the event loop.
+    """
+    conversation = conversation_store.get(conversation_id)
+    if conversation is not None:
+        engine.prefetch_history(conversation_id, conversation["history"], RECENT_MESSAGES)
+    return conversation
+
+
+async def extract_topic_and_side(message: str):
+    """Extract topic and side from the first message"""
+    return await engine.aextract_topic_and_side(message)
 
 
-def generate_debate_response(
-    user_message: str, topic: str, side: str, conversation_history: list
+async def generate_debate_response(
+    user_message: str,
+    topic: str,
+    side: str,
+    conversation_history: list,
+    conversation_id: Optional[str] = None,
+    system_prompt: Optional[dict] = None,
 ):
     """Generate AI response for debate"""
     try:
-        # Format the system prompt with topic and side
-        system_prompt = SYSTEM_PROMPT.format(topic=topic, side=side)
-
-        # Prepare messages for OpenAI
-        messages = [{"role": "system", "content": system_prompt}]
-
-        # Add conversation history
-        for msg in conversation_history:
-            # Convert 'bot' role to 'assistant' for OpenAI API
-            role = "assistant" if msg["role"] == "bot" else msg["role"]
-            messages.append({"role": role, "content": msg["message"]})
-
-        # Add the current user message
-        messages.append({"role": "user", "content": user_message})
-
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            max_tokens=500,
-            temperature=0.7,
-            presence_penalty=0.6,
-            frequency_penalty=0.3,
-        )
+        with timed("generate"):
+            return await engine.agenerate(
+                user_message,
+                topic,
+                side,
+                conversation_history,
+                conversation_id,
+                system_prompt,
+            )
+    except Exception as e:
+        return apology_message(e)
 
-        return response.choices[0].message.content
 
-    except Exception as e:
-        return f"I apologize, but I'm having trouble generating a response right now. Error: {str(e)}"
+async def stream_debate_response(
+    user_message: str,
+    topic: str,
+    side: str,
+    conversation_history: list,
+    conversation_id: Optional[str] = None,
+    system_prompt: Optional[dict] = None,
+):
+    """
+    Generate AI response for debate, yielding completion deltas as they arrive.
+
+    Errors propagate: part of the reply may already have been sent, so the
+    caller reports the failure rather than appending an apology to it.
+    """
+    async for delta in engine.astream(
+        user_message,
+        topic,
+        side,
+        conversation_history,
+        conversation_id,
+        system_prompt,
+    ):
+        yield delta
+
+
+async def get_or_create_conversation(
+    request: ChatRequest, speculate: bool = False, shard: Optional[int] = None
+):
+    """
+    Return (conversation_id, conversation, reply), starting a new debate if needed.
+
+    A new debate's ID is in `shard` (see `debate_core.sharding`), the one the
+    shard router picked, or in a random shard without a router.
+
+    With `speculate` and the engine's speculative extraction on, a new
+    debate's first reply may be generated while its topic is extracted;
+    `reply` is that reply, or None if the caller should generate one.
+    """
+    conversation_id = request.conversation_id
+    reply = None
+
+    # Check if this is a new conversation (no conversation_id)
+    if not conversation_id:
+        # New conversation - extract topic and side from first message
+        conversation_id = new_conversation_id(shard)
+
+        # Extract topic and side from the user's first message
+        if speculate:
+            topic, side, reply = await engine.aextract_speculatively(request.message)
+        else:
+            topic, side = await extract_topic_and_side(request.message)
+
+        if opening_pool is not None:
+            opening_pool.record(topic, side)
+
+        # Initialize conversation, rendering its system prompt once
+        conversation = engine.new_conversation(topic, side)
+        with timed("store"):
+            await store_call(conversation_store.put, conversation_id, conversation)
+        return conversation_id, conversation, reply
+
+    # Get conversation data
+    with timed("store"):
+        conversation = await store_call(load_conversation, conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    return conversation_id, conversation, reply
+
+
+def pooled_opening(request: ChatRequest, conversation: dict) -> Optional[str]:
+    """A pre-generated first reply, if the request starts a debate on a popular topic"""
+    if opening_pool is None or request.conversation_id:
+        return None
+    return opening_pool.take(conversation["topic"], conversation["side"], request.message)
+
+
+async def replay(text: str):
+    """Yield a finished reply as a single delta"""
+    yield text
 
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+@router.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request):
     """
     Chat with the debate bot.
 
@@ -144,73 +330,227 @@ async def chat(request: ChatRequest):
     - Send your debate message
 
     Returns the conversation_id and the 5 most recent message pairs.
+    Clients over their rate limits get a 429 with a `Retry-After` header.
     """
+    client = client_id(http_request)
+    admit(client, turn_tokens(request.message))
+    shard = parse_shard(http_request.headers.get(SHARD_HEADER))
+    with timed("chat"):
+        return await handle_chat(request, client, shard)
+
+
+async def handle_chat(request: ChatRequest, client: str, shard: Optional[int] = None) -> Response:
     try:
         user_message = request.message
-        conversation_id = request.conversation_id
+        async with scheduler.slot(client):
+            conversation_id, conversation, bot_response = await get_or_create_conversation(
+                request, speculate=True, shard=shard
+            )
+            history = conversation["history"]
+
+            # Generate bot response, unless a first reply was pre-generated
+            if bot_response is None:
+                bot_response = pooled_opening(request, conversation)
+            if bot_response is None:
+                bot_response = await generate_debate_response(
+                    user_message,
+                    conversation["topic"],
+                    conversation["side"],
+                    history,
+                    conversation_id,
+                    conversation.get("system_prompt"),
+                )
 
-        # Check if this is a new conversation (no conversation_id)
-        if not conversation_id:
-            # New conversation - extract topic and side from first message
-            conversation_id = str(uuid.uuid4())
+        # Keep only the 5 most recent messages (5 exchanges = 10 messages)
+        # Return last 10 messages (5 user + 5 bot pairs)
+        user_msg = Turn("user", user_message)
+        bot_msg = Turn("bot", bot_response)
+        recent_messages = history[-RECENT_MESSAGES:] + [user_msg, bot_msg]
+
+        # Add the exchange to the conversation history
+        with timed("store"):
+            await store_call(conversation_store.append, conversation_id, user_msg, bot_msg)
+
+        # Serialize here rather than in FastAPI so the time is measured
+        with timed("serialization"):
+            body = ChatResponse(
+                conversation_id=conversation_id,
+                message=[
+                    MessageItem(role=msg.role, message=msg.message) for msg in recent_messages
+                ],
+            ).model_dump_json()
+        return Response(body, media_type="application/json")
 
-            # Extract topic and side from the user's first message
-            topic, side = extract_topic_and_side(user_message)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            # Initialize conversation
-            conversations[conversation_id] = {
-                "topic": topic,
-                "side": side,
-                "history": [],
-            }
 
-        # Get conversation data
-        if conversation_id not in conversations:
-            raise HTTPException(status_code=404, detail="Conversation not found")
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Format a server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
-        conversation = conversations[conversation_id]
-        topic = conversation["topic"]
-        side = conversation["side"]
-        history = conversation["history"]
 
-        # Add user message to history
-        user_msg = {"role": "user", "message": user_message}
-        history.append(user_msg)
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Chat with the debate bot, streaming the reply as server-sent events.
+
+    Accepts the same body as `/chat`. The stream emits:
+    - `start`: the `conversation_id`
+    - `delta`: each completion fragment as it arrives (`{"delta": "..."}`)
+    - `done`: the 5 most recent message pairs and `ttft_ms`, once the reply
+      has been added to the conversation history
+    - `error`: instead of `done` if the reply fails part way (`{"detail": "..."}`);
+      the turn is not added to the history, so the client can resend it
+    """
+    client = client_id(http_request)
+    admit(client, turn_tokens(request.message))
+    started = time.perf_counter()
+    try:
+        user_message = request.message
+        async with scheduler.slot(client):
+            conversation_id, conversation, _ = await get_or_create_conversation(
+                request, shard=parse_shard(http_request.headers.get(SHARD_HEADER))
+            )
+        opening = pooled_opening(request, conversation)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        yield sse_event({"conversation_id": conversation_id}, event="start")
 
-        # Generate bot response
-        bot_response = generate_debate_response(
-            user_message,
-            topic,
-            side,
-            history[:-1],  # Exclude the just-added user message
+        history = conversation["history"]
+        parts = []
+        ttft = None
+
+        deltas = (
+            replay(opening)
+            if opening is not None
+            else stream_debate_response(
+                user_message,
+                conversation["topic"],
+                conversation["side"],
+                history,
+                conversation_id,
+                conversation.get("system_prompt"),
+            )
         )
 
-        # Add bot response to history
-        bot_msg = {"role": "bot", "message": bot_response}
-        history.append(bot_msg)
+        # The slot is held until the whole reply has streamed
+        async with scheduler.slot(client):
+            try:
+                async for delta in deltas:
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                        TIME_TO_FIRST_TOKEN.observe(ttft)
+                    parts.append(delta)
+                    yield sse_event({"delta": delta}, event="delta")
+            except Exception as e:
+                # A failed turn isn't committed, so a partial reply never
+                # reaches the history or later prompts
+                yield sse_event({"detail": apology_message(e)}, event="error")
+                return
+
+        # Commit the turn only once the full reply has been assembled
+        user_msg = Turn("user", user_message)
+        bot_msg = Turn("bot", "".join(parts))
+        recent_messages = history[-RECENT_MESSAGES:] + [user_msg, bot_msg]
+        with timed("store"):
+            await store_call(conversation_store.append, conversation_id, user_msg, bot_msg)
+
+        yield sse_event(
+            {
+                "conversation_id": conversation_id,
+                "message": [msg.to_dict() for msg in recent_messages],
+                "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            },
+            event="done",
+        )
 
-        # Keep only the 5 most recent messages (5 exchanges = 10 messages)
-        # Return last 10 messages (5 user + 5 bot pairs)
-        recent_messages = history[-10:] if len(history) > 10 else history
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so nginx relays tokens immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        return ChatResponse(
-            conversation_id=conversation_id,
-            message=[MessageItem(**msg) for msg in recent_messages],
-        )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+# Upper bound on debates a single /chat/batch request may run at once
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+
+@router.post("/chat/batch")
+async def chat_batch(
+    request: Request,
+    concurrency: int = Query(8, ge=1, description="Debates to run at once"),
+):
+    """
+    Run scripted debates for offline evaluation.
 
+    The body is JSONL, one script per line:
+    `{"id": "...", "opening": "...", "replies": ["...", ...]}`
+    (optionally with `topic` and `side` to skip extraction).
 
-@app.get("/health")
+    Debates run concurrently while each one's turns stay in order. Results
+    stream back as JSONL: a `turn` record per reply with its `latency_ms`,
+    then a `done` record per debate (or an `error` record).
+
+    A batch counts as one request against the client's rate limit, and its
+    turns' tokens are charged up front (at most a full token bucket). Its
+    LLM calls are queued fairly with other clients' calls.
+    """
+    from debate_core.batch import parse_scripts, run_batch
+
+    body = (await request.body()).decode("utf-8")
+    try:
+        scripts = parse_scripts(body.splitlines())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    client = client_id(request)
+    admit(
+        client,
+        sum(turn_tokens(message) for s in scripts for message in [s.opening, *s.replies]),
+    )
+
+    async def records():
+        async for record in run_batch(
+            engine,
+            scripts,
+            min(concurrency, BATCH_MAX_CONCURRENCY),
+            slot=lambda: scheduler.slot(client),
+        ):
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(
+        records(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Metrics in the Prometheus text exposition format"""
+    # Not async: the store size gauge may be a query, so FastAPI runs this in
+    # a worker thread
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@router.get("/health")
 async def health():
     """Health check endpoint"""
     return {"status": "healthy"}
 
 
-@app.get("/")
+@router.get("/")
 async def root():
     return {"message": "Hello, DebateBot here!"}
 
@@ -218,4 +558,10 @@ async def root():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, port=8000)
+    # More than one worker needs a shared backend such as CONVERSATION_BACKEND=sqlite
+    uvicorn.run(
+        "fastapi_app:create_app",
+        factory=True,
+        port=8000,
+        workers=int(os.getenv("API_WORKERS", "1")),
+    )
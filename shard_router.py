@@ -0,0 +1,261 @@
+"""
+Shard router for running several DebateBot API replicas
+
+Sits between nginx and the `fastapi_app` replicas and sends every turn of a
+debate to the replica holding it. Conversation IDs carry their shard (see
+`debate_core.sharding`): a follow-up goes to the owner of its
+conversation's shard on a consistent-hash ring of the replicas. A new
+debate is given a random shard and sent to that shard's owner, which
+creates its ID in the shard.
+
+Replicas are health-checked in the background. One that stops answering
+leaves the ring and one that comes back rejoins it; only the shards it owns
+move. Moved debates continue on their new replica if the conversation
+store is shared (`CONVERSATION_BACKEND=redis` or `sqlite`). With the
+in-memory store they are lost.
+
+Serve it with `uvicorn --factory shard_router:create_app`.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+from debate_core.metrics import (
+    ROUTER_REPLICAS,
+    ROUTER_REQUESTS,
+    ROUTER_RING_CHANGES,
+    render_prometheus,
+)
+from debate_core.sharding import SHARD_HEADER, SHARDS, HashRing, conversation_shard
+
+logger = logging.getLogger(__name__)
+
+# Replica base URLs, and the ring of those currently healthy; both are
+# created by create_app()
+replicas: tuple = ()
+ring: Optional[HashRing] = None
+client: Optional[httpx.AsyncClient] = None
+
+# Routes whose body names the conversation; everything else is stateless
+CONVERSATION_PATHS = frozenset(("/chat", "/chat/stream"))
+
+# Headers that describe one connection, not the request, and are not forwarded
+HOP_BY_HOP = frozenset(
+    (
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+        "host",
+        "content-length",
+    )
+)
+
+
+def join(replica: str):
+    if ring.add(replica):
+        ROUTER_RING_CHANGES.inc("join")
+        logger.info("Replica %s joined the ring", replica)
+
+
+def leave(replica: str):
+    if ring.remove(replica):
+        ROUTER_RING_CHANGES.inc("leave")
+        logger.warning("Replica %s left the ring", replica)
+
+
+async def healthy(replica: str, timeout: float) -> bool:
+    try:
+        response = await client.get(replica + "/health", timeout=timeout)
+        return response.status_code == 200
+    except httpx.HTTPError:
+        return False
+
+
+async def check_replicas(interval: float, failures: int, timeout: float):
+    """Remove replicas after `failures` failed health checks in a row, and re-add them"""
+    failed = dict.fromkeys(replicas, 0)
+    while True:
+        results = await asyncio.gather(*(healthy(replica, timeout) for replica in replicas))
+        for replica, ok in zip(replicas, results):
+            failed[replica] = 0 if ok else failed[replica] + 1
+            if ok:
+                join(replica)
+            elif failed[replica] >= failures:
+                leave(replica)
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    interval = float(os.getenv("SHARD_HEALTH_INTERVAL_SECONDS", "5"))
+    checker = None
+    if interval > 0:
+        checker = asyncio.create_task(
+            check_replicas(
+                interval,
+                int(os.getenv("SHARD_HEALTH_FAILURES", "3")),
+                float(os.getenv("SHARD_HEALTH_TIMEOUT_SECONDS", "2")),
+            )
+        )
+    yield
+    if checker is not None:
+        checker.cancel()
+    await client.aclose()
+
+
+def create_app(transport: Optional[httpx.AsyncBaseTransport] = None) -> FastAPI:
+    """
+    Build the shard router.
+
+    Replicas come from SHARD_REPLICAS, a comma-separated list of base URLs
+    (`http://api-1:8000,http://api-2:8000`). `transport` replaces the network
+    for tests.
+    """
+    global replicas, ring, client
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    replicas = tuple(
+        url.strip().rstrip("/") for url in os.getenv("SHARD_REPLICAS", "").split(",") if url.strip()
+    )
+    if not replicas:
+        raise ValueError("SHARD_REPLICAS must list at least one replica URL")
+    ring = HashRing(replicas, vnodes=int(os.getenv("SHARD_VNODES", "160")))
+    client = httpx.AsyncClient(
+        transport=transport,
+        # Replies stream for as long as the LLM takes; only connecting is bounded tightly
+        timeout=httpx.Timeout(float(os.getenv("SHARD_READ_TIMEOUT_SECONDS", "120")), connect=2.0),
+        limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100),
+    )
+    ROUTER_REPLICAS.set_function(lambda: len(ring))
+
+    app = FastAPI(title="DebateBot shard router", lifespan=lifespan)
+    app.add_api_route("/router/health", router_health, methods=["GET"])
+    app.add_api_route("/router/metrics", router_metrics, methods=["GET"])
+    app.add_api_route(
+        "/{path:path}", proxy, methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"]
+    )
+    return app
+
+
+def route(path: str, body: bytes) -> tuple:
+    """(shard, new debate) for a request: its conversation's shard, or a random one"""
+    if path in CONVERSATION_PATHS:
+        try:
+            conversation_id = json.loads(body).get("conversation_id")
+        except (ValueError, AttributeError):
+            # Malformed; whichever replica gets it answers with a 422
+            conversation_id = None
+        if isinstance(conversation_id, str) and conversation_id:
+            return conversation_shard(conversation_id), False
+        return random.randrange(SHARDS), True
+    return random.randrange(SHARDS), False
+
+
+def forwarded_headers(request: Request) -> dict:
+    headers = {
+        name: value
+        for name, value in request.headers.items()
+        if name not in HOP_BY_HOP and name != SHARD_HEADER.lower()
+    }
+    if request.client is not None:
+        # Replicas rate-limit by client IP; keep the real one
+        forwarded = request.headers.get("x-forwarded-for")
+        headers["x-forwarded-for"] = (
+            f"{forwarded}, {request.client.host}" if forwarded else request.client.host
+        )
+    headers.setdefault("x-forwarded-proto", request.url.scheme)
+    return headers
+
+
+async def proxy(request: Request, path: str) -> Response:
+    """Forward a request to the replica owning its conversation's shard"""
+    body = await request.body()
+    shard, new = route(request.url.path, body)
+    headers = forwarded_headers(request)
+    if new:
+        headers[SHARD_HEADER] = str(shard)
+
+    for _ in range(len(replicas)):
+        replica = ring.node_for_shard(shard)
+        if replica is None:
+            break
+        upstream = client.build_request(
+            request.method,
+            replica + request.url.path,
+            params=request.query_params,
+            headers=headers,
+            content=body,
+        )
+        try:
+            response = await client.send(upstream, stream=True)
+        except httpx.ConnectError:
+            # The request never reached the replica, so the shard's next
+            # owner can take it
+            leave(replica)
+            continue
+
+        ROUTER_REQUESTS.inc(replica)
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers={
+                name: value
+                for name, value in response.headers.items()
+                if name not in HOP_BY_HOP
+            },
+            background=BackgroundTask(response.aclose),
+        )
+
+    return JSONResponse({"detail": "No replica available"}, status_code=503)
+
+
+async def router_health():
+    """The router's own health, and the shards each replica owns"""
+    owned = {replica: 0 for replica in replicas}
+    for shard in range(SHARDS):
+        replica = ring.node_for_shard(shard)
+        if replica is not None:
+            owned[replica] += 1
+    members = ring.nodes
+    return {
+        "status": "healthy" if members else "unavailable",
+        "replicas": {
+            replica: {"healthy": replica in members, "shards": owned[replica]}
+            for replica in replicas
+        },
+    }
+
+
+async def router_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "shard_router:create_app",
+        factory=True,
+        host="0.0.0.0",
+        port=int(os.getenv("SHARD_ROUTER_PORT", "8080")),
+    )
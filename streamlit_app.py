@@ -3,67 +3,97 @@ import streamlit as st
 import time
 import os
 import uuid
-from typing import List, Optional
-from openai import OpenAI
+from typing import Iterator, Optional
 from dotenv import load_dotenv
-from task_2.models import Message
-from task_2.prompt import SYSTEM_PROMPT
+from debate_core.engine import DebateEngine, apology_message
+from debate_core.message_view import MessageWindow, format_message, render_message
+from debate_core.turns import Turn, TurnLog
 
 # Load environment variables
 load_dotenv()
 
+# Messages shown per "load earlier" page of the debate history
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
 
-# Initialize OpenAI client
+# Whether replies stream in token by token by default
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "true").lower() in ("1", "true", "yes")
+
+# Minimum seconds between redraws of a streaming reply
+STREAM_UPDATE_INTERVAL = 0.05
+
+
+# Initialize the debate engine shared by all sessions
 @st.cache_resource
-def get_openai_client():
-    """Get OpenAI client with proper configuration"""
+def get_debate_engine():
+    """Get the debate engine with proper configuration"""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         st.error("❌ OPENAI_API_KEY environment variable is required")
         st.stop()
-    return OpenAI(api_key=api_key)
+    return DebateEngine.from_env()
 
 
 def generate_debate_response(
     user_message: str,
     topic: Optional[str],
     side: str,
-    conversation_history: List[Message],
+    conversation_history: TurnLog,
+    conversation_id: Optional[str] = None,
 ) -> str:
     """Generate AI response for debate"""
     try:
-        client = get_openai_client()
-
-        # Format the system prompt with topic and side
-        system_prompt = SYSTEM_PROMPT.format(
-            topic=topic or "the given topic", side=side
+        return get_debate_engine().generate(
+            user_message, topic, side, conversation_history, conversation_id
         )
 
-        # Prepare messages for OpenAI
-        messages = [{"role": "system", "content": system_prompt}]
+    except Exception as e:
+        print(f"Error generating response: {e}")
+        return apology_message(e)
 
-        # Add conversation history
-        for msg in conversation_history:
-            messages.append({"role": msg.role, "content": msg.message})
 
-        # Add the current user message
-        messages.append({"role": "user", "content": user_message})
+def stream_debate_response(
+    user_message: str,
+    topic: Optional[str],
+    side: str,
+    conversation_history: TurnLog,
+    conversation_id: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Generate AI response for debate, yielding completion deltas as they arrive.
 
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            max_completion_tokens=500,
-            temperature=0.7,
-            presence_penalty=0.6,
-            frequency_penalty=0.3,
-        )
+    Errors propagate, so a reply that fails partway isn't mistaken for a
+    finished one.
+    """
+    yield from get_debate_engine().stream(
+        user_message, topic, side, conversation_history, conversation_id
+    )
 
-        return response.choices[0].message.content
 
-    except Exception as e:
-        print(f"Error generating response: {e}")
-        return f"I apologize, but I'm having trouble generating a response right now. Error: {str(e)}"
+def get_conversation_history(conversation_id: str) -> TurnLog:
+    """Get the history of a conversation, creating it if needed"""
+    if "conversations" not in st.session_state:
+        st.session_state["conversations"] = {}
+
+    if conversation_id not in st.session_state["conversations"]:
+        st.session_state["conversations"][conversation_id] = TurnLog()
+
+    return st.session_state["conversations"][conversation_id]
+
+
+def record_turn(conversation_id: str, user_message: str, ai_response: str) -> dict:
+    """Add a finished exchange to the conversation and return it for display"""
+    conversation_history = get_conversation_history(conversation_id)
+    conversation_history.append(Turn("user", user_message))
+    conversation_history.append(Turn("assistant", ai_response))
+
+    # Return only the new turn; the caller appends it to the displayed messages
+    return {
+        "conversation_id": conversation_id,
+        "message": [
+            {"role": "user", "message": user_message},
+            {"role": "assistant", "message": ai_response},
+        ],
+    }
 
 
 def process_message(payload: dict) -> dict:
@@ -71,38 +101,73 @@ def process_message(payload: dict) -> dict:
     try:
         # Get or create conversation
         conversation_id = payload.get("conversation_id") or str(uuid.uuid4())
+        conversation_history = get_conversation_history(conversation_id)
 
-        # Get existing conversation or create new one
-        if "conversations" not in st.session_state:
-            st.session_state["conversations"] = {}
-
-        if conversation_id not in st.session_state["conversations"]:
-            st.session_state["conversations"][conversation_id] = []
-
-        conversation_history = st.session_state["conversations"][conversation_id]
-
-        # Add user message to conversation
-        user_message = Message(role="user", message=payload["message"])
-        conversation_history.append(user_message)
-
-        # Generate AI response
+        # Generate AI response from the history before this turn
         ai_response = generate_debate_response(
             payload["message"],
             payload.get("topic"),
             payload.get("side", "pro"),
-            conversation_history[:-1],  # Exclude the just-added user message
+            conversation_history,
+            conversation_id,
         )
 
-        # Add AI response to conversation
-        bot_message = Message(role="assistant", message=ai_response)
-        conversation_history.append(bot_message)
+        return record_turn(conversation_id, payload["message"], ai_response)
 
-        # Convert Message objects to dictionaries for session state compatibility
-        message_dicts = []
-        for msg in conversation_history:
-            message_dicts.append({"role": msg.role, "message": msg.message})
+    except Exception as e:
+        raise Exception(f"Integrated processing error: {str(e)}")
 
-        return {"conversation_id": conversation_id, "message": message_dicts}
+
+def stream_message(payload: dict, container) -> dict:
+    """
+    Process a message, streaming the reply into `container` as it arrives.
+
+    The exchange is only added to the conversation once the stream finishes,
+    so an interrupted reply never reaches the history.
+    """
+    try:
+        conversation_id = payload.get("conversation_id") or str(uuid.uuid4())
+        conversation_history = get_conversation_history(conversation_id)
+
+        with container:
+            st.markdown(
+                render_message("user", payload["message"], animate=True),
+                unsafe_allow_html=True,
+            )
+            placeholder = st.empty()
+            placeholder.markdown(
+                format_message("assistant", "▌", animate=True), unsafe_allow_html=True
+            )
+
+        parts = []
+        last_update = 0.0
+        try:
+            for delta in stream_debate_response(
+                payload["message"],
+                payload.get("topic"),
+                payload.get("side", "pro"),
+                conversation_history,
+                conversation_id,
+            ):
+                parts.append(delta)
+                # Throttle redraws; each one sends the whole message to the browser
+                now = time.perf_counter()
+                if now - last_update >= STREAM_UPDATE_INTERVAL:
+                    placeholder.markdown(
+                        format_message("assistant", "".join(parts) + "▌"),
+                        unsafe_allow_html=True,
+                    )
+                    last_update = now
+        except Exception as e:
+            # Nothing is recorded; the caller reports the error
+            print(f"Error generating response: {e}")
+            placeholder.empty()
+            raise
+
+        ai_response = "".join(parts)
+        placeholder.markdown(format_message("assistant", ai_response), unsafe_allow_html=True)
+
+        return record_turn(conversation_id, payload["message"], ai_response)
 
     except Exception as e:
         raise Exception(f"Integrated processing error: {str(e)}")
@@ -356,6 +421,8 @@ if "messages" not in st.session_state:
     st.session_state["messages"] = []
 if "input_value" not in st.session_state:
     st.session_state["input_value"] = ""
+if "history_pages" not in st.session_state:
+    st.session_state["history_pages"] = 1
 
 # Sidebar for settings and info
 with st.sidebar:
@@ -379,6 +446,13 @@ with st.sidebar:
     # Get the backend value
     side = side_options[side_label]
 
+    stream_replies = st.checkbox(
+        "⚡ Stream replies",
+        value=STREAM_REPLIES,
+        help="Show the bot's reply word by word as it is generated",
+        key="stream_replies",
+    )
+
     st.markdown("---")
 
     # Conversation management
@@ -387,6 +461,7 @@ with st.sidebar:
         st.session_state["conversation_id"] = None
         st.session_state["messages"] = []
         st.session_state["input_value"] = ""
+        st.session_state["history_pages"] = 1
         st.success("✨ New conversation started!")
         st.rerun()
 
@@ -416,41 +491,26 @@ if "messages" in st.session_state and st.session_state["messages"]:
     # Create a container for messages
     messages_container = st.container()
 
+    # Render only the most recent pages, older messages as a single block
+    window = MessageWindow(
+        st.session_state["messages"],
+        page_size=HISTORY_PAGE_SIZE,
+        pages=st.session_state["history_pages"],
+    )
+
     with messages_container:
-        for i, msg in enumerate(st.session_state["messages"]):
-            # Handle both dictionary and Message object formats
-            if isinstance(msg, dict):
-                role = msg["role"]
-                message_text = msg["message"]
-            else:
-                # Message object (Pydantic model)
-                role = msg.role
-                message_text = msg.message
-
-            if role == "user":
-                st.markdown(
-                    f"""
-                <div class="message-animation">
-                    <div class="user-message">
-                        <strong>👤 You:</strong><br>
-                        {message_text}
-                    </div>
-                </div>
-                """,
-                    unsafe_allow_html=True,
-                )
-            else:
-                st.markdown(
-                    f"""
-                <div class="message-animation">
-                    <div class="bot-message">
-                        <strong>🤖 DebateBot:</strong><br>
-                        {message_text}
-                    </div>
-                </div>
-                """,
-                    unsafe_allow_html=True,
-                )
+        if window.hidden:
+            if st.button(
+                f"⬆️ Load earlier messages ({window.hidden} hidden)",
+                key="load_earlier",
+            ):
+                st.session_state["history_pages"] += 1
+                st.rerun()
+
+        earlier_html = window.earlier_html()
+        if earlier_html:
+            st.markdown(earlier_html, unsafe_allow_html=True)
+        st.markdown(window.latest_html(), unsafe_allow_html=True)
 
     # Add some spacing
     st.markdown("<br>", unsafe_allow_html=True)
@@ -472,6 +532,9 @@ else:
         unsafe_allow_html=True,
     )
 
+# A streaming reply is drawn here, below the history, until it is committed
+live_turn = st.container()
+
 # Message input section - now at the bottom
 st.markdown("### 💬 Your Turn")
 
@@ -510,25 +573,28 @@ message_submitted = send_button or (
     user_input and user_input != st.session_state.get("last_input", "")
 )
 if message_submitted and user_input:
-    # Show loading spinner
-    with st.spinner("🤖 AI is thinking..."):
-        payload = {
-            "conversation_id": st.session_state["conversation_id"],
-            "message": user_input,
-            "topic": topic if topic else None,
-            "side": side,
-        }
+    payload = {
+        "conversation_id": st.session_state["conversation_id"],
+        "message": user_input,
+        "topic": topic if topic else None,
+        "side": side,
+    }
 
-        # Process message using integrated AI functionality
-        try:
-            data = process_message(payload)
-            st.session_state["conversation_id"] = data["conversation_id"]
-            st.session_state["messages"] = data["message"]
-            st.session_state["last_input"] = user_input
-            # Clear the input box
-            st.session_state["input_value"] = ""
-            st.rerun()
-        except Exception as e:
-            st.error(f"❌ Error processing message: {str(e)}")
+    # Process message using integrated AI functionality
+    try:
+        if stream_replies:
+            data = stream_message(payload, live_turn)
+        else:
+            # Show loading spinner
+            with st.spinner("🤖 AI is thinking..."):
+                data = process_message(payload)
+        st.session_state["conversation_id"] = data["conversation_id"]
+        st.session_state["messages"].extend(data["message"])
+        st.session_state["last_input"] = user_input
+        # Clear the input box
+        st.session_state["input_value"] = ""
+        st.rerun()
+    except Exception as e:
+        st.error(f"❌ Error processing message: {str(e)}")
 
 st.markdown("</div>", unsafe_allow_html=True)
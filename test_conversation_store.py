@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Test script for the DebateBot conversation stores
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_redis import FakeRedisState, run_fake_redis
+from debate_core.redis_store import RedisConversationStore
+from debate_core.sqlite_store import SqliteConversationStore
+from debate_core.store import InMemoryConversationStore
+from debate_core.wal import WriteAheadLog
+from debate_core.wal_store import WalConversationStore
+
+
+def new_conversation(topic: str = "AI") -> dict:
+    return {"topic": topic, "side": "pro", "history": []}
+
+
+def test_memory_store_lru():
+    """Test that the least recently used conversation is evicted first"""
+    print("🧪 Testing LRU eviction...")
+
+    store = InMemoryConversationStore(max_entries=2, ttl_seconds=None)
+    store.put("a", new_conversation())
+    store.put("b", new_conversation())
+    assert store.get("a") is not None  # "a" is now most recently used
+    store.put("c", new_conversation())
+
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert len(store) == 2
+
+    stats = store.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+    print("✅ LRU eviction and hit/miss counters work")
+
+
+def test_memory_store_ttl():
+    """Test that idle conversations expire"""
+    print("🧪 Testing idle TTL...")
+
+    store = InMemoryConversationStore(max_entries=10, ttl_seconds=0.05)
+    store.put("a", new_conversation())
+    store.append("a", {"role": "user", "message": "Hello"})
+    assert store.recent("a", 10) == [{"role": "user", "message": "Hello"}]
+
+    time.sleep(0.1)
+    assert store.get("a") is None
+    assert store.stats()["expirations"] == 1
+
+    print("✅ Idle conversations expire after the TTL")
+
+
+def test_sqlite_store():
+    """Test that SQLite conversations persist and recent() reads via the index"""
+    print("🧪 Testing SQLite store...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "conversations.db")
+        store = SqliteConversationStore(path)
+        store.put("a", new_conversation("Remote work"))
+        for i in range(6):
+            store.append("a", {"role": "user", "message": f"turn {i}"})
+
+        # A second store on the same file sees the same data, like another worker
+        other = SqliteConversationStore(path)
+        conversation = other.get("a")
+        assert conversation["topic"] == "Remote work"
+        assert [m["message"] for m in conversation["history"]][-1] == "turn 5"
+        assert [m["message"] for m in other.recent("a", 2)] == ["turn 4", "turn 5"]
+        assert "a" in other and "b" not in other and len(other) == 1
+
+        plan = other._connection().execute(
+            "EXPLAIN QUERY PLAN SELECT role, message FROM messages "
+            "WHERE conversation_id = ? ORDER BY seq DESC LIMIT 2",
+            ("a",),
+        ).fetchall()
+        assert "idx_messages_conversation_seq" in str(plan)
+
+        try:
+            other.append("b", {"role": "user", "message": "orphan"})
+            raise AssertionError("append to a missing conversation should fail")
+        except KeyError:
+            pass
+
+        # Histories read only the rows a turn uses, not the transcript
+        history = other.get("a")["history"]
+        statements = []
+        other._connection().set_trace_callback(statements.append)
+        assert len(history) == 6
+        assert [m["message"] for m in history[-2:]] == ["turn 4", "turn 5"]
+        assert history[0]["message"] == "turn 0" and history[-1]["message"] == "turn 5"
+        assert len(statements) == 2
+        assert all("AND seq >= " in statement for statement in statements)
+
+        # A prefetched tail is served without going back to the database
+        history = other.get("a")["history"]
+        history.prefetch(3)
+        statements.clear()
+        assert [m["message"] for m in history[-3:]] == ["turn 3", "turn 4", "turn 5"]
+        assert history[4]["message"] == "turn 4"
+        assert statements == []
+        other._connection().set_trace_callback(None)
+        assert history == [{"role": "user", "message": f"turn {i}"} for i in range(6)]
+
+        mode = other._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    print("✅ SQLite store persists across instances and reads recent turns by index")
+
+
+def test_wal_store_recovery():
+    """Test that the WAL store recovers from a snapshot plus the log after it"""
+    print("🧪 Testing WAL store recovery...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = WalConversationStore(tmp, sync="always", snapshot_every=10**9)
+        store.put("a", new_conversation("Remote work"))
+        store.put("b", new_conversation())
+        for i in range(3):
+            store.append("a", {"role": "user", "message": f"turn {i}"}, {"role": "bot", "message": "no"})
+        store.snapshot()
+        # Written after the snapshot, so recovered by replaying the log
+        store.append("a", {"role": "user", "message": "turn 3"})
+        store.delete("b")
+        store.put("c", new_conversation("Nuclear power"))
+
+        # The directory belongs to one process at a time
+        try:
+            WalConversationStore(tmp)
+            raise AssertionError("a second store on a locked directory should fail")
+        except RuntimeError:
+            pass
+        store.close()
+
+        assert len(store.snapshots()) == 1
+        # Segments covered by the snapshot are gone
+        assert store.wal.segments() == [store.snapshots()[0]]
+
+        store = WalConversationStore(tmp)
+        assert store.recovery["snapshot_segment"] is not None
+        assert store.recovery["replayed_records"] == 3
+        history = store.get("a")["history"]
+        assert len(history) == 7 and history[-1] == {"role": "user", "message": "turn 3"}
+        assert store.get("a")["topic"] == "Remote work"
+        assert "b" not in store and store.get("c")["topic"] == "Nuclear power"
+
+        try:
+            store.append("b", {"role": "user", "message": "orphan"})
+            raise AssertionError("append to a missing conversation should fail")
+        except KeyError:
+            pass
+        store.close()
+
+    print("✅ WAL store recovers from snapshot and log tail")
+
+
+def test_wal_torn_tail():
+    """Test that a record torn by a crash is cut off on replay"""
+    print("🧪 Testing WAL torn tail...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = WalConversationStore(tmp, sync="none")
+        store.put("a", new_conversation())
+        store.append("a", {"role": "user", "message": "kept"})
+        store.close()
+
+        # Half a record at the end, as if the process died mid-write
+        path = store.wal.segment_path(store.wal.segment)
+        with open(path, "ab") as f:
+            f.write(b"\x40\x00\x00\x00\x12\x34")
+        size = os.path.getsize(path)
+
+        store = WalConversationStore(tmp)
+        assert [m["message"] for m in store.get("a")["history"]] == ["kept"]
+        assert os.path.getsize(path) == size - 6
+        # New records go after the intact ones
+        store.append("a", {"role": "bot", "message": "appended"})
+        store.close()
+        store = WalConversationStore(tmp)
+        assert len(store.get("a")["history"]) == 2
+        store.close()
+
+    print("✅ Torn records are cut off and appending resumes")
+
+
+def test_wal_group_commit():
+    """Test that concurrent appends in "always" mode share fsyncs"""
+    print("🧪 Testing WAL group commit...")
+
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wal = WriteAheadLog(tmp, sync="always", segment_bytes=4096)
+        wal.open()
+        fsyncs = []
+        real_fsync = os.fsync
+
+        def counting_fsync(fd):
+            fsyncs.append(fd)
+            time.sleep(0.002)
+            real_fsync(fd)
+
+        os.fsync = counting_fsync
+        try:
+            threads = [
+                threading.Thread(target=lambda: [wal.append(b"x" * 100) for _ in range(25)])
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            os.fsync = real_fsync
+        wal.close()
+
+        assert wal.stats()["durable"] == 200
+        assert len(fsyncs) < 200, len(fsyncs)
+        # Small segments rotate, and replay sees every record in order
+        assert len(wal.segments()) > 1
+        assert sum(1 for _ in WriteAheadLog(tmp).replay()) == 200
+
+    print(f"✅ 200 durable appends took {len(fsyncs)} fsyncs")
+
+
+def test_wal_store_group_commit():
+    """Test that concurrent turns share fsyncs through the store's lock"""
+    print("🧪 Testing WAL store group commit...")
+
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = WalConversationStore(tmp, sync="always")
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            time.sleep(0.002)
+            real_fsync(fd)
+
+        ids = [f"c{i}" for i in range(16)]
+        for conversation_id in ids:
+            store.put(conversation_id, new_conversation())
+        fsyncs = store.wal.fsyncs
+
+        def turns(conversation_id):
+            for _ in range(10):
+                store.append(conversation_id, {"role": "user", "message": "turn"})
+
+        os.fsync = slow_fsync
+        try:
+            threads = [threading.Thread(target=turns, args=(c,)) for c in ids]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            os.fsync = real_fsync
+        fsyncs = store.wal.fsyncs - fsyncs
+        store.close()
+
+        assert fsyncs < 160 // 2, fsyncs
+        store = WalConversationStore(tmp)
+        assert all(len(store.get(c)["history"]) == 10 for c in ids)
+        store.close()
+
+    print(f"✅ 160 durable turns from 16 writers took {fsyncs} fsyncs")
+
+
+def test_wal_store_eviction():
+    """Test that the WAL store evicts idle and excess conversations, durably"""
+    print("🧪 Testing WAL store eviction...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = WalConversationStore(tmp, max_entries=3, ttl_seconds=60)
+        for conversation_id in "abcd":
+            store.put(conversation_id, new_conversation())
+        assert len(store) == 3 and "a" not in store and store.stats()["evictions"] == 1
+
+        # Idle past the TTL: expired on access
+        store._last_access["b"] -= 120
+        assert store.get("b") is None and store.stats()["expirations"] == 1
+        store.close()
+
+        # Evictions are logged, so they survive a restart
+        store = WalConversationStore(tmp, max_entries=3, ttl_seconds=60)
+        assert sorted(store._conversations) == ["c", "d"]
+        store.close()
+
+    print("✅ WAL store evicts least recently used and idle conversations")
+
+
+def test_redis_store():
+    """Test the Redis store against the fake server: capped lists, one round-trip a turn"""
+    print("🧪 Testing Redis store...")
+
+    state = FakeRedisState()
+    with run_fake_redis(state=state) as url:
+        store = RedisConversationStore(url, max_messages=4, ttl_seconds=60)
+        conversation = new_conversation("Remote work")
+        conversation["system_prompt"] = {"version": "v1", "text": "Argue well"}
+        store.put("a", conversation)
+        store.put("b", new_conversation())
+
+        round_trips = store.client.round_trips
+        for i in range(3):
+            store.append("a", {"role": "user", "message": f"turn {i}"}, {"role": "bot", "message": "no"})
+        assert store.client.round_trips - round_trips == 3
+        assert state.commands["LTRIM"] == 3
+
+        # A second store on the same server sees the same data, like another replica
+        other = RedisConversationStore(url, max_messages=4, ttl_seconds=60)
+        loaded = other.get("a")
+        assert loaded["topic"] == "Remote work" and loaded["side"] == "pro"
+        assert loaded["system_prompt"] == conversation["system_prompt"]
+        # Capped at the newest four messages
+        assert [m["message"] for m in loaded["history"]] == ["turn 1", "no", "turn 2", "no"]
+        assert other.recent("a", 1) == [{"role": "bot", "message": "no"}]
+        assert "a" in other and "c" not in other and len(other) == 2
+
+        try:
+            other.append("c", {"role": "user", "message": "orphan"})
+            raise AssertionError("append to a missing conversation should fail")
+        except KeyError:
+            pass
+        # The failed append leaves nothing behind
+        assert other.get("c") is None and len(other) == 2
+
+        other.delete("b")
+        assert store.get("b") is None and len(store) == 1
+        store.close()
+        other.close()
+
+    print("✅ Redis store shares capped histories and appends a turn in one round-trip")
+
+
+def test_capped_history_context():
+    """Test that no message a capped store drops is lost from the prompt"""
+    print("🧪 Testing context window over a capped history...")
+
+    from debate_core.context import SUMMARY_PREFIX, ContextWindow
+    from debate_core.engine import DebateEngine
+
+    summarized = []
+
+    def summarizer(previous, messages):
+        summarized.extend(message["content"] for message in messages)
+        return previous + "".join(f"[{message['content'][:4]}]" for message in messages)
+
+    engine = DebateEngine(context_window=ContextWindow(token_budget=200, summarizer=summarizer))
+    sent = []
+    with run_fake_redis() as url:
+        store = RedisConversationStore(url, max_messages=20, ttl_seconds=60)
+        store.put("a", new_conversation())
+        for turn in range(40):
+            user = f"U{turn:02d} " + "point " * 10
+            history = store.get("a")["history"]
+            assert len(history) <= 20
+            messages = engine.build_messages(user, "AI", "pro", history, "a")
+            assert messages[-1]["content"] == user
+            sent = [m["content"] for m in messages[1:-1] if not m["content"].startswith(SUMMARY_PREFIX)]
+            store.append(
+                "a",
+                {"role": "user", "message": user},
+                {"role": "bot", "message": f"B{turn:02d} " + "reply " * 10},
+            )
+        store.close()
+
+    # Everything before the last turn is in the summary or sent verbatim, once
+    expected = [f"{role}{turn:02d}" for turn in range(39) for role in "UB"]
+    assert [text[:3] for text in summarized + sent] == expected
+    assert len(engine._buffers["a"].messages) < 20
+
+    print("✅ Messages dropped by the store stay summarized or verbatim")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 DebateBot Store Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_memory_store_lru,
+        test_memory_store_ttl,
+        test_sqlite_store,
+        test_wal_store_recovery,
+        test_wal_torn_tail,
+        test_wal_group_commit,
+        test_wal_store_group_commit,
+        test_wal_store_eviction,
+        test_redis_store,
+        test_capped_history_context,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e!r}")
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
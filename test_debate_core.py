@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared DebateBot engine components
+"""
+
+import asyncio
+import sys
+import time
+
+from debate_core.completion_cache import CompletionCache
+from debate_core.context import SUMMARY_PREFIX, ContextWindow
+from debate_core.engine import DebateEngine, MessageBuffer, parse_extraction
+from debate_core.message_view import MessageWindow, render_message
+from debate_core.prompts import RenderedPrompt, get_prompt_template
+from debate_core.topic_index import TopicIndex, topic_id
+from debate_core.topic_parser import ExtractionMemo, parse_topic_and_side
+from debate_core.turns import Turn, TurnLog
+
+
+def make_history(turns: int) -> list:
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Point {i}. " + "word " * 50})
+        history.append({"role": "assistant", "content": f"Reply {i}. " + "word " * 50})
+    return history
+
+
+def test_context_window():
+    """Test that old turns are folded into a cached summary within the budget"""
+    print("🧪 Testing context window...")
+
+    window = ContextWindow(token_budget=400, fold_ratio=0.5)
+    system = {"role": "system", "content": "You are a debater."}
+    user = {"role": "user", "content": "Next point."}
+
+    # Short debates are sent untouched
+    short = window.fit("a", system, make_history(1), user)
+    assert short.messages == [system] + make_history(1) + [user]
+    assert short.tokens_before == short.tokens_after
+
+    # Long debates keep the newest turns verbatim and summarize the rest
+    history = make_history(10)
+    result = window.fit("a", system, history, user)
+    assert result.tokens_after < result.tokens_before
+    assert result.folded_messages > 0
+    assert result.messages[1]["content"].startswith(SUMMARY_PREFIX)
+    assert "Point 0." in result.messages[1]["content"]
+    assert result.messages[-2] == history[-1]
+    assert result.messages[-1] == user
+
+    # The summary is reused rather than rebuilt when one more turn arrives
+    calls = []
+    window.summarizer = lambda previous, messages: calls.append(messages) or previous
+    window.fit("a", system, history + make_history(1)[:1], user)
+    assert calls == []
+
+    print("✅ Context window trims long debates and caches summaries")
+
+
+def test_topic_parser():
+    """Test the local fast-path parser on common and unusual openings"""
+    print("🧪 Testing topic fast-path parser...")
+
+    cases = {
+        "Let's debate: Climate change is real and urgent. You argue FOR this position.": (
+            "Climate change is real and urgent",
+            "pro",
+        ),
+        "Debate topic: AI will replace human jobs. Take the AGAINST position.": (
+            "AI will replace human jobs",
+            "con",
+        ),
+        "I want to discuss universal basic income. You support it (PRO side).": (
+            "universal basic income",
+            "pro",
+        ),
+        "Let's debate whether remote work is better, you argue against it.": (
+            "remote work is better",
+            "con",
+        ),
+    }
+    for message, expected in cases.items():
+        guess = parse_topic_and_side(message)
+        assert (guess.topic, guess.side) == expected, (message, guess)
+        assert guess.confidence >= 0.8
+
+    # A negated object flips the side, so it is left to the LLM too
+    for message in (
+        "Let's debate the death penalty, argue for abolishing it.",
+        "Debate topic: nuclear power. You support banning it.",
+        "Let's debate zoos. You argue against ending them.",
+    ):
+        guess = parse_topic_and_side(message)
+        assert guess.side is None and guess.confidence < 0.8, (message, guess)
+    guess = parse_topic_and_side("Let's debate: Plastic bags should be banned. You argue FOR.")
+    assert (guess.topic, guess.side) == ("Plastic bags should be banned", "pro")
+
+    # Unusual phrasings are left to the LLM
+    assert parse_topic_and_side("Convince me that zoos are ethical.").confidence < 0.8
+    assert parse_topic_and_side("Is pineapple good on pizza? Argue for it.").topic is None
+
+    memo = ExtractionMemo(max_entries=1)
+    memo.put("Let's  debate: X.", ("X", "pro"))
+    assert memo.get("let's debate: x.") == ("X", "pro")
+
+    print("✅ Fast-path parser handles common phrasings and defers the rest")
+
+
+def test_topic_index():
+    """Test that paraphrased topics resolve to one canonical topic"""
+    print("🧪 Testing topic index...")
+
+    index = TopicIndex(threshold=0.6, buffer_size=4)
+    first = index.add("Social media should be regulated")
+    assert first.new and first.topic_id == topic_id("social media should be regulated")
+
+    topics = [
+        "Climate change is real",
+        "AI will replace human jobs",
+        "Nuclear power is safe",
+        "Nuclear power is not safe",
+        "Remote work is better than office work",
+    ]
+    for topic in topics:
+        assert index.add(topic).new, topic
+    # Enough inserts to merge the buffer into the sorted arrays
+    assert index.stats()["buffered"] < len(index)
+
+    paraphrases = {
+        "Regulating social media": "Social media should be regulated",
+        "Is climate change real?": "Climate change is real",
+        "Will AI replace human jobs?": "AI will replace human jobs",
+        "nuclear power isn't safe": "Nuclear power is not safe",
+        "Remote work hurts productivity": None,
+    }
+    for paraphrase, canonical in paraphrases.items():
+        match = index.lookup(paraphrase)
+        assert (match and match.topic) == canonical, (paraphrase, match)
+
+    # Unrelated topics and different wordings for the same idea stay apart
+    assert index.lookup("Zoos are ethical") is None
+    assert index.lookup("Global warming is real") is None
+    assert len(index) == 6
+
+    # Same words, different motions: swapped order, other numbers, other words
+    different = {
+        "Dogs are better pets than cats": "Cats are better pets than dogs",
+        "Raise the minimum wage to $25": "Raise the minimum wage to $15",
+        "Ban homework for high school students": "Ban homework for primary school students",
+    }
+    for topic, other in different.items():
+        assert index.add(other).new
+        assert index.lookup(topic) is None, (topic, index.lookup(topic))
+        assert index.add(topic).new, topic
+
+    # A full index resolves new topics to themselves without growing
+    full = TopicIndex(threshold=0.6, max_topics=1)
+    full.add("Climate change is real")
+    assert full.add("Is climate change real?").topic == "Climate change is real"
+    match = full.add("Zoos are ethical")
+    assert match.new and match.topic_id == topic_id("Zoos are ethical") and len(full) == 1
+
+    # The engine shares IDs between paraphrases but keeps the user's wording
+    engine = DebateEngine(topic_index_threshold=0.6)
+    assert engine.topic_id("Does pineapple belong on pizza?") == engine.topic_id(
+        "Pineapple belongs on pizza"
+    )
+    assert engine.topic_id("Dogs are better pets than cats") != engine.topic_id(
+        "Cats are better pets than dogs"
+    )
+    engine.topic_id("Climate change is real")
+    extracted = asyncio.run(
+        engine.aextract_topic_and_side("Let's debate: Is climate change real? You argue FOR.")
+    )
+    assert extracted == ("Is climate change real", "pro"), extracted
+    assert DebateEngine().topic_index is None
+
+    print("✅ Paraphrases share a canonical topic and ID")
+
+
+def test_completion_cache():
+    """Test cache keys, variant pools and expiry"""
+    print("🧪 Testing completion cache...")
+
+    messages = [{"role": "user", "content": "Climate change is real and urgent"}]
+    key = CompletionCache.make_key("gpt-3.5-turbo", {"temperature": 0.7}, messages)
+    assert key == CompletionCache.make_key("gpt-3.5-turbo", {"temperature": 0.7}, list(messages))
+    assert key != CompletionCache.make_key("gpt-3.5-turbo", {"temperature": 0.2}, messages)
+
+    # With two variants the key keeps missing until both are collected
+    cache = CompletionCache(max_entries=10, ttl_seconds=0.1, variants=2)
+    assert cache.get(key) is None
+    cache.put(key, "first")
+    assert cache.get(key) is None
+    cache.put(key, "second")
+    assert {cache.get(key) for _ in range(50)} == {"first", "second"}
+
+    time.sleep(0.15)
+    assert cache.get(key) is None
+    assert cache.stats()["hits"] == 50
+
+    print("✅ Completion cache keys, variants and TTL work")
+
+
+def test_engine_messages():
+    """Test that both front-ends' history formats render the same prompt"""
+    print("🧪 Testing engine message assembly...")
+
+    from task_2.models import Message
+
+    engine = DebateEngine()
+    api_history = [
+        {"role": "user", "message": "Hi"},
+        {"role": "bot", "message": "Hello"},
+    ]
+    ui_history = [
+        Message(role="user", message="Hi"),
+        Message(role="assistant", message="Hello"),
+    ]
+
+    api_messages = engine.build_messages("Next", "Remote work", "pro", api_history)
+    ui_messages = engine.build_messages("Next", "Remote work", "pro", ui_history)
+    assert api_messages == ui_messages
+    assert [m["role"] for m in api_messages] == ["system", "user", "assistant", "user"]
+    assert "Remote work" in api_messages[0]["content"]
+
+    assert parse_extraction("TOPIC: Zoos\nSIDE: against") == ("Zoos", "con")
+    assert parse_extraction("gibberish") == ("the given topic", "pro")
+
+    print("✅ Engine renders identical prompts for both front-ends")
+
+
+def test_prompt_templates():
+    """Test versioned templates, render caching and incremental message buffers"""
+    print("🧪 Testing prompt templates...")
+
+    template = get_prompt_template("v1")
+    rendered = template.render("Remote work", "pro")
+    assert rendered is template.render("Remote work", "pro")
+    assert rendered.version == "v1"
+    assert "Remote work" in rendered.text
+    assert RenderedPrompt.from_dict(rendered.to_dict()) == rendered
+
+    concise = get_prompt_template("v1-concise").render("Remote work", "pro")
+    assert concise.tokens < rendered.tokens
+
+    try:
+        get_prompt_template("v0")
+        assert False, "unknown prompt versions should be rejected"
+    except ValueError:
+        pass
+
+    # A stored prompt is used verbatim instead of being re-rendered
+    engine = DebateEngine(prompt_version="v1")
+    conversation = engine.new_conversation("Remote work", "pro")
+    messages = engine.build_messages(
+        "Hi", "ignored", "con", [], system_prompt=conversation["system_prompt"]
+    )
+    assert messages[0]["content"] == rendered.text
+
+    # Only messages added since the last turn are converted
+    buffer = MessageBuffer()
+    history = [{"role": "user", "message": "Hi"}]
+    first = buffer.sync(history).messages[0]
+    history.append({"role": "bot", "message": "Hello"})
+    assert buffer.sync(history).messages[0] is first
+    assert buffer.messages[1] == {"role": "assistant", "content": "Hello"}
+    assert len(buffer.tokens) == 2
+    # A capped history that dropped its oldest message is lined up by its
+    # newest ones; the buffer keeps the dropped message until it is folded
+    history = history[1:] + [{"role": "user", "message": "Bye"}]
+    assert [m["content"] for m in buffer.sync(history).messages] == ["Hi", "Hello", "Bye"]
+    assert not buffer.replaced and len(buffer.tokens) == 3
+    buffer.drop(1)
+    assert buffer.start == 1 and buffer.messages[0]["content"] == "Hello"
+    # A history that doesn't continue the buffer replaces it
+    buffer.sync([{"role": "user", "message": "New debate"}])
+    assert buffer.replaced and buffer.start == 0 and len(buffer.messages) == 1
+
+    print("✅ Prompt templates render once and buffers grow incrementally")
+
+
+def test_message_window():
+    """Test that the Streamlit history renders a cached window of recent pages"""
+    print("🧪 Testing message window...")
+
+    messages = []
+    for i in range(50):
+        messages.append({"role": "user", "message": f"Point {i}"})
+        messages.append({"role": "assistant", "message": f"Reply {i}"})
+
+    window = MessageWindow(messages, page_size=20)
+    assert window.hidden == 80
+    assert "Point 39" not in window.earlier_html()
+    assert "Point 40" in window.earlier_html()
+    assert "Point 49" not in window.earlier_html()
+
+    # Only the newest turn is animated
+    latest = window.latest_html()
+    assert "Point 49" in latest and "Reply 49" in latest
+    assert latest.count("message-animation") == 2
+    assert "message-animation" not in window.earlier_html()
+
+    # "Load earlier" pages in more history
+    assert MessageWindow(messages, page_size=20, pages=3).hidden == 40
+    assert MessageWindow(messages, page_size=20, pages=10).hidden == 0
+
+    # A turn awaiting its reply is still the latest one
+    pending = MessageWindow(messages + [{"role": "user", "message": "New"}], page_size=20)
+    assert "New" in pending.latest_html() and "Reply 49" in pending.earlier_html()
+
+    assert render_message("user", "Hi") is render_message("user", "Hi")
+
+    print("✅ Message window renders recent pages from cached HTML")
+
+
+def test_turn_log():
+    """Test the compact history: list-like reads, dict-compatible turns"""
+    print("🧪 Testing turn log...")
+
+    log = TurnLog([{"role": "user", "message": "Hi"}])
+    log.append(Turn("bot", "Hello"))
+    log.extend([{"role": "user", "message": "Why?"}, {"role": "bot", "message": "Because"}])
+
+    assert len(log) == 4
+    assert log[0] == {"role": "user", "message": "Hi"}
+    assert log[-1].role == "bot" and log[-1]["message"] == "Because"
+    assert [turn.message for turn in log[1:3]] == ["Hello", "Why?"]
+    assert log.to_list()[1] == {"role": "bot", "message": "Hello"}
+
+    # Roles are stored as one-byte codes and come back as shared strings
+    assert log._roles == bytearray([0, 1, 0, 1])
+    assert log[0].role is log[2].role
+
+    try:
+        log.append({"role": "narrator", "message": "Meanwhile"})
+        assert False, "unknown roles should be rejected"
+    except ValueError:
+        pass
+
+    # The engine reads turn logs like the old lists of dicts
+    engine = DebateEngine()
+    assert engine.build_messages("Next", "Remote work", "pro", log) == engine.build_messages(
+        "Next", "Remote work", "pro", log.to_list()
+    )
+
+    print("✅ Turn logs store histories compactly")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 DebateBot Core Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_context_window,
+        test_topic_parser,
+        test_topic_index,
+        test_completion_cache,
+        test_engine_messages,
+        test_prompt_templates,
+        test_message_window,
+        test_turn_log,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e!r}")
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
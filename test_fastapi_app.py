@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Test script for the DebateBot FastAPI endpoints, run against a local fake LLM
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import ExitStack
+
+from benchmarks.fake_llm import CANNED_REPLY, run_fake_llm
+
+OPENING_MESSAGE = (
+    "Let's debate: Climate change is real and urgent. You argue FOR this position."
+)
+
+# Start the fake LLM before fastapi_app builds its OpenAI client
+_stack = ExitStack()
+os.environ["OPENAI_BASE_URL"] = _stack.enter_context(
+    run_fake_llm(latency=0.01, token_delay=0.001)
+)
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import fastapi_app  # noqa: E402
+from debate_core.opening_pool import OpeningPool  # noqa: E402
+from debate_core.rate_limit import RateLimiter  # noqa: E402
+
+# One event loop for all requests, so pooled LLM connections stay usable
+client = _stack.enter_context(TestClient(fastapi_app.app))
+
+
+def read_sse_events(response) -> list:
+    """Parse a server-sent event stream into (event, data) tuples"""
+    events = []
+    event = None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: ") :]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: ") :])))
+            event = None
+    return events
+
+
+def test_chat():
+    """Test starting and continuing a conversation through /chat"""
+    print("🧪 Testing /chat...")
+
+    response = client.post("/chat", json={"message": OPENING_MESSAGE})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [msg["role"] for msg in data["message"]] == ["user", "bot"]
+    assert data["message"][1]["message"] == CANNED_REPLY
+
+    response = client.post(
+        "/chat",
+        json={"conversation_id": data["conversation_id"], "message": "I disagree."},
+    )
+    assert response.status_code == 200, response.text
+    assert len(response.json()["message"]) == 4
+
+    response = client.post(
+        "/chat", json={"conversation_id": "missing", "message": "Hello"}
+    )
+    assert response.status_code == 404
+
+    # The shard router picks the shard a new debate's ID is created in
+    response = client.post(
+        "/chat", json={"message": OPENING_MESSAGE}, headers={"X-Debate-Shard": "7"}
+    )
+    assert response.json()["conversation_id"].startswith("007-")
+
+    print("✅ /chat starts, continues and rejects unknown conversations")
+
+
+def test_chat_stream():
+    """Test that /chat/stream relays deltas and commits the final message"""
+    print("🧪 Testing /chat/stream...")
+
+    with client.stream("POST", "/chat/stream", json={"message": OPENING_MESSAGE}) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = read_sse_events(r)
+
+    kinds = [event for event, _ in events]
+    assert kinds[0] == "start" and kinds[-1] == "done"
+    assert kinds.count("delta") > 1
+
+    streamed = "".join(data["delta"] for event, data in events if event == "delta")
+    done = events[-1][1]
+    assert streamed == CANNED_REPLY
+    assert done["message"][-1] == {"role": "bot", "message": CANNED_REPLY}
+    assert done["ttft_ms"] is not None
+
+    conversation_id = done["conversation_id"]
+    conversation = fastapi_app.conversation_store.get(conversation_id)
+    assert len(conversation["history"]) == 2
+
+    # A reply that fails part way ends in an error event and isn't committed
+    async def failing_stream(*args, **kwargs):
+        yield "A partial"
+        raise RuntimeError("connection reset")
+
+    real_stream = fastapi_app.engine.astream
+    fastapi_app.engine.astream = failing_stream
+    try:
+        with client.stream(
+            "POST",
+            "/chat/stream",
+            json={"conversation_id": conversation_id, "message": "Why?"},
+        ) as r:
+            events = read_sse_events(r)
+    finally:
+        fastapi_app.engine.astream = real_stream
+    assert [event for event, _ in events] == ["start", "delta", "error"]
+    assert "connection reset" in events[-1][1]["detail"]
+    assert len(fastapi_app.conversation_store.get(conversation_id)["history"]) == 2
+
+    print("✅ /chat/stream streams deltas and records only completed replies")
+
+
+def test_chat_batch():
+    """Test that scripted debates run concurrently with ordered turns"""
+    print("🧪 Testing /chat/batch...")
+
+    scripts = [
+        {"id": "climate", "opening": OPENING_MESSAGE, "replies": ["Why?", "Sources?"]},
+        {
+            "id": "ubi-con",
+            "opening": "Universal basic income: go.",
+            "replies": ["It rewards idleness."],
+            "topic": "Universal basic income",
+            "side": "con",
+        },
+        {"id": "solo", "opening": OPENING_MESSAGE},
+    ]
+    body = "\n".join(json.dumps(script) for script in scripts)
+
+    response = client.post("/chat/batch?concurrency=2", content=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.iter_lines() if line]
+
+    for script in scripts:
+        own = [r for r in records if r["script_id"] == script["id"]]
+        turns = [r for r in own if r["event"] == "turn"]
+        assert [r["turn"] for r in turns] == list(range(len(script.get("replies", [])) + 1))
+        assert [r["user"] for r in turns] == [script["opening"]] + script.get("replies", [])
+        assert all(r["bot"] == CANNED_REPLY and r["latency_ms"] >= 0 for r in turns)
+        assert own[-1]["event"] == "done"
+
+    ubi = next(r for r in records if r["script_id"] == "ubi-con")
+    assert (ubi["topic"], ubi["side"]) == ("Universal basic income", "con")
+
+    bad = client.post("/chat/batch", content='{"opening": "ok"}\n{"replies": []}')
+    assert bad.status_code == 400
+    assert "Line 2" in bad.json()["detail"]
+
+    print("✅ /chat/batch streams ordered transcripts per debate")
+
+
+def test_metrics():
+    """Test that /metrics exposes stage latencies, tokens and gauges"""
+    print("🧪 Testing /metrics...")
+
+    client.post("/chat", json={"conversation_id": None, "message": OPENING_MESSAGE})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    body = response.text
+    for stage in ("chat", "extract_topic", "generate", "prompt_assembly", "llm", "store"):
+        assert f'debatebot_stage_seconds_count{{stage="{stage}"}}' in body, stage
+    assert 'debatebot_stage_seconds_bucket{stage="llm",le="+Inf"}' in body
+    assert "# TYPE debatebot_completion_tokens histogram" in body
+    assert "debatebot_prompt_tokens_after_trim_count" in body
+    assert "debatebot_llm_in_flight 0" in body
+
+    store_size = next(
+        line for line in body.splitlines()
+        if line.startswith("debatebot_conversation_store_size ")
+    )
+    assert int(store_size.split()[1]) >= 1
+
+    print("✅ /metrics renders Prometheus text")
+
+
+def test_rate_limit():
+    """Test that clients over their limits get 429s with Retry-After"""
+    print("🧪 Testing rate limiting...")
+
+    saved, saved_keys = fastapi_app.rate_limiter, fastapi_app.api_keys
+    fastapi_app.rate_limiter = RateLimiter(
+        requests_per_minute=6, request_burst=2, tokens_per_minute=0
+    )
+    fastapi_app.api_keys = frozenset({"team-key"})
+    try:
+        body = {"conversation_id": None, "message": OPENING_MESSAGE}
+        assert client.post("/chat", json=body).status_code == 200
+        assert client.post("/chat", json=body).status_code == 200
+
+        limited = client.post("/chat", json=body)
+        assert limited.status_code == 429
+        assert 1 <= int(limited.headers["Retry-After"]) <= 10
+        assert client.post("/chat/stream", json=body).status_code == 429
+
+        # A known API key is limited separately from the address it comes from
+        headers = {"X-API-Key": "team-key"}
+        assert client.post("/chat", json=body, headers=headers).status_code == 200
+
+        metrics = client.get("/metrics").text
+        assert 'debatebot_rate_limited_total{limit="requests"}' in metrics
+        assert "debatebot_llm_queue_depth 0" in metrics
+        assert "debatebot_llm_queue_wait_seconds_count" in metrics
+    finally:
+        fastapi_app.rate_limiter, fastapi_app.api_keys = saved, saved_keys
+
+    print("✅ Rate-limited clients are told when to retry")
+
+
+def test_opening_pool():
+    """Test that popular topics get pre-generated openings, which expire"""
+    print("🧪 Testing opening warm pool...")
+
+    class Clock:
+        now = 0.0
+
+        def __call__(self) -> float:
+            return self.now
+
+    clock = Clock()
+    saved, saved_limiter = fastapi_app.opening_pool, fastapi_app.rate_limiter
+    fastapi_app.rate_limiter = None
+    pool = fastapi_app.opening_pool = OpeningPool(
+        fastapi_app.engine, per_pair=2, ttl_seconds=60, min_requests=2, clock=clock
+    )
+    try:
+        body = {"conversation_id": None, "message": OPENING_MESSAGE}
+        # The first debate on a topic doesn't make it popular yet
+        assert client.post("/chat", json=body).status_code == 200
+        assert len(pool) == 0 and pool.stats()["misses"] == 1
+
+        # The second does, and the pool fills in the background
+        assert client.post("/chat", json=body).status_code == 200
+        deadline = time.monotonic() + 5
+        while len(pool) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(pool) == 2
+
+        response = client.post("/chat", json=body)
+        assert response.json()["message"][-1]["message"] == CANNED_REPLY
+        with client.stream("POST", "/chat/stream", json=body) as r:
+            events = read_sse_events(r)
+        assert events[-1][1]["message"][-1] == {"role": "bot", "message": CANNED_REPLY}
+        assert pool.stats()["hits"] == 2
+
+        # Openings that aren't plain topic assignments are always generated
+        paraphrase = {"message": "Climate change is real and urgent. Convince me otherwise."}
+        assert client.post("/chat", json=paraphrase).status_code == 200
+        assert pool.stats()["hits"] == 2
+
+        # Stale openings are discarded rather than served
+        deadline = time.monotonic() + 5
+        while len(pool) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        clock.now = 61
+        assert client.post("/chat", json=body).status_code == 200
+        stats = pool.stats()
+        assert stats["hits"] == 2 and stats["expired"] == 2, stats
+
+        metrics = client.get("/metrics").text
+        assert 'debatebot_opening_pool_total{result="hit"} 2' in metrics
+        assert "debatebot_opening_pool_size" in metrics
+
+        # Let the last refill finish before the pool is swapped out
+        while len(pool) < 2 and time.monotonic() < deadline + 5:
+            time.sleep(0.01)
+    finally:
+        fastapi_app.opening_pool, fastapi_app.rate_limiter = saved, saved_limiter
+
+    print("✅ Popular openings are served from the pool and refilled")
+
+
+def test_speculative_extraction():
+    """Test that first replies generated from a local guess are kept or redone"""
+    print("🧪 Testing speculative extraction...")
+
+    engine = fastapi_app.engine
+    saved_limiter = fastapi_app.rate_limiter
+    fastapi_app.rate_limiter = None
+    engine.speculative_extraction = True
+    try:
+        def speculations(result: str) -> float:
+            prefix = f'debatebot_speculative_replies_total{{result="{result}"}} '
+            for line in client.get("/metrics").text.splitlines():
+                if line.startswith(prefix):
+                    return float(line[len(prefix) :])
+            return 0
+
+        # The fake LLM extracts "the given topic", which the guess matches...
+        hits, misses = speculations("hit"), speculations("miss")
+        response = client.post("/chat", json={"message": "Let's debate the given topic?"})
+        assert response.json()["message"][-1]["message"] == CANNED_REPLY
+        assert speculations("hit") == hits + 1
+
+        # ...and this guess doesn't, so the reply is generated again
+        response = client.post("/chat", json={"message": "Let's debate whether zoos are ethical"})
+        assert response.json()["message"][-1]["message"] == CANNED_REPLY
+        assert speculations("miss") == misses + 1
+        conversation = fastapi_app.conversation_store.get(response.json()["conversation_id"])
+        assert conversation["topic"] == "the given topic"
+
+        # Openings the parser fully understands skip LLM extraction altogether
+        assert engine.speculative_guess(OPENING_MESSAGE) is None
+        assert "debatebot_speculation_saved_seconds_total" in client.get("/metrics").text
+    finally:
+        engine.speculative_extraction = False
+        fastapi_app.rate_limiter = saved_limiter
+
+    print("✅ Speculative replies are kept when the guess holds")
+
+
+def test_blocking_store_off_event_loop():
+    """Test that a store doing network or disk I/O is called from worker threads"""
+    print("🧪 Testing blocking store calls...")
+
+    import asyncio
+
+    from debate_core.store import InMemoryConversationStore
+
+    calls = []
+
+    def on_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    class BlockingStore(InMemoryConversationStore):
+        blocking = True
+
+        def get(self, conversation_id):
+            calls.append(on_event_loop())
+            return super().get(conversation_id)
+
+        def put(self, conversation_id, conversation):
+            calls.append(on_event_loop())
+            super().put(conversation_id, conversation)
+
+        def append(self, conversation_id, *messages):
+            calls.append(on_event_loop())
+            super().append(conversation_id, *messages)
+
+    saved_store, saved_limiter = fastapi_app.conversation_store, fastapi_app.rate_limiter
+    fastapi_app.conversation_store, fastapi_app.rate_limiter = BlockingStore(), None
+    try:
+        data = client.post("/chat", json={"message": OPENING_MESSAGE}).json()
+        body = {"conversation_id": data["conversation_id"], "message": "No"}
+        assert client.post("/chat", json=body).status_code == 200
+        with client.stream("POST", "/chat/stream", json=body) as r:
+            assert read_sse_events(r)[-1][0] == "done"
+    finally:
+        fastapi_app.conversation_store, fastapi_app.rate_limiter = saved_store, saved_limiter
+
+    assert len(calls) >= 5 and not any(calls), calls
+
+    # SQLite histories read rows lazily; the turn's reads happen up front too
+    import tempfile
+
+    from debate_core.sqlite_store import SqliteConversationStore
+
+    queries = []
+
+    class TracedSqliteStore(SqliteConversationStore):
+        def _connection(self):
+            queries.append(on_event_loop())
+            return super()._connection()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fastapi_app.conversation_store = TracedSqliteStore(os.path.join(tmp, "c.db"))
+        fastapi_app.rate_limiter = None
+        try:
+            data = client.post("/chat", json={"message": OPENING_MESSAGE}).json()
+            body = {"conversation_id": data["conversation_id"], "message": "No"}
+            for _ in range(3):
+                assert len(client.post("/chat", json=body).json()["message"]) <= 10
+            with client.stream("POST", "/chat/stream", json=body) as r:
+                assert read_sse_events(r)[-1][0] == "done"
+        finally:
+            fastapi_app.conversation_store.close()
+            fastapi_app.conversation_store = saved_store
+            fastapi_app.rate_limiter = saved_limiter
+
+    assert len(queries) >= 10 and not any(queries), queries
+    print("✅ Blocking store calls run outside the event loop")
+
+
+COLD_START_SCRIPT = """
+import json, sys, time
+from fastapi.testclient import TestClient
+import fastapi_app
+from benchmarks.bench_startup import LAZY_MODULES
+
+def loaded():
+    return sorted(name for name in LAZY_MODULES if name in sys.modules)
+
+app = fastapi_app.create_app()
+report = {"after_create_app": loaded()}
+fastapi_app.PREWARM_DELAY_SECONDS = 0.5
+with TestClient(app) as client:
+    report["health"] = client.get("/health").json()
+    report["after_health"] = loaded()
+    deadline = time.monotonic() + 20
+    while "openai" not in sys.modules and time.monotonic() < deadline:
+        time.sleep(0.01)
+    report["after_prewarm"] = loaded()
+print(json.dumps(report))
+"""
+
+
+def test_cold_start():
+    """Test that the app factory and /health don't wait for heavy imports"""
+    print("🧪 Testing cold start...")
+
+    import subprocess
+
+    env = {
+        **os.environ,
+        "LLM_PREWARM": "true",
+        "CONVERSATION_BACKEND": "memory",
+        "OPENING_POOL_ENABLED": "false",
+    }
+    # A fresh interpreter, since this one has long imported everything
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.splitlines()[-1])
+
+    assert report["after_create_app"] == []
+    assert report["health"] == {"status": "healthy"}
+    assert report["after_health"] == []
+    # The OpenAI SDK is then imported in the background, before the first debate
+    assert report["after_prewarm"] == ["openai"]
+
+    print("✅ The API starts and answers /health before importing the OpenAI SDK")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 DebateBot API Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_chat,
+        test_chat_stream,
+        test_chat_batch,
+        test_metrics,
+        test_rate_limit,
+        test_opening_pool,
+        test_speculative_extraction,
+        test_blocking_store_off_event_loop,
+        test_cold_start,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e!r}")
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    _stack.close()
+
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
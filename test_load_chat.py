@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test script for the fake LLM server and the /chat load-test harness
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from benchmarks.fake_llm import (
+    CANNED_REPLY,
+    FakeLLMState,
+    parse_latency,
+    run_fake_llm,
+)
+from benchmarks.load_chat import APOLOGY_PREFIX, compare_reports, run_load
+
+COMPLETION = {"model": "fake-model", "messages": [{"role": "user", "content": "Hi"}]}
+
+
+def test_latency_specs():
+    """Test fixed latencies and sampled distributions"""
+    print("🧪 Testing latency specs...")
+
+    assert parse_latency("0.25") == 0.25
+    uniform = parse_latency("uniform:0.1,0.2")
+    assert all(0.1 <= uniform() <= 0.2 for _ in range(200))
+    # Distributions that can go negative are clamped at 0
+    normal = parse_latency("normal:0,1")
+    assert all(normal() >= 0 for _ in range(200))
+    lognormal = parse_latency("lognormal:0.3,0.5")
+    assert all(lognormal() > 0 for _ in range(200))
+
+    try:
+        parse_latency("pareto:1")
+        raise AssertionError("an unknown distribution should be rejected")
+    except ValueError:
+        pass
+
+    print("✅ Latency specs parse to seconds or samplers")
+
+
+def test_fake_llm():
+    """Test the fake LLM's failure script, stalls, streams and counters"""
+    print("🧪 Testing fake LLM...")
+
+    state = FakeLLMState(failures=[503, 429, 0.3], retry_after=2)
+    with run_fake_llm(latency=0.01, token_delay=0.001, state=state) as base_url:
+        with httpx.Client(base_url=base_url, timeout=10) as http:
+            assert http.post("/chat/completions", json=COMPLETION).status_code == 503
+            limited = http.post("/chat/completions", json=COMPLETION)
+            assert limited.status_code == 429 and limited.headers["retry-after"] == "2"
+
+            # A float in the script stalls the reply
+            start = time.perf_counter()
+            response = http.post("/chat/completions", json=COMPLETION)
+            assert time.perf_counter() - start >= 0.3
+            assert response.json()["choices"][0]["message"]["content"] == CANNED_REPLY
+
+            # Streams arrive as one chunk per word
+            with http.stream(
+                "POST", "/chat/completions", json={**COMPLETION, "stream": True}
+            ) as stream:
+                lines = [line for line in stream.iter_lines() if line.startswith("data: ")]
+            assert lines[-1] == "data: [DONE]"
+            assert len(lines) - 1 == len(CANNED_REPLY.split(" "))
+
+        assert state.requests == 4 and state.errors == 2
+        assert state.models["fake-model"] == 4
+
+    # Once the script runs out, requests fail at the error rate
+    state = FakeLLMState(error_rate=1.0, error_statuses=(500,))
+    with run_fake_llm(latency=0.0, state=state) as base_url:
+        with httpx.Client(base_url=base_url, timeout=10) as http:
+            responses = [http.post("/chat/completions", json=COMPLETION) for _ in range(5)]
+    statuses = {response.status_code for response in responses}
+    assert statuses == {500} and state.errors == 5
+
+    print("✅ Fake LLM injects failures and stalls and counts requests")
+
+
+def test_load_report():
+    """Test that the harness counts outcomes and reports latency percentiles"""
+    print("🧪 Testing load report...")
+
+    app = FastAPI()
+    seen = []
+
+    @app.post("/chat")
+    async def chat(request: dict):
+        seen.append(request)
+        if request["message"] == "fail":
+            raise HTTPException(status_code=500)
+        await asyncio.sleep(0.01)
+        reply = APOLOGY_PREFIX if request["message"] == "apologize" else "Reply"
+        return {
+            "conversation_id": request["conversation_id"] or f"c{len(seen)}",
+            "message": [{"role": "bot", "message": reply}],
+        }
+
+    async def run(openings):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as http:
+            return await run_load(http, openings, debates=6, concurrency=3, turns=3)
+
+    results = asyncio.run(run(["Opening", "fail", "apologize"]))
+
+    # Two debates per opening: a failed request ends its debate
+    assert results["requests"] == 2 * 3 + 2 * 1 + 2 * 3
+    assert results["errors"] == 2
+    assert results["llm_errors"] == 2
+    # Follow-ups continue the conversation they were given
+    assert sum(1 for request in seen if request["conversation_id"]) == 8
+
+    latency = results["latency_ms"]
+    assert 10 <= latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    assert results["requests_per_second"] > 0
+    assert set(results["memory_mb"]) == {"start", "peak", "end"}
+
+    print("✅ Load runs report requests, errors and latency percentiles")
+
+
+def test_compare_reports():
+    """Test that regressions beyond the tolerance are flagged"""
+    print("🧪 Testing report comparison...")
+
+    def report(rps, p50, p95, p99, peak):
+        return {
+            "results": {
+                "requests_per_second": rps,
+                "latency_ms": {"p50": p50, "p95": p95, "p99": p99},
+                "memory_mb": {"peak": peak},
+            }
+        }
+
+    baseline = report(100, 300, 500, 800, 200)
+    regressed = {
+        row[0]: row[-1]
+        for row in compare_reports(baseline, report(85, 310, 600, 700, 205), 0.10)
+    }
+    assert regressed == {
+        "requests_per_second": True,
+        "latency_ms.p50": False,
+        "latency_ms.p95": True,
+        "latency_ms.p99": False,
+        "memory_mb.peak": False,
+    }
+
+    # Improvements never count as regressions
+    improved = compare_reports(baseline, report(150, 200, 300, 400, 100), 0.0)
+    assert not any(row[-1] for row in improved)
+
+    print("✅ Slower or heavier runs are flagged as regressions")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 DebateBot Load Harness Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_latency_specs,
+        test_fake_llm,
+        test_load_report,
+        test_compare_reports,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e!r}")
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Test script for model routing and failover, run against local stub backends
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from contextlib import ExitStack
+
+import openai
+
+from benchmarks.fake_llm import CANNED_REPLY, FakeLLMState, run_fake_llm
+from debate_core.completion_cache import CompletionCache
+from debate_core.engine import DebateEngine
+from debate_core.model_router import (
+    DEBATE,
+    EXTRACT,
+    BackendHealth,
+    ModelBackend,
+    ModelRouter,
+)
+from debate_core.resilience import ResilientClient, RetryPolicy
+
+main_state = FakeLLMState()
+local_state = FakeLLMState()
+_stack = ExitStack()
+MAIN_URL = _stack.enter_context(run_fake_llm(latency=0.01, state=main_state))
+LOCAL_URL = _stack.enter_context(run_fake_llm(latency=0.01, state=local_state))
+
+# A debate opening the local parser can't read, so extraction needs a model
+VAGUE_OPENING = "hmm, what do you reckon about cities these days"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_backend(name, url, model, health=None, **options) -> ModelBackend:
+    return ModelBackend(
+        name,
+        model,
+        api_key="sk-fake",
+        base_url=url,
+        resilience=ResilientClient(timeout=2.0, retry=RetryPolicy(max_retries=0)),
+        health=health,
+        **options,
+    )
+
+
+def make_engine(*backends) -> DebateEngine:
+    return DebateEngine(router=ModelRouter(list(backends)))
+
+
+def reset_states():
+    for state in (main_state, local_state):
+        state.failures.clear()
+        state.requests = 0
+        state.models.clear()
+
+
+async def generate(engine: DebateEngine) -> str:
+    try:
+        return await engine.agenerate("Next point", "Remote work", "pro", [])
+    finally:
+        await engine.aclose()
+
+
+def test_task_routing():
+    """Test that debate turns use the main model and extraction the cheapest"""
+    print("🧪 Testing per-task model selection...")
+
+    reset_states()
+    engine = make_engine(
+        make_backend("main", MAIN_URL, "gpt-4o", cost_per_1k_tokens=5.0),
+        make_backend("mini", MAIN_URL, "gpt-4o-mini", cost_per_1k_tokens=0.15),
+        make_backend("local", LOCAL_URL, "llama3", tasks=[EXTRACT]),
+    )
+    assert engine.model == "gpt-4o"
+    assert [b.name for b in engine.router.candidates(DEBATE)] == ["main", "mini"]
+    assert [b.name for b in engine.router.candidates(EXTRACT)] == ["local", "mini", "main"]
+
+    async def run():
+        try:
+            reply = await engine.agenerate("Next point", "Remote work", "pro", [])
+            extracted = await engine.aextract_topic_and_side(VAGUE_OPENING)
+            return reply, extracted
+        finally:
+            await engine.aclose()
+
+    reply, (topic, side) = asyncio.run(run())
+    assert reply == CANNED_REPLY and (topic, side) == ("the given topic", "pro")
+    assert main_state.models == {"gpt-4o": 1}
+    assert local_state.models == {"llama3": 1}
+
+    # Prompts too big for a backend's context skip it
+    small = make_backend("small", MAIN_URL, "small", context_tokens=1000)
+    large = make_backend("large", MAIN_URL, "large", context_tokens=100_000)
+    router = ModelRouter([small, large])
+    assert router.candidates(DEBATE, 900, 500) == [large]
+    assert router.candidates(DEBATE, 200, 500) == [small, large]
+
+    print("✅ Each task goes to its model")
+
+
+def test_failover():
+    """Test that failing backends fail over, for calls and for streams"""
+    print("🧪 Testing failover...")
+
+    reset_states()
+    main_state.failures.extend([503, 503])
+    engine = make_engine(
+        make_backend("main", MAIN_URL, "main-model"),
+        make_backend("backup", LOCAL_URL, "backup-model"),
+    )
+    assert asyncio.run(generate(engine)) == CANNED_REPLY
+    assert main_state.requests == 1 and local_state.requests == 1
+
+    # Streams fail over before their first chunk; so does the sync client
+    deltas = list(engine.stream("Hi", "Remote work", "pro", []))
+    assert "".join(deltas) == CANNED_REPLY
+    assert main_state.requests == 2 and local_state.requests == 2
+
+    # Bad requests are ours to fix, so they don't fail over
+    main_state.failures.append(400)
+    try:
+        asyncio.run(generate(engine))
+        assert False, "a 400 should be raised"
+    except openai.BadRequestError:
+        pass
+    assert local_state.requests == 2
+
+    # The last backend's error is raised once every backend failed
+    main_state.failures.append(500)
+    local_state.failures.append(502)
+    try:
+        asyncio.run(generate(engine))
+        assert False, "a call failing everywhere should raise"
+    except openai.InternalServerError:
+        pass
+
+    print("✅ Failing backends fail over")
+
+
+def test_failover_cache():
+    """Test that a fallback model's reply is not cached as the main model's"""
+    print("🧪 Testing completion cache keys after failover...")
+
+    reset_states()
+    main_state.failures.append(503)
+    engine = make_engine(
+        make_backend("main", MAIN_URL, "main-model"),
+        make_backend("backup", LOCAL_URL, "backup-model"),
+    )
+    engine.completion_cache = CompletionCache()
+    assert asyncio.run(generate(engine)) == CANNED_REPLY
+    assert main_state.requests == 1 and local_state.requests == 1
+
+    # The backup answered, so the same prompt still goes to the main model
+    assert asyncio.run(generate(engine)) == CANNED_REPLY
+    assert main_state.requests == 2 and local_state.requests == 1
+
+    # ...whose reply is then served from the cache
+    deltas = list(engine.stream("Next point", "Remote work", "pro", []))
+    assert "".join(deltas) == CANNED_REPLY
+    assert main_state.requests == 2
+    assert engine.completion_cache.hits == 1
+
+    print("✅ Replies are cached under the model that produced them")
+
+
+def test_degraded_backends():
+    """Test that slow or failing backends are tried last until they cool down"""
+    print("🧪 Testing degradation and recovery...")
+
+    reset_states()
+    clock = Clock()
+    main = make_backend(
+        "main", MAIN_URL, "main-model", BackendHealth(max_latency=0.1, cooldown=10, clock=clock)
+    )
+    backup = make_backend("backup", LOCAL_URL, "backup-model")
+    engine = make_engine(main, backup)
+
+    # One slow answer pushes the main model past its latency budget
+    main_state.failures.append(0.3)
+    assert asyncio.run(generate(engine)) == CANNED_REPLY
+    assert not main.available
+    assert engine.router.candidates(DEBATE) == [backup, main]
+    assert asyncio.run(generate(engine)) == CANNED_REPLY
+    assert main_state.requests == 1 and local_state.requests == 1
+
+    # After the cooldown the main model gets traffic again
+    clock.now = 11
+    assert main.available
+    assert asyncio.run(generate(engine)) == CANNED_REPLY
+    assert main_state.requests == 2
+
+    # A high error rate degrades a backend as well
+    health = BackendHealth(max_error_rate=0.5, min_samples=3)
+    for ok in (True, False, False, False, False):
+        health.observe(0.01 if ok else None, ok)
+    assert health.degraded
+
+    print("✅ Degraded backends are avoided until they recover")
+
+
+def test_registry_from_env():
+    """Test building the registry from OPENAI_MODEL and LLM_BACKENDS"""
+    print("🧪 Testing registry configuration...")
+
+    keys = ("OPENAI_MODEL", "OPENAI_EXTRACTION_MODEL", "LLM_BACKENDS")
+    saved = {key: os.environ.pop(key, None) for key in keys}
+    try:
+        os.environ["OPENAI_MODEL"] = "gpt-4o"
+        assert DebateEngine.from_env().model == "gpt-4o"
+
+        os.environ["OPENAI_EXTRACTION_MODEL"] = "gpt-4o-mini"
+        router = ModelRouter.from_env()
+        assert [b.model for b in router.candidates(DEBATE)] == ["gpt-4o"]
+        assert [b.model for b in router.candidates(EXTRACT)][0] == "gpt-4o-mini"
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(
+                [
+                    {"name": "main", "model": "gpt-4o", "context_tokens": 128000},
+                    {
+                        "name": "local",
+                        "model": "llama3",
+                        "base_url": LOCAL_URL,
+                        "api_key": "local",
+                        "tasks": ["extract"],
+                        "max_latency_seconds": 2,
+                    },
+                ],
+                f,
+            )
+        os.environ["LLM_BACKENDS"] = f.name
+        router = ModelRouter.from_env()
+        os.unlink(f.name)
+        local = router.backends[1]
+        assert (local.base_url, local.api_key, local.tasks) == (LOCAL_URL, "local", (EXTRACT,))
+        assert local.health.max_latency == 2
+
+        # Every task needs a backend
+        try:
+            ModelRouter([make_backend("local", LOCAL_URL, "llama3", tasks=[EXTRACT])])
+            assert False, "a registry without a debate backend should be rejected"
+        except ValueError:
+            pass
+    finally:
+        for key, value in saved.items():
+            os.environ.pop(key, None)
+            if value is not None:
+                os.environ[key] = value
+
+    print("✅ Registry is configurable from the environment")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 DebateBot Model Router Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_task_routing,
+        test_failover,
+        test_failover_cache,
+        test_degraded_backends,
+        test_registry_from_env,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e!r}")
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for per-client rate limiting and fair scheduling of LLM calls
+"""
+
+import asyncio
+import sys
+
+from debate_core.rate_limit import RateLimiter
+from debate_core.scheduler import FairScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_request_limit():
+    """Test that requests beyond the burst wait for the bucket to refill"""
+    print("🧪 Testing request limit...")
+
+    clock = Clock()
+    limiter = RateLimiter(
+        requests_per_minute=60, request_burst=3, tokens_per_minute=0, clock=clock
+    )
+    assert [limiter.check("ip:1") for _ in range(3)] == [None, None, None]
+    retry_after = limiter.check("ip:1")
+    assert retry_after is not None and 0.9 < retry_after <= 1.0
+
+    # Other clients have their own buckets
+    assert limiter.check("ip:2") is None
+
+    # One request per second refills
+    clock.now = 1.0
+    assert limiter.check("ip:1") is None
+    assert limiter.check("ip:1") is not None
+
+    print("✅ Requests are limited per client")
+
+
+def test_token_limit():
+    """Test that estimated tokens are limited separately from requests"""
+    print("🧪 Testing token limit...")
+
+    clock = Clock()
+    limiter = RateLimiter(
+        requests_per_minute=600, request_burst=100, tokens_per_minute=6000, clock=clock
+    )
+    assert limiter.check("ip:1", 4000) is None
+    retry_after = limiter.check("ip:1", 4000)
+    # 2000 tokens missing at 100 tokens per second
+    assert abs(retry_after - 20) < 1e-6
+
+    # A rejected request consumes nothing, so a smaller one still fits
+    assert limiter.check("ip:1", 2000) is None
+
+    # Requests bigger than the bucket pass once it is full, taking all of it
+    clock.now = 60.0
+    assert limiter.check("ip:1", 100_000) is None
+    assert limiter.check("ip:1", 1) is not None
+
+    # Idle clients are forgotten beyond max_clients
+    limiter = RateLimiter(max_clients=2, clock=clock)
+    for client in ("a", "b", "c"):
+        limiter.check(client)
+    assert len(limiter) == 2
+
+    # Both limits at 0 disable rate limiting
+    assert RateLimiter(requests_per_minute=0, tokens_per_minute=0).check("ip:1", 10**9) is None
+
+    print("✅ Tokens are limited per client")
+
+
+def test_fair_scheduler():
+    """Test that queued calls are served round-robin across clients"""
+    print("🧪 Testing fair scheduling...")
+
+    async def run():
+        scheduler = FairScheduler(max_concurrency=1)
+        order = []
+        gate = asyncio.Event()
+
+        async def call(client: str, index: int):
+            async with scheduler.slot(client):
+                if not gate.is_set():
+                    await gate.wait()
+                order.append(f"{client}{index}")
+
+        # One greedy client queues five calls before two others queue one each
+        tasks = [asyncio.create_task(call("greedy", i)) for i in range(5)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(call(client, 0)) for client in ("a", "b")]
+        await asyncio.sleep(0)
+        assert scheduler.active == 1 and scheduler.queued == 6
+
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert scheduler.active == 0 and scheduler.queued == 0
+        return order
+
+    order = asyncio.run(run())
+    # First come first served would run all of greedy's calls before a and b
+    assert order[:4] == ["greedy0", "greedy1", "a0", "b0"], order
+
+    async def cancelled():
+        scheduler = FairScheduler(max_concurrency=1)
+        await scheduler.acquire("a")
+        waiter = asyncio.create_task(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.queued == 0
+        scheduler.release()
+        assert scheduler.active == 0
+
+    # A cancelled waiter gives up its place without leaking a slot
+    asyncio.run(cancelled())
+
+    print("✅ LLM calls are shared fairly between clients")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 DebateBot Rate Limit Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_request_limit,
+        test_token_limit,
+        test_fair_scheduler,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e!r}")
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
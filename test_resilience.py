@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM resilience layer, run against a failure-injecting fake LLM
+"""
+
+import asyncio
+import sys
+import time
+from contextlib import ExitStack
+
+import openai
+
+from benchmarks.fake_llm import CANNED_REPLY, FakeLLMState, run_fake_llm
+from debate_core.engine import DebateEngine
+from debate_core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientClient,
+    RetryPolicy,
+)
+
+state = FakeLLMState()
+_stack = ExitStack()
+BASE_URL = _stack.enter_context(run_fake_llm(latency=0.01, state=state))
+
+
+def make_engine(**resilience_options) -> DebateEngine:
+    options = {"timeout": 2.0, "retry": RetryPolicy(max_retries=2, base_delay=0.01)}
+    options.update(resilience_options)
+    return DebateEngine(
+        api_key="sk-fake", base_url=BASE_URL, resilience=ResilientClient(**options)
+    )
+
+
+def reset_state(failures=(), retry_after=None):
+    state.failures.clear()
+    state.failures.extend(failures)
+    state.retry_after = retry_after
+    state.requests = 0
+    state.peak_in_flight = 0
+
+
+async def generate(engine: DebateEngine) -> str:
+    try:
+        return await engine.agenerate("Next point", "Remote work", "pro", [])
+    finally:
+        await engine.aclose()
+
+
+def test_retries():
+    """Test that 429/5xx are retried, honoring Retry-After, and 4xx are not"""
+    print("🧪 Testing retries...")
+
+    reset_state([503, 500])
+    assert asyncio.run(generate(make_engine())) == CANNED_REPLY
+    assert state.requests == 3
+
+    # The synchronous client used by Streamlit retries too
+    reset_state([502])
+    assert make_engine().generate("Hi", "Remote work", "pro", []) == CANNED_REPLY
+    assert state.requests == 2
+
+    reset_state([429], retry_after=0.3)
+    start = time.perf_counter()
+    assert asyncio.run(generate(make_engine())) == CANNED_REPLY
+    assert time.perf_counter() - start >= 0.3
+
+    # Retries run out
+    reset_state([503, 503, 503])
+    try:
+        asyncio.run(generate(make_engine()))
+        assert False, "exhausted retries should raise"
+    except openai.InternalServerError:
+        pass
+    assert state.requests == 3
+
+    # Bad requests are ours to fix, so they are not retried
+    reset_state([400])
+    try:
+        asyncio.run(generate(make_engine()))
+        assert False, "400 should raise"
+    except openai.BadRequestError:
+        pass
+    assert state.requests == 1
+
+    print("✅ Transient failures are retried with backoff")
+
+
+def test_stream_retries():
+    """Test that opening a stream is retried for both the async and sync clients"""
+    print("🧪 Testing stream retries...")
+
+    async def astream(engine):
+        try:
+            return [delta async for delta in engine.astream("Hi", "Remote work", "pro", [])]
+        finally:
+            await engine.aclose()
+
+    reset_state([503])
+    deltas = asyncio.run(astream(make_engine()))
+    assert len(deltas) > 1 and "".join(deltas) == CANNED_REPLY
+    assert state.requests == 2
+
+    # The synchronous stream used by the Streamlit app
+    reset_state([429])
+    deltas = list(make_engine().stream("Hi", "Remote work", "pro", []))
+    assert len(deltas) > 1 and "".join(deltas) == CANNED_REPLY
+    assert state.requests == 2
+
+    print("✅ Streams are retried until they open")
+
+
+def test_timeout():
+    """Test that a stalled provider times out instead of hanging the request"""
+    print("🧪 Testing timeouts...")
+
+    reset_state([1.0])
+    engine = make_engine(timeout=0.3, retry=RetryPolicy(max_retries=0))
+    start = time.perf_counter()
+    try:
+        asyncio.run(generate(engine))
+        assert False, "stalled call should time out"
+    except openai.APITimeoutError:
+        pass
+    assert time.perf_counter() - start < 1
+
+    # Let the abandoned request finish so it doesn't skew later tests
+    while state.in_flight:
+        time.sleep(0.01)
+
+    print("✅ Stalled calls time out")
+
+
+def test_circuit_breaker():
+    """Test that repeated failures open the circuit and a trial call closes it"""
+    print("🧪 Testing circuit breaker...")
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    engine = make_engine(retry=RetryPolicy(max_retries=0), breaker=breaker)
+
+    reset_state([500, 500, 500])
+    for _ in range(2):
+        try:
+            engine.generate("Hi", "Remote work", "pro", [])
+        except openai.InternalServerError:
+            pass
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Open: fail fast without touching the provider
+    start = time.perf_counter()
+    try:
+        engine.generate("Hi", "Remote work", "pro", [])
+        assert False, "open circuit should reject calls"
+    except CircuitOpenError:
+        pass
+    assert time.perf_counter() - start < 0.05
+    assert state.requests == 2
+
+    # Half-open: a failing trial reopens the circuit...
+    time.sleep(0.25)
+    try:
+        engine.generate("Hi", "Remote work", "pro", [])
+    except openai.InternalServerError:
+        pass
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # ...and a successful one closes it
+    time.sleep(0.25)
+    assert engine.generate("Hi", "Remote work", "pro", []) == CANNED_REPLY
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    print("✅ Circuit breaker fails fast and recovers")
+
+
+def test_concurrency_limit():
+    """Test that in-flight calls are capped"""
+    print("🧪 Testing concurrency limit...")
+
+    reset_state([0.2] * 6)
+    engine = make_engine(max_concurrency=2)
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                *(engine.agenerate("Hi", "Remote work", "pro", []) for _ in range(6))
+            )
+        finally:
+            await engine.aclose()
+
+    assert asyncio.run(run()) == [CANNED_REPLY] * 6
+    assert state.peak_in_flight == 2
+
+    print("✅ In-flight calls are capped")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 DebateBot Resilience Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_retries,
+        test_stream_retries,
+        test_timeout,
+        test_circuit_breaker,
+        test_concurrency_limit,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e!r}")
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
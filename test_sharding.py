@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test script for shard-aware conversation IDs and the shard router
+"""
+
+import json
+import os
+import sys
+import uuid
+
+import httpx
+
+from debate_core.sharding import (
+    SHARDS,
+    HashRing,
+    conversation_shard,
+    new_conversation_id,
+    parse_shard,
+)
+
+REPLICAS = ("http://api-1:8000", "http://api-2:8000", "http://api-3:8000")
+
+
+class Body(httpx.AsyncByteStream):
+    """A response body that arrives as a stream, like one read from a socket"""
+
+    def __init__(self, data: dict):
+        self.data = json.dumps(data).encode("utf-8")
+
+    async def __aiter__(self):
+        yield self.data
+
+
+def test_conversation_ids():
+    """Test that conversation IDs carry their shard, and old IDs get a stable one"""
+    print("🧪 Testing shard-aware conversation IDs...")
+
+    conversation_id = new_conversation_id(0x1A7)
+    assert conversation_id.startswith("1a7-")
+    assert conversation_shard(conversation_id) == 0x1A7
+    assert 0 <= conversation_shard(new_conversation_id()) < SHARDS
+
+    legacy = str(uuid.uuid4())
+    assert conversation_shard(legacy) == conversation_shard(legacy)
+
+    assert parse_shard("42") == 42
+    assert parse_shard(None) is None and parse_shard("x") is None
+    assert parse_shard(str(SHARDS)) is None
+
+    print("✅ IDs encode their shard and unsharded IDs hash to one")
+
+
+def test_hash_ring_remap():
+    """Test that a joining or leaving replica moves only the shards it gains or loses"""
+    print("🧪 Testing consistent-hash ring...")
+
+    ring = HashRing(REPLICAS)
+    before = [ring.node_for_shard(shard) for shard in range(SHARDS)]
+
+    # Roughly even shares
+    for replica in REPLICAS:
+        share = len(ring.shards_of(replica)) / SHARDS
+        assert 0.2 < share < 0.47, (replica, share)
+
+    ring.add("http://api-4:8000")
+    after = [ring.node_for_shard(shard) for shard in range(SHARDS)]
+    moved = [shard for shard in range(SHARDS) if before[shard] != after[shard]]
+    # Only shards taken over by the new replica move, about a quarter of them
+    assert all(after[shard] == "http://api-4:8000" for shard in moved)
+    assert 0.15 < len(moved) / SHARDS < 0.35, len(moved)
+
+    ring.remove("http://api-4:8000")
+    assert [ring.node_for_shard(shard) for shard in range(SHARDS)] == before
+
+    ring.remove("http://api-2:8000")
+    for shard in range(SHARDS):
+        if before[shard] != "http://api-2:8000":
+            assert ring.node_for_shard(shard) == before[shard]
+
+    print(f"✅ A fourth replica took over {len(moved) / SHARDS:.0%} of shards; others stayed put")
+
+
+def test_router():
+    """Test that the router keeps debates on one replica and fails over when it goes down"""
+    print("🧪 Testing shard router...")
+
+    from fastapi.testclient import TestClient
+
+    import shard_router
+
+    down = set()
+
+    def replica(request: httpx.Request) -> httpx.Response:
+        base = f"http://{request.url.host}:{request.url.port}"
+        if base in down:
+            raise httpx.ConnectError("Connection refused", request=request)
+        if request.url.path == "/health":
+            return httpx.Response(200, stream=Body({"status": "healthy"}))
+        body = json.loads(request.content)
+        conversation_id = body.get("conversation_id")
+        if conversation_id is None:
+            shard = int(request.headers["x-debate-shard"])
+            conversation_id = new_conversation_id(shard)
+        return httpx.Response(
+            200,
+            headers={"content-type": "application/json"},
+            stream=Body(
+                {
+                    "conversation_id": conversation_id,
+                    "replica": base,
+                    "client": request.headers["x-forwarded-for"],
+                }
+            ),
+        )
+
+    os.environ["SHARD_REPLICAS"] = ",".join(REPLICAS)
+    os.environ["SHARD_HEALTH_INTERVAL_SECONDS"] = "0"
+    app = shard_router.create_app(transport=httpx.MockTransport(replica))
+    with TestClient(app) as client:
+        owners = {}
+        for _ in range(30):
+            data = client.post("/chat", json={"conversation_id": None, "message": "Hi"}).json()
+            owners[data["conversation_id"]] = data["replica"]
+            assert data["client"] == "testclient"
+        # New debates are spread out, and created where their shard lives
+        assert len(set(owners.values())) > 1
+        for conversation_id, owner in owners.items():
+            assert shard_router.ring.node_for(conversation_id) == owner
+
+        # Follow-ups go to the replica that started the debate
+        for conversation_id, owner in owners.items():
+            data = client.post(
+                "/chat/stream", json={"conversation_id": conversation_id, "message": "No"}
+            ).json()
+            assert data["replica"] == owner
+
+        # A replica that can't be reached leaves the ring; only its debates move
+        lost = REPLICAS[1]
+        down.add(lost)
+        for conversation_id, owner in owners.items():
+            data = client.post(
+                "/chat", json={"conversation_id": conversation_id, "message": "No"}
+            ).json()
+            if owner == lost:
+                assert data["replica"] != lost
+            else:
+                assert data["replica"] == owner
+
+        health = client.get("/router/health").json()
+        assert health["replicas"][lost] == {"healthy": False, "shards": 0}
+        assert sum(r["shards"] for r in health["replicas"].values()) == SHARDS
+
+        down.update(REPLICAS)
+        assert client.post("/chat", json={"message": "Hi"}).status_code == 503
+
+    print("✅ Debates stick to one replica and only a lost replica's debates move")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 DebateBot Sharding Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_conversation_ids,
+        test_hash_ring_remap,
+        test_router,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e!r}")
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
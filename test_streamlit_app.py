@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for the Streamlit front-end, run against a local fake LLM
+"""
+
+import os
+import sys
+from contextlib import ExitStack
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.fake_llm import CANNED_REPLY, run_fake_llm
+from debate_core.engine import DebateEngine
+from debate_core.message_view import render_message
+
+OPENING_MESSAGE = "Let's debate: Cats are better than dogs. You argue FOR this position."
+
+# Start the fake LLM before the app builds its engine
+_stack = ExitStack()
+os.environ["OPENAI_BASE_URL"] = _stack.enter_context(
+    run_fake_llm(latency=0.01, token_delay=0.001)
+)
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+os.environ["HISTORY_PAGE_SIZE"] = "4"
+
+# AppTest returns as soon as a script asks for a rerun, while the rerun is
+# still going; the tests run the app again themselves instead
+st.rerun = lambda: None
+
+
+def new_app() -> AppTest:
+    app = AppTest.from_file("streamlit_app.py", default_timeout=30)
+    app.run()
+    return app
+
+
+def send(app: AppTest, message: str):
+    """Submit a message, then draw the page the app's rerun would have drawn"""
+    app.text_input(key="message_input").input(message).run()
+    app.run()
+
+
+def shown_messages(app: AppTest) -> str:
+    return "\n".join(m.value for m in app.markdown if "-message" in m.value)
+
+
+def test_history_window():
+    """Test that the history grows by one turn and renders a cached window"""
+    print("🧪 Testing debate history window...")
+
+    histories = []
+    real_generate = DebateEngine.generate
+
+    def recording_generate(self, user_message, topic, side, history, *args, **kwargs):
+        histories.append((history, len(history)))
+        return real_generate(self, user_message, topic, side, history, *args, **kwargs)
+
+    app = new_app()
+    app.checkbox(key="stream_replies").uncheck().run()
+    DebateEngine.generate = recording_generate
+    try:
+        send(app, OPENING_MESSAGE)
+        for i in range(3):
+            send(app, f"Point {i}")
+    finally:
+        DebateEngine.generate = real_generate
+
+    messages = app.session_state["messages"]
+    assert len(messages) == 8 and messages[-1]["message"] == CANNED_REPLY
+
+    # Each turn appends to the same history instead of rebuilding it
+    assert [length for _, length in histories] == [0, 2, 4, 6]
+    assert all(history is histories[0][0] for history, _ in histories)
+    assert len(histories[0][0]) == 8
+
+    # Only the newest page is drawn, with the rest behind "load earlier"
+    shown = shown_messages(app)
+    assert "Point 1" in shown and "Point 2" in shown
+    assert OPENING_MESSAGE not in shown and "Point 0" not in shown
+    load_earlier = app.button(key="load_earlier")
+    assert load_earlier.label == "⬆️ Load earlier messages (4 hidden)"
+
+    # Redrawing the page reuses every message's cached HTML
+    misses = render_message.cache_info().misses
+    app.run()
+    assert render_message.cache_info().misses == misses
+
+    load_earlier.click().run()
+    app.run()
+    assert OPENING_MESSAGE in shown_messages(app)
+    assert not any(button.key == "load_earlier" for button in app.button)
+
+    print("✅ History appends one turn at a time and draws a cached window")
+
+
+def test_streamed_reply():
+    """Test that a streamed reply is committed only once it has finished"""
+    print("🧪 Testing streamed replies...")
+
+    app = new_app()
+    assert app.checkbox(key="stream_replies").value
+    send(app, OPENING_MESSAGE)
+    conversation_id = app.session_state["conversation_id"]
+    assert [m["message"] for m in app.session_state["messages"]] == [
+        OPENING_MESSAGE,
+        CANNED_REPLY,
+    ]
+    assert len(app.session_state["conversations"][conversation_id]) == 2
+
+    # A reply that fails part way is reported and recorded nowhere
+    def failing_stream(self, *args, **kwargs):
+        yield "A partial"
+        raise RuntimeError("connection reset")
+
+    real_stream = DebateEngine.stream
+    DebateEngine.stream = failing_stream
+    try:
+        # No second run: the app retries a message that wasn't answered
+        app.text_input(key="message_input").input("Why?").run()
+    finally:
+        DebateEngine.stream = real_stream
+
+    assert "connection reset" in app.error[0].value
+    assert "A partial" not in "\n".join(m.value for m in app.markdown)
+    assert len(app.session_state["messages"]) == 2
+    assert len(app.session_state["conversations"][conversation_id]) == 2
+
+    # The retry streams in full and is committed after the earlier turn
+    app.run()
+    assert not app.error
+    assert [m["message"] for m in app.session_state["messages"]][2:] == ["Why?", CANNED_REPLY]
+    assert len(app.session_state["conversations"][conversation_id]) == 4
+
+    print("✅ Streamed replies are committed only when they finish")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 DebateBot Streamlit Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_history_window,
+        test_streamed_reply,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e!r}")
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())